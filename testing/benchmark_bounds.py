@@ -0,0 +1,58 @@
+#!/usr/bin/python
+
+import os
+import sys
+
+from main import load_data
+from common.schedule_store import create_schedule_store
+from common.bounds import get_week_objective, get_horizon_gap, format_gap
+from google.nsp_contest import compute_one_week as compute_one_week_or_tools
+from ibm.nsp_cplex import compute_one_week as compute_one_week_cplex
+
+# Reports lower bounds and optimality gaps of every week and of the whole horizon,
+# with the bounds of the solver and the LP relaxation of the CPLEX model.
+
+output_file = os.path.join("outputs", "output_benchmark_bounds.txt")
+time_limit_for_week = 10
+mode = 1
+instance_dirs = ["n030w4", "n040w4", "n050w4", "n060w4"]
+
+def run_weeks(constants):
+    """
+    Computes all weeks of the instance, returns the results.
+    """
+
+    constants["options"]["lp_bound"] = mode == 0
+    results = create_schedule_store(constants)
+    for week_number in constants["all_weeks"]:
+        constants["wd_data"] = constants["all_wd_data"][week_number]
+        if mode == 0:
+            compute_one_week_cplex(time_limit_for_week, week_number, constants, results)
+        else:
+            compute_one_week_or_tools(time_limit_for_week, week_number, constants, results)
+    return results
+
+def format_value(value):
+    return f"{value:8.1f}" if value is not None else "       -"
+
+if __name__ == "__main__":
+    with open(output_file, "w") as file:
+        for instance_dir in instance_dirs:
+            number_nurses, number_weeks = int(instance_dir[1:4]), int(instance_dir[5:])
+            week_data_files_ids = list(range(number_weeks))
+
+            results = run_weeks(load_data(number_nurses, number_weeks, 0, week_data_files_ids, os.path.join("data", instance_dir)))
+
+            lines = []
+            for week_number in range(number_weeks):
+                bounds = results[(week_number, "bounds")]
+                line = f"{instance_dir} week {week_number}: objective {format_value(get_week_objective(results, week_number))}, bound {format_value(results[(week_number, 'bound')])}, gap {format_gap(results[(week_number, 'gap')])}"
+                line += " |" + ",".join(f" {source} {format_value(bound)}" for source, bound in bounds.items())
+                lines.append(line)
+            objective, bound, gap = get_horizon_gap(results, number_weeks)
+            lines.append(f"{instance_dir} horizon: objective {format_value(objective)}, bound {format_value(bound)}, gap {format_gap(gap)}")
+
+            for line in lines:
+                print(line)
+                file.write(line + "\n")
+            sys.stdout.flush()
@@ -0,0 +1,50 @@
+#!/usr/bin/python
+
+import os
+import re
+import sys
+import time
+
+import cplex
+
+from main import load_data
+from ibm.nsp_cplex import setup_problem
+
+# Compares time of building the CPLEX model of one week with names ('names' builder)
+# and from index arrays ('arrays' builder) for every data/nXXXwY instance size.
+
+output_file = os.path.join("outputs", "output_benchmark_cplex_build.txt")
+number_of_iteration = 3
+
+def build_time(constants, builder):
+    """
+    Builds the model of the first week with given builder.
+    Returns the best build time in seconds and the size of the model.
+    """
+
+    constants["options"]["cplex_builder"] = builder
+    times = []
+    for _ in range(number_of_iteration):
+        c = cplex.Cplex()
+        c.set_results_stream(None)
+        c.set_log_stream(None)
+        start = time.perf_counter()
+        setup_problem(c, constants, 0)
+        times.append(time.perf_counter() - start)
+    return min(times), c.variables.get_num(), c.linear_constraints.get_num()
+
+if __name__ == "__main__":
+    instance_dirs = sorted(name for name in os.listdir("data") if re.fullmatch(r"n\d{3}w\d", name))
+
+    with open(output_file, "w") as file:
+        for instance_dir in instance_dirs:
+            number_nurses, number_weeks = map(int, re.findall(r"\d+", instance_dir))
+            constants = load_data(number_nurses, number_weeks, 0, [0] * number_weeks, os.path.join("data", instance_dir))
+
+            names_time, num_vars, num_rows = build_time(constants, "names")
+            arrays_time, _, _ = build_time(constants, "arrays")
+
+            line = f"{instance_dir}: variables {num_vars:6d}, rows {num_rows:6d}, names {names_time:8.3f} s, arrays {arrays_time:8.3f} s, speedup {names_time / arrays_time:6.1f}x"
+            print(line)
+            file.write(line + "\n")
+            sys.stdout.flush()
@@ -0,0 +1,55 @@
+#!/usr/bin/python
+
+import copy
+import os
+import sys
+
+from main import load_data
+from common.schedule_store import create_schedule_store
+from google.nsp_contest import compute_one_week as compute_one_week_or_tools
+from ibm.nsp_cplex import compute_one_week as compute_one_week_cplex
+from common.local_search import improve_week_schedule
+
+# Compares improvement per second of the local search started from the solution of the first week
+# with improvement per second of giving the solver the same time on top of its time limit.
+
+output_file = os.path.join("outputs", "output_benchmark_local_search.txt")
+time_limit_for_week = 10
+local_search_time = 10
+mode = 1
+instance_dirs = ["n030w4", "n040w4", "n050w4", "n060w4", "n080w4", "n100w4", "n120w4"]
+
+def solve_first_week(constants, time_limit):
+    """
+    Computes the first week of the instance, returns the results.
+    """
+
+    constants["wd_data"] = constants["all_wd_data"][0]
+    results = create_schedule_store(constants)
+    if mode == 0:
+        compute_one_week_cplex(time_limit, 0, constants, results)
+    else:
+        compute_one_week_or_tools(time_limit, 0, constants, results)
+    return results
+
+if __name__ == "__main__":
+    with open(output_file, "w") as file:
+        for instance_dir in instance_dirs:
+            number_nurses, number_weeks = int(instance_dir[1:4]), int(instance_dir[5:])
+
+            constants = load_data(number_nurses, number_weeks, 0, list(range(number_weeks)), os.path.join("data", instance_dir))
+            history_data = copy.deepcopy(constants["h0_data"])
+            results = solve_first_week(constants, time_limit_for_week)
+            solver_value = results[(0, "value")]
+            improve_week_schedule(results, constants, 0, history_data, local_search_time)
+            local_search_value = results[(0, "value")]
+
+            constants = load_data(number_nurses, number_weeks, 0, list(range(number_weeks)), os.path.join("data", instance_dir))
+            longer_value = solve_first_week(constants, time_limit_for_week + local_search_time)[(0, "value")]
+
+            line = f"{instance_dir}: solver {time_limit_for_week} s {solver_value:8.1f}"
+            line += f" | + local search {local_search_time} s {local_search_value:8.1f} ({(solver_value - local_search_value) / local_search_time:7.1f} per s)"
+            line += f" | solver {time_limit_for_week + local_search_time} s {longer_value:8.1f} ({(solver_value - longer_value) / local_search_time:7.1f} per s)"
+            print(line)
+            file.write(line + "\n")
+            sys.stdout.flush()
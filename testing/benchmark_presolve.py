@@ -0,0 +1,52 @@
+#!/usr/bin/python
+
+import os
+import re
+import sys
+
+from main import load_data
+from common.schedule_store import create_schedule_store
+from google.nsp_contest import compute_one_week as compute_one_week_or_tools
+from ibm.nsp_cplex import compute_one_week as compute_one_week_cplex
+
+# Compares size, build time and value of the model of the first week without and with presolve
+# for every data/nXXXwY instance size.
+
+output_file = os.path.join("outputs", "output_benchmark_presolve.txt")
+time_limit_for_week = 10
+mode = 1
+
+def run_first_week(constants, presolve):
+    """
+    Computes the first week of the instance, returns the results.
+    """
+
+    constants["options"]["presolve"] = presolve
+    constants["wd_data"] = constants["all_wd_data"][0]
+    results = create_schedule_store(constants)
+    if mode == 0:
+        compute_one_week_cplex(time_limit_for_week, 0, constants, results)
+    else:
+        compute_one_week_or_tools(time_limit_for_week, 0, constants, results)
+    return results
+
+if __name__ == "__main__":
+    instance_dirs = sorted(name for name in os.listdir("data") if re.fullmatch(r"n\d{3}w\d", name))
+
+    with open(output_file, "w") as file:
+        for instance_dir in instance_dirs:
+            number_nurses, number_weeks = map(int, re.findall(r"\d+", instance_dir))
+            line = f"{instance_dir}:"
+            for name, presolve in [("full", False), ("presolve", True)]:
+                constants = load_data(number_nurses, number_weeks, 0, [0] * number_weeks, os.path.join("data", instance_dir))
+                results = run_first_week(constants, presolve)
+                if (0, "model_size") not in results:
+                    line += f" {name} {results[(0, 'status')]}"
+                    continue
+                num_vars, num_rows = results[(0, "model_size")]
+                removed = sum(results[(0, "presolve")].values()) if presolve else 0
+                line += (f" {name} variables {num_vars:6d} (removed {removed:5d}), rows {num_rows:6d},"
+                         f" build {results[(0, 'build_time')]:6.3f} s, value {results[(0, 'value')]:8.1f};")
+            print(line)
+            file.write(line + "\n")
+            sys.stdout.flush()
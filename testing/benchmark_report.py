@@ -0,0 +1,48 @@
+#!/usr/bin/python
+
+import json
+import sys
+
+from main import parse_options
+from common.benchmark_results import read_records, summarize_records, compare_to_baseline
+
+# Summarizes JSON-lines records of benchmark runs (see 'benchmark_runner.py') by medians and spreads of repeated runs
+# and compares them with a stored baseline, the exit status is 1 if a run group regresses.
+#
+#     python benchmark_report.py outputs/output_test_n035_w4_cp_sat.jsonl --baseline=outputs/baseline_n035_w4_cp_sat.json
+#
+# Options: --baseline (summary to compare with), --save_baseline (file to store the summary as a baseline),
+# --time_tolerance (relative, 0.1 by default) and --objective_tolerance (relative, 0 by default).
+
+def format_statistics(statistics, unit=""):
+    if statistics["median"] is None:
+        return "-"
+    return f"{statistics['median']:.3f}{unit} (spread {statistics['spread']:.3f}{unit})"
+
+def print_summary(summary):
+    for key, group in summary.items():
+        print(key)
+        print(f"    runs:       {group['runs']} ({group['unsolved']} without a solution)")
+        print(f"    objective:  {format_statistics(group['objective'])}")
+        print(f"    bound:      {format_statistics(group['bound'])}")
+        print(f"    solve time: {format_statistics(group['solve_time'], ' s')}")
+        print(f"    wall time:  {format_statistics(group['wall_time'], ' s')}")
+
+if __name__ == "__main__":
+    records_files, options = parse_options(sys.argv[1:])
+    summary = summarize_records(read_records(records_files))
+    print_summary(summary)
+
+    if "save_baseline" in options:
+        with open(options["save_baseline"], "w") as file:
+            json.dump(summary, file, indent=4)
+
+    if "baseline" in options:
+        with open(options["baseline"]) as file:
+            baseline = json.load(file)
+        regressions = compare_to_baseline(summary, baseline, float(options.get("time_tolerance", 0.1)), float(options.get("objective_tolerance", 0.0)))
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("no regressions against the baseline")
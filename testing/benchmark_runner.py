@@ -0,0 +1,129 @@
+#!/usr/bin/python
+
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import time
+
+import matplotlib
+
+from main import main, parse_options
+from common.benchmark_results import get_run_record, write_records
+from common.rendering import render_schedules
+
+# Runs a manifest of runs of 'main' in a pool of processes, the data and solver modules are imported once per worker
+# instead of once per run. A manifest has one run per line, given by the command line arguments of main.py,
+# lines starting with '#' are skipped. The cores are split between concurrent jobs and threads of the solver of a job.
+#
+#     python benchmark_runner.py manifests/test_n035_w4_cp_sat.txt outputs/output_test_n035_w4_cp_sat.txt --cores=4 --threads=2
+#
+# Options --cores (all cores by default), --threads (1 by default) and --iterations (1 by default) belong to the runner,
+# other options are added to every run. Besides the printed output, the record of every run is written to a JSON-lines
+# file (option --records, the output file with extension .jsonl by default), see 'benchmark_report.py'. Like the output
+# file, the records file is replaced by every run of the manifest, so its groups hold only runs of the same code.
+# With option --render_dir the schedule of every run is rendered to '<run id>.png' in the directory after all runs,
+# the run id is the number of the run in the manifest, the instance, the backend and the iteration.
+
+runner_options = ["cores", "threads", "iterations", "records", "render_dir"]
+
+def read_manifest(manifest_file):
+    """
+    Returns list of argument strings of the runs in 'manifest_file'.
+    """
+
+    with open(manifest_file) as file:
+        lines = [line.strip() for line in file]
+    return [line for line in lines if line and not line.startswith("#")]
+
+def get_jobs(cores, threads):
+    """
+    Returns number of concurrent jobs for 'cores' when every job uses 'threads' threads of the solver.
+    """
+
+    return max(1, cores // max(1, threads))
+
+def init_worker():
+    # figures are never shown by a worker
+    matplotlib.use("Agg")
+
+def get_run_id(index, record):
+    """
+    Returns id of the run number 'index' of a manifest with 'record', unique in the manifest.
+    """
+
+    return f"{index:03d}_{record['instance']}_{record['backend']}_{record['iteration']}"
+
+def run_main(run):
+    """
+    Runs main with command line arguments (list of strings) of 'run', a tuple of the arguments and the iteration.
+    Returns tuple of its printed output, the record of the run and its schedule as tuple of the array (nurses x days)
+    of codes, the number of shifts and the number of skills (None if the run failed).
+    """
+
+    arguments, iteration = run
+    positional, options = parse_options(arguments)
+    # time limit, mode, nurses and weeks are numbers, ids of the files are kept as written
+    positional = list(map(int, positional[:4])) + positional[4:]
+    output = io.StringIO()
+    results = None
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        try:
+            # no figure in the pool workers, the record keeps the options of the manifest
+            results = main(positional[0], positional[1], positional[2], positional[3], positional[4], positional[5:], dict(options, no_display=True))
+        except Exception as e:
+            print(f"An error occurred: {e}")
+        wall_time = time.perf_counter() - start
+        print(f"wall time:       {wall_time:.3f} s")
+    schedule = None if results is None else (results.codes, results.num_shifts, results.num_skills)
+    return output.getvalue(), get_run_record(positional, options, results, wall_time, iteration), schedule
+
+def filter_output(output):
+    """
+    Removes lines of solver parameters and versions from the output of a run.
+    """
+
+    return "".join(line for line in output.splitlines(keepends=True) if "PARAM" not in line and "Version" not in line)
+
+def run_manifest(runs, output_file, cores=None, threads=1, number_of_iteration=1, options=None, records_file=None, render_dir=None):
+    """
+    Runs every run of 'runs' (list of argument strings) 'number_of_iteration' times with 'options' added,
+    'cores' (all cores if None) are split into jobs of 'threads' threads. Outputs of the runs are written
+    to 'output_file' in the order of 'runs', their records to 'records_file' (the output file with extension .jsonl
+    if None), both files are replaced. Schedules are rendered to 'render_dir' if it is given.
+    """
+
+    cores = cores or os.cpu_count()
+    options = dict(options or {})
+    options["threads"] = threads
+    extra_arguments = [f"--{name}={value}" if value is not True else f"--{name}" for name, value in options.items()]
+    arguments_list = [(run.split() + extra_arguments, iteration) for run in runs for iteration in range(number_of_iteration)]
+    records_file = records_file or os.path.splitext(output_file)[0] + ".jsonl"
+
+    # records are appended run by run to an emptied file, so records of an earlier run of the manifest never mix in
+    open(records_file, "w").close()
+    render_jobs = []
+    with multiprocessing.Pool(get_jobs(cores, threads), initializer=init_worker) as pool, open(output_file, "w") as file:
+        for index, (output, record, schedule) in enumerate(pool.imap(run_main, arguments_list)):
+            file.write(filter_output(output))
+            file.flush()
+            write_records([record], records_file)
+            if render_dir is not None and schedule is not None:
+                run_id = get_run_id(index // number_of_iteration, record)
+                render_jobs.append(schedule + (os.path.join(render_dir, run_id + ".png"), run_id))
+
+    # workers of the pool can not start processes of their own, the schedules are rendered by a new pool
+    render_schedules(render_jobs, cores)
+
+if __name__ == "__main__":
+    arguments, options = parse_options(sys.argv[1:])
+    manifest_file, output_file = arguments
+    run_manifest(read_manifest(manifest_file), output_file,
+                 int(options["cores"]) if "cores" in options else None,
+                 int(options.get("threads", 1)),
+                 int(options.get("iterations", 1)),
+                 {name: value for name, value in options.items() if name not in runner_options},
+                 options.get("records"),
+                 options.get("render_dir"))
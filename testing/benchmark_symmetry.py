@@ -0,0 +1,66 @@
+#!/usr/bin/python
+
+import os
+import sys
+
+from main import load_data
+from common.schedule_store import create_schedule_store
+from common.symmetry import get_interchangeable_groups
+from google.nsp_contest import compute_one_week as compute_one_week_or_tools
+from ibm.nsp_cplex import compute_one_week as compute_one_week_cplex
+
+# Compares time to the target value of the first week with and without symmetry breaking of interchangeable nurses.
+# The target of an instance is the better objective value reached by the two runs.
+
+output_file = os.path.join("outputs", "output_benchmark_symmetry.txt")
+time_limit_for_week = 60
+mode = 1
+instance_dirs = ["n060w4", "n080w4", "n100w4", "n120w4"]
+
+def time_to_target(incumbents, target):
+    """
+    Returns time when the objective value reached 'target' or None.
+    """
+
+    for incumbent_time, value in incumbents:
+        if value <= target:
+            return incumbent_time
+    return None
+
+def format_time(value):
+    return f"{value:7.2f} s" if value is not None else "      - s"
+
+def run_first_week(constants, symmetry_breaking):
+    """
+    Computes the first week of the instance, returns the results.
+    """
+
+    constants["options"]["symmetry_breaking"] = symmetry_breaking
+    constants["wd_data"] = constants["all_wd_data"][0]
+    results = create_schedule_store(constants)
+    if mode == 0:
+        compute_one_week_cplex(time_limit_for_week, 0, constants, results)
+    else:
+        compute_one_week_or_tools(time_limit_for_week, 0, constants, results)
+    return results
+
+if __name__ == "__main__":
+    with open(output_file, "w") as file:
+        for instance_dir in instance_dirs:
+            number_nurses, number_weeks = int(instance_dir[1:4]), int(instance_dir[5:])
+            week_data_files_ids = list(range(number_weeks))
+
+            constants = load_data(number_nurses, number_weeks, 0, week_data_files_ids, os.path.join("data", instance_dir))
+            constants["instance"].set_week(0, constants["h0_data"])
+            groups = get_interchangeable_groups(constants)
+
+            runs = [(name, run_first_week(load_data(number_nurses, number_weeks, 0, week_data_files_ids, os.path.join("data", instance_dir)), symmetry_breaking))
+                    for name, symmetry_breaking in [("plain", False), ("symmetry", True)]]
+            target = min(results[(0, "incumbents")][-1][1] for _, results in runs if results[(0, "incumbents")])
+
+            line = f"{instance_dir}: {sum(len(group) for group in groups):3d} interchangeable nurses in {len(groups):2d} groups, target {target:8.1f}"
+            for name, results in runs:
+                line += f" | {name} target {format_time(time_to_target(results[(0, 'incumbents')], target))}, value {results[(0, 'value')]:8.1f}, {results[(0, 'status')]}"
+            print(line)
+            file.write(line + "\n")
+            sys.stdout.flush()
@@ -0,0 +1,66 @@
+#!/usr/bin/python
+
+import os
+import sys
+
+from main import load_data
+from common.schedule_store import create_schedule_store
+from google.nsp_contest import compute_one_week as compute_one_week_or_tools
+from ibm.nsp_cplex import compute_one_week as compute_one_week_cplex
+
+# Compares time to the first feasible solution and time to the target value with and without
+# the warm start from the previous week. The target of a week is the value reached without the warm start.
+
+output_file = os.path.join("outputs", "output_benchmark_warm_start.txt")
+time_limit_for_week = 20
+mode = 1
+instance_dirs = ["n030w4", "n040w4", "n050w4"]
+
+def run_weeks(constants, warm_start):
+    """
+    Computes all weeks of the instance, returns the results.
+    """
+
+    constants["options"]["warm_start"] = warm_start
+    results = create_schedule_store(constants)
+    for week_number in constants["all_weeks"]:
+        constants["wd_data"] = constants["all_wd_data"][week_number]
+        if mode == 0:
+            compute_one_week_cplex(time_limit_for_week, week_number, constants, results)
+        else:
+            compute_one_week_or_tools(time_limit_for_week, week_number, constants, results)
+    return results
+
+def time_to_target(incumbents, target):
+    """
+    Returns time when the objective value reached 'target' or None.
+    """
+
+    for incumbent_time, value in incumbents:
+        if value <= target:
+            return incumbent_time
+    return None
+
+def format_time(value):
+    return f"{value:7.2f} s" if value is not None else "      - s"
+
+if __name__ == "__main__":
+    with open(output_file, "w") as file:
+        for instance_dir in instance_dirs:
+            number_nurses, number_weeks = int(instance_dir[1:4]), int(instance_dir[5:])
+            week_data_files_ids = list(range(number_weeks))
+
+            cold = run_weeks(load_data(number_nurses, number_weeks, 0, week_data_files_ids, os.path.join("data", instance_dir)), False)
+            warm = run_weeks(load_data(number_nurses, number_weeks, 0, week_data_files_ids, os.path.join("data", instance_dir)), True)
+
+            # the first week has no previous week to start from
+            for week_number in range(1, number_weeks):
+                target = cold[(week_number, "value")]
+                line = f"{instance_dir} week {week_number}: target {target:8.1f}"
+                for name, results in [("cold", cold), ("warm", warm)]:
+                    incumbents = results[(week_number, "incumbents")]
+                    first_feasible = incumbents[0][0] if incumbents else None
+                    line += f" | {name} first {format_time(first_feasible)}, target {format_time(time_to_target(incumbents, target))}, value {results[(week_number, 'value')]:8.1f}"
+                print(line)
+                file.write(line + "\n")
+                sys.stdout.flush()
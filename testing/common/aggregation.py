@@ -0,0 +1,243 @@
+#!/usr/bin/python
+
+import copy
+import time
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from common.history import update_history
+from common.instance import get_week_instance
+from common.dataset import shift_to_int, day_to_int
+from common.local_search import get_week_objective_data, week_objective, improve_week_schedule
+from common.precheck import check_week_capacity, set_precheck_results
+from common.schedule_store import encode_schedule
+from common.bounds import set_bounds
+from common.successions import get_succession_cliques, get_first_day_forbidden
+
+# Aggregated model of a week for very large wards. Nurses with the same skills and contract form a class and the model
+# has integer numbers of nurses of a class working a shift with a skill on a day instead of binaries of every nurse.
+# Its constraints are implied by the hard constraints of the per-nurse models and its objective counts only insufficient
+# staffing and unsatisfied shift off requests, so its optimum is a lower bound of the week objective of both backends.
+# The bound is 0 on nearly every INRC-II week: the nurses of every set of skills can cover its optimal coverage within
+# their weekly limits and most shift off requests can be met, so the model is used for its schedule, not for the bound.
+# The solution is disaggregated to rosters of nurses by a greedy assignment day by day.
+
+def get_nurse_classes(constants):
+    """
+    Returns array (nurses) with the class of every nurse, nurses of a class have the same skills and contract.
+    """
+
+    instance = constants["instance"]
+    _, classes = np.unique(np.column_stack([instance.nurse_skills, instance.nurse_contract]), axis=0, return_inverse=True)
+    return classes.ravel()
+
+def get_specific_requested_off(constants):
+    """
+    Returns boolean array (nurses x days x shifts) of requests of a specific shift off in the current week,
+    requests of any shift are not modelled by the CPLEX backend, so they are left out of the lower bound.
+    """
+
+    requested_off = np.zeros((constants["num_nurses"], constants["num_days"], constants["num_shifts"]), dtype=bool)
+    for preference in constants["wd_data"]["shiftOffRequests"]:
+        shift_id = shift_to_int[preference["shiftType"]]
+        if shift_id != shift_to_int["Any"]:
+            requested_off[int(preference["nurse"].split("_")[1]), day_to_int[preference["day"]], shift_id] = True
+    return requested_off
+
+def build_aggregate_model(constants, classes):
+    """
+    Builds the aggregated model of the current week for nurse 'classes'.
+    Returns tuple of the model and dictionary 'counts' of variables keyed by (class, day, shift, skill).
+    """
+
+    instance = constants["instance"]
+    all_days = constants["all_days"]
+    all_shifts = constants["all_shifts"]
+    num_classes = classes.max() + 1
+    class_sizes = np.bincount(classes, minlength=num_classes).tolist()
+    class_skills = np.zeros((num_classes, constants["num_skills"]), dtype=bool)
+    class_skills[classes] = instance.nurse_skills
+    skills_of_class = [np.flatnonzero(skills).tolist() for skills in class_skills]
+
+    model = cp_model.CpModel()
+    counts = {}
+    for c in range(num_classes):
+        for d in all_days:
+            for s in all_shifts:
+                for sk in skills_of_class[c]:
+                    counts[(c, d, s, sk)] = model.NewIntVar(0, class_sizes[c], f"counts_c{c}_d{d}_s{s}_sk{sk}")
+
+    def working(c, d, shifts):
+        return sum(counts[(c, d, s, sk)] for s in shifts for sk in skills_of_class[c])
+
+    # every nurse works at most one shift a day, on the first day every set of shifts is worked by at most
+    # the number of nurses allowed to work any of them after their last shift
+    allowed_first = ~get_first_day_forbidden(instance)
+    for c in range(num_classes):
+        for d in all_days:
+            model.Add(working(c, d, all_shifts) <= class_sizes[c])
+        for subset in range(1, 2 ** constants["num_shifts"]):
+            shifts = [s for s in all_shifts if subset >> s & 1]
+            allowed = int(allowed_first[classes == c][:, shifts].any(axis=1).sum())
+            if allowed < class_sizes[c]:
+                model.Add(working(c, 0, shifts) <= allowed)
+
+    # a nurse works at most one shift of a clique of forbidden successions on two successive days
+    for preceding, succeeding in get_succession_cliques(instance.forbidden_successions):
+        for c in range(num_classes):
+            for d in range(constants["num_days"] - 1):
+                model.Add(working(c, d, preceding) + working(c, d + 1, succeeding) <= class_sizes[c])
+
+    insufficient_staffing = []
+    demand = instance.week_demand.tolist()
+    for d in all_days:
+        for s in all_shifts:
+            for sk in constants["all_skills"]:
+                minimal_capacity, optimal_capacity = demand[d][s][sk]
+                staffed = sum(counts[(c, d, s, sk)] for c in range(num_classes) if class_skills[c, sk])
+                model.Add(staffed >= minimal_capacity)
+                if optimal_capacity > 0:
+                    insufficient = model.NewIntVar(0, optimal_capacity, f"insufficient_staffing_d{d}_s{s}_sk{sk}")
+                    model.Add(staffed + insufficient >= optimal_capacity)
+                    insufficient_staffing.append(insufficient)
+
+    # requests are unsatisfied when more nurses of the class work the shift than there are nurses without the request
+    unsatisfied_preferences = []
+    free = np.zeros((num_classes, constants["num_days"], constants["num_shifts"]), dtype=int)
+    np.add.at(free, classes, ~get_specific_requested_off(constants))
+    for c, d, s in np.argwhere(free < np.array(class_sizes)[:, None, None]).tolist():
+        unsatisfied = model.NewIntVar(0, class_sizes[c] - int(free[c, d, s]), f"unsatisfied_preferences_c{c}_d{d}_s{s}")
+        model.Add(working(c, d, [s]) - int(free[c, d, s]) <= unsatisfied)
+        unsatisfied_preferences.append(unsatisfied)
+
+    model.Minimize(30 * sum(insufficient_staffing) + 10 * sum(unsatisfied_preferences))
+    return model, counts
+
+def disaggregate(counts, classes, constants):
+    """
+    Assigns nurses of every class to the numbers (classes x days x shifts x skills) of the aggregated solution, day by day.
+    Counts above the optimal coverage are not assigned. Shifts forbidden after most shifts are assigned first, every one
+    to a free nurse of the class allowed to work it after her previous day. Nurses allowed the fewest shifts are chosen
+    first (the counts respect the cliques of forbidden successions, so all of them are assigned when the shifts allowed
+    after a shift are nested), then nurses without the shift requested off, under their weekly share of assignments
+    and consecutive working days, with the least working days.
+    Returns 0/1 array (nurses x days x shifts x skills), a count stays unassigned if no nurse of the class is allowed.
+    """
+
+    instance = constants["instance"]
+    num_nurses = constants["num_nurses"]
+    forbidden = instance.forbidden_successions
+    requested_off = instance.week_requested_off
+    weekly_assignments = np.ceil(instance.max_assignments / constants["num_weeks"])
+    max_consecutive_working_days = instance.max_consecutive_working_days
+
+    # surplus over the optimal coverage is removed from the classes with most nurses in the cell
+    counts = counts.copy()
+    demand = instance.week_demand
+    surplus = counts.sum(axis=0) - np.maximum(demand[..., 0], demand[..., 1])
+    for d, s, sk in np.argwhere(surplus > 0).tolist():
+        for _ in range(surplus[d, s, sk]):
+            counts[counts[:, d, s, sk].argmax(), d, s, sk] -= 1
+
+    schedule = np.zeros((num_nurses, constants["num_days"], constants["num_shifts"], constants["num_skills"]), dtype=bool)
+    previous_shift = instance.history_last_shift.astype(int)
+    consecutive_working_days = instance.history_consecutive_working_days.astype(int)
+    working_days = np.zeros(num_nurses, dtype=int)
+    shift_order = np.argsort(-forbidden.sum(axis=0), kind="stable")
+
+    for d in constants["all_days"]:
+        free = np.ones(num_nurses, dtype=bool)
+        allowed_shift = ~((previous_shift[:, None] >= 0) & forbidden[np.maximum(previous_shift, 0)])
+        flexibility = allowed_shift.sum(axis=1)
+        for s in shift_order:
+            penalty = 4 * requested_off[:, d, s] + 2 * (working_days >= weekly_assignments) + (consecutive_working_days >= max_consecutive_working_days)
+            for c, sk in np.argwhere(counts[:, d, s] > 0).tolist():
+                candidates = np.flatnonzero(free & (classes == c) & allowed_shift[:, s])
+                order = np.lexsort((working_days[candidates], penalty[candidates], flexibility[candidates]))
+                chosen = candidates[order[:counts[c, d, s, sk]]]
+                schedule[chosen, d, s, sk] = True
+                free[chosen] = False
+                working_days[chosen] += 1
+
+        working = ~free
+        previous_shift = np.where(working, schedule[:, d].any(axis=2).argmax(axis=1), -1)
+        consecutive_working_days = np.where(working, consecutive_working_days + 1, 0)
+
+    return schedule.astype(int)
+
+def solve_aggregate_week(constants, time_limit):
+    """
+    Solves the aggregated model of the current week and disaggregates its solution.
+    Returns dictionary with "status", "bound" (lower bound of the week objective, None if the model is infeasible),
+    "value" (objective of the aggregated solution), "schedule" (None without a solution), "build_time", "solve_time"
+    and "model_size".
+    """
+
+    build_start = time.perf_counter()
+    classes = get_nurse_classes(constants)
+    model, counts = build_aggregate_model(constants, classes)
+    aggregate = {"build_time": time.perf_counter() - build_start,
+                 "model_size": (len(model.Proto().variables), len(model.Proto().constraints))}
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    status = solver.Solve(model)
+    aggregate["solve_time"] = solver.WallTime()
+    aggregate["status"] = solver.StatusName(status)
+    aggregate["bound"] = solver.BestObjectiveBound() if status != cp_model.INFEASIBLE else None
+    aggregate["value"] = None
+    aggregate["schedule"] = None
+    if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+        aggregate["value"] = solver.ObjectiveValue()
+        values = np.zeros((classes.max() + 1, constants["num_days"], constants["num_shifts"], constants["num_skills"]), dtype=int)
+        for index, variable in counts.items():
+            values[index] = solver.Value(variable)
+        aggregate["schedule"] = disaggregate(values, classes, constants)
+    return aggregate
+
+def compute_one_week(time_limit_for_week, week_number, constants, results):
+    """
+    Computes the week by the aggregated model only and stores the disaggregated schedule in 'results'
+    like the backends do, its value is the week objective of the schedule.
+    """
+
+    get_week_instance(constants, week_number)
+
+    # Week whose minimal coverage can not be met is not given to the solver.
+    problems = check_week_capacity(constants)
+    if problems:
+        set_precheck_results(results, week_number, problems)
+        return
+
+    aggregate = solve_aggregate_week(constants, time_limit_for_week)
+    results[(week_number, "build")] = "aggregated"
+    results[(week_number, "build_time")] = aggregate["build_time"]
+    results[(week_number, "model_size")] = aggregate["model_size"]
+    results[(week_number, "solve_time")] = aggregate["solve_time"]
+    results[(week_number, "aggregate_bound")] = aggregate["bound"]
+    results[(week_number, "allweeksoft")] = 0
+    results[("allweeksoft")] = 0
+
+    if aggregate["schedule"] is None:
+        results[(week_number, "status")] = "infeasible solution"
+        results[(week_number, "value")] = 99999
+        results[(week_number, "incumbents")] = []
+        set_bounds(results, week_number, constants)
+        return
+
+    schedule = aggregate["schedule"]
+    value = week_objective(encode_schedule(schedule), get_week_objective_data(constants))
+    results[(week_number, "status")] = f"Aggregated solution ({aggregate['status'].lower()}) disaggregated"
+    results[(week_number, "value")] = value
+    results[(week_number, "incumbents")] = [(aggregate["solve_time"], value)]
+
+    # history from the start of the week is needed by the local search
+    history_data = copy.deepcopy(constants["h0_data"])
+    results.set_week(week_number, schedule)
+    working_days = schedule.any(axis=(2, 3))
+    update_history(constants["h0_data"], schedule.any(axis=3), working_days[:, 5] | working_days[:, 6])
+
+    if constants["options"].get("local_search"):
+        improve_week_schedule(results, constants, week_number, history_data, float(constants["options"].get("local_search_time", 5)))
+    set_bounds(results, week_number, constants)
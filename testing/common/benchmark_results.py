@@ -0,0 +1,126 @@
+#!/usr/bin/python
+
+import json
+
+import numpy as np
+
+from common.bounds import get_week_objective, get_horizon_gap
+
+# Structured results of benchmark runs. Every run of main is one record (a line of a JSON-lines file),
+# records of repeated runs of the same instance, backend and options form a group summarized by medians and spreads.
+# A summary saved as the baseline is compared with later summaries, a group regresses when its median solve time
+# or objective is worse than the baseline by more than the tolerance.
+
+backend_names = {0: "cplex", 1: "cp_sat"}
+
+def get_run_record(arguments, options, results, wall_time, iteration=0):
+    """
+    Returns dictionary with the record of a run of main with positional 'arguments' (time limit, mode, nurses and weeks
+    as int, ids of the history and week files as strings) and 'options', 'results' of the run are None if the run failed.
+    """
+
+    _, mode, number_nurses, number_weeks, history_data_file_id = arguments[:5]
+    record = {
+        "instance": f"n{number_nurses:03d}w{number_weeks}",
+        "history": str(history_data_file_id),
+        "weeks_data": list(map(str, arguments[5:5 + number_weeks])),
+        "backend": "aggregate" if options.get("aggregate") == "solve" else backend_names[mode],
+        "options": dict(sorted(options.items())),
+        "iteration": iteration,
+        "wall_time": wall_time,
+        "objective": None,
+        "bound": None,
+        "solve_time": None,
+        "weeks": [],
+    }
+    if results is None:
+        return record
+
+    for week_number in range(number_weeks):
+        record["weeks"].append({
+            "status": str(results[(week_number, "status")]),
+            "objective": get_week_objective(results, week_number),
+            "bound": results.get((week_number, "bound")),
+            "build_time": results[(week_number, "build_time")],
+            "solve_time": results.get((week_number, "solve_time")),
+            "time_allocation": results.get((week_number, "time_allocation")),
+        })
+    record["objective"], record["bound"], _ = get_horizon_gap(results, number_weeks)
+    record["solve_time"] = sum(week["solve_time"] or 0.0 for week in record["weeks"])
+    return json.loads(json.dumps(record, default=float))
+
+def write_records(records, records_file):
+    """
+    Appends 'records' to JSON-lines 'records_file'.
+    """
+
+    with open(records_file, "a") as file:
+        for record in records:
+            file.write(json.dumps(record) + "\n")
+
+def read_records(records_files):
+    """
+    Returns list of records of all JSON-lines 'records_files'.
+    """
+
+    records = []
+    for records_file in records_files:
+        with open(records_file) as file:
+            records += [json.loads(line) for line in file if line.strip()]
+    return records
+
+def get_group_key(record):
+    return f"{record['instance']} h{record['history']} {' '.join(map(str, record['weeks_data']))} {record['backend']} {json.dumps(record['options'], sort_keys=True)}"
+
+def get_statistics(values):
+    """
+    Returns dictionary with median, min, max and spread (max - min) of 'values', None values are left out.
+    """
+
+    values = np.array([value for value in values if value is not None], dtype=float)
+    if len(values) == 0:
+        return {"median": None, "min": None, "max": None, "spread": None}
+    return {"median": float(np.median(values)), "min": float(values.min()), "max": float(values.max()), "spread": float(values.max() - values.min())}
+
+def summarize_records(records):
+    """
+    Returns dictionary of summaries of records grouped by instance, backend and options, every summary has the number
+    of runs, runs without a solution and statistics of the objective, bound, solve time and wall time.
+    """
+
+    groups = {}
+    for record in records:
+        groups.setdefault(get_group_key(record), []).append(record)
+
+    summary = {}
+    for key, group in groups.items():
+        summary[key] = {"runs": len(group), "unsolved": sum(record["objective"] is None for record in group)}
+        for name in ["objective", "bound", "solve_time", "wall_time"]:
+            summary[key][name] = get_statistics(record[name] for record in group)
+    return summary
+
+def compare_to_baseline(summary, baseline, time_tolerance=0.1, objective_tolerance=0.0):
+    """
+    Compares medians of 'summary' to 'baseline' (both from 'summarize_records'), groups missing in the baseline are skipped.
+    Returns list of messages of regressions: solve time over the baseline by more than 'time_tolerance' (relative),
+    objective over the baseline by more than 'objective_tolerance' (relative) or a larger share of runs without
+    a solution than in the baseline (groups of both may have different numbers of runs).
+    """
+
+    regressions = []
+    for key, group in summary.items():
+        if key not in baseline:
+            continue
+        reference = baseline[key]
+
+        if group["unsolved"] / group["runs"] > reference["unsolved"] / reference["runs"]:
+            regressions.append(f"{key}: {group['unsolved']} of {group['runs']} runs without a solution, baseline {reference['unsolved']} of {reference['runs']}")
+
+        time, reference_time = group["solve_time"]["median"], reference["solve_time"]["median"]
+        if time is not None and reference_time is not None and time > reference_time * (1 + time_tolerance):
+            regressions.append(f"{key}: median solve time {time:.3f} s, baseline {reference_time:.3f} s")
+
+        objective, reference_objective = group["objective"]["median"], reference["objective"]["median"]
+        if objective is not None and reference_objective is not None and objective > reference_objective + abs(reference_objective) * objective_tolerance:
+            regressions.append(f"{key}: median objective {objective:.1f}, baseline {reference_objective:.1f}")
+    return regressions
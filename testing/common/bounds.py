@@ -0,0 +1,61 @@
+#!/usr/bin/python
+
+# Lower bounds of the week objective. Every week collects the bound of the solver (the best objective bound of the
+# search), the LP relaxation of the CPLEX model and the aggregated model of nurse classes, the best of them is the bound
+# of the week (0 without any, the objective is never negative). Gaps are relative to the objective value of the week.
+# The bound of the horizon is the sum of bounds of the weeks, each for the history left by the computed weeks before.
+# Bounds of the insufficient staffing from the data alone are 0 on the INRC-II instances: the optimal coverage of every
+# set of skills over a week is at most 80 % of the assignments its nurses can work within their weekly limits.
+
+def get_week_objective(results, week_number):
+    """
+    Returns objective value of the week as the solver computed it (value and the limits part), None without a solution.
+    """
+
+    value = results[(week_number, "value")]
+    if value == 99999:
+        return None
+    return value + results.get((week_number, "allweeksoft"), 0)
+
+def get_gap(objective, bound):
+    """
+    Returns relative gap between the objective value and its lower bound, None if one of them is missing.
+    """
+
+    if objective is None or bound is None:
+        return None
+    return max(0.0, objective - bound) / max(abs(objective), 1.0)
+
+def set_bounds(results, week_number, constants, solver_bound=None, lp_bound=None):
+    """
+    Stores lower bounds of the week in 'results': dictionary (week_number, "bounds") of bounds by their source,
+    the best of them (week_number, "bound") and the gap (week_number, "gap") of the objective value of the week.
+    """
+
+    bounds = {}
+    if solver_bound is not None:
+        bounds["solver"] = solver_bound
+    if lp_bound is not None:
+        bounds["lp"] = lp_bound
+    if results.get((week_number, "aggregate_bound")) is not None:
+        bounds["aggregate"] = results[(week_number, "aggregate_bound")]
+
+    results[(week_number, "bounds")] = bounds
+    results[(week_number, "bound")] = max(bounds.values(), default=0)
+    results[(week_number, "gap")] = get_gap(get_week_objective(results, week_number), results[(week_number, "bound")])
+
+def get_horizon_gap(results, number_weeks):
+    """
+    Returns tuple of the sum of objective values, the sum of bounds and the gap over all weeks,
+    the objective and the gap are None if a week has no solution.
+    """
+
+    objectives = [get_week_objective(results, week_number) for week_number in range(number_weeks)]
+    bound = sum(results.get((week_number, "bound")) or 0 for week_number in range(number_weeks))
+    if any(objective is None for objective in objectives):
+        return None, bound, None
+    objective = sum(objectives)
+    return objective, bound, get_gap(objective, bound)
+
+def format_gap(gap):
+    return f"{100 * gap:6.2f} %" if gap is not None else "     - %"
@@ -0,0 +1,62 @@
+#!/usr/bin/python
+
+import numpy as np
+
+def construct_schedule(constants):
+    """
+    Builds a schedule of the current week without a solver. Days are filled one by one, first up to the minimal
+    and then up to the optimal coverage, scarce skills first. Only nurses with the skill, a free day and an allowed
+    succession after the previous day (the history for the first day) are used, preferring nurses without a shift off
+    request, under their weekly share of assignments and consecutive working days, with the least working days and skills.
+    Returns 0/1 array (nurses x days x shifts x skills), minimal coverage may stay unmet if no nurse is available.
+    """
+
+    instance = constants["instance"]
+    num_nurses = constants["num_nurses"]
+    num_days = constants["num_days"]
+    num_shifts = constants["num_shifts"]
+    num_skills = constants["num_skills"]
+
+    forbidden = instance.forbidden_successions
+    has_skill = instance.nurse_skills
+    requested_off = instance.week_requested_off
+    weekly_assignments = np.ceil(instance.max_assignments / constants["num_weeks"]).astype(int)
+    max_consecutive_working_days = instance.max_consecutive_working_days
+
+    schedule = np.zeros((num_nurses, num_days, num_shifts, num_skills), dtype=bool)
+    previous_shift = instance.history_last_shift
+    consecutive_working_days = instance.history_consecutive_working_days
+    working_days = np.zeros(num_nurses, dtype=int)
+    skills_count = has_skill.sum(axis=1)
+
+    minimal = instance.week_demand[..., 0]
+    optimal = instance.week_demand[..., 1]
+    # skills with the least nurses are covered first
+    skill_order = np.argsort(has_skill.sum(axis=0), kind="stable")
+
+    for d in range(num_days):
+        free = np.ones(num_nurses, dtype=bool)
+        allowed_shift = ~((previous_shift[:, None] >= 0) & forbidden[np.maximum(previous_shift, 0)])
+        for level, coverage in [("minimum", minimal), ("optimal", optimal)]:
+            for sk in skill_order:
+                for s in range(num_shifts):
+                    missing = coverage[d, s, sk] - schedule[:, d, s, sk].sum()
+                    if missing <= 0:
+                        continue
+                    penalty = 4 * requested_off[:, d, s] + 2 * (working_days >= weekly_assignments) + (consecutive_working_days >= max_consecutive_working_days)
+                    candidates = free & has_skill[:, sk] & allowed_shift[:, s]
+                    if level == "optimal":
+                        # above the minimum only assignments without any penalty are worth it
+                        candidates &= penalty == 0
+                    candidates = np.flatnonzero(candidates)
+                    order = np.lexsort((skills_count[candidates], working_days[candidates], penalty[candidates]))
+                    chosen = candidates[order[:missing]]
+                    schedule[chosen, d, s, sk] = True
+                    free[chosen] = False
+                    working_days[chosen] += 1
+
+        working = ~free
+        previous_shift = np.where(working, schedule[:, d].any(axis=2).argmax(axis=1), -1)
+        consecutive_working_days = np.where(working, consecutive_working_days + 1, 0)
+
+    return schedule.astype(int)
@@ -0,0 +1,140 @@
+#!/usr/bin/python
+
+import json
+import os
+import re
+
+import numpy as np
+
+shift_to_int = {"Early": 0, "Day": 1, "Late": 2, "Night": 3, "Any": 4, "None": 5}
+skill_to_int = {"HeadNurse": 0, "Nurse": 1, "Caretaker": 2, "Trainee": 3}
+day_to_int = {"Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3, "Friday": 4, "Saturday": 5, "Sunday": 6}
+
+default_data_root = "data"
+
+# Sc-n030w4.json, H0-n030w4-0.json, WD-n030w4-0original.json, ...
+file_name_pattern = re.compile(r"^(Sc|H0|WD)-(n\d{3}w\d+)(?:-(.+))?\.json$")
+
+def build_manifest(data_root=default_data_root):
+    """
+    Indexes every directory of 'data_root' (and the root itself) by instance name.
+    Returns a dictionary 'manifest' keyed by instance name ("n030w4", ...) with the "scenario" file and
+    dictionaries "histories" and "weeks" of files keyed by their id as written in the file name ("0", "01", "0original", ...).
+    """
+
+    manifest = {}
+    directories = [data_root] + sorted(os.path.join(data_root, name) for name in os.listdir(data_root) if os.path.isdir(os.path.join(data_root, name)))
+    for directory in directories:
+        for file_name in sorted(os.listdir(directory)):
+            match = file_name_pattern.match(file_name)
+            if match is None:
+                continue
+            kind, instance_name, file_id = match.groups()
+            entry = manifest.setdefault(instance_name, {"scenario": None, "histories": {}, "weeks": {}})
+            path = os.path.join(directory, file_name)
+            if kind == "Sc":
+                entry["scenario"] = path
+            elif kind == "H0":
+                entry["histories"][file_id] = path
+            else:
+                entry["weeks"][file_id] = path
+    return manifest
+
+def get_instance_files(number_nurses, number_weeks, history_data_file_id, week_data_files_ids, data_dir=None):
+    """
+    Finds files of the instance, in 'data_dir' if it is given, otherwise in the manifest of all data directories.
+    Returns tuple of the scenario file, the history file and the list of week files.
+    """
+
+    instance_name = f"n{number_nurses:03d}w{number_weeks}"
+    if data_dir is not None:
+        return (os.path.join(data_dir, f"Sc-{instance_name}.json"),
+                os.path.join(data_dir, f"H0-{instance_name}-{history_data_file_id}.json"),
+                [os.path.join(data_dir, f"WD-{instance_name}-{week_id}.json") for week_id in week_data_files_ids])
+
+    entry = build_manifest().get(instance_name)
+    if entry is None:
+        raise FileNotFoundError(f"Instance {instance_name} is not in any directory of '{default_data_root}'")
+    return entry["scenario"], entry["histories"][str(history_data_file_id)], [entry["weeks"][str(week_id)] for week_id in week_data_files_ids]
+
+def load_json(file_name):
+    with open(file_name) as file:
+        return json.load(file)
+
+history_fields = {
+    "assignments": "numberOfAssignments",
+    "working_weekends": "numberOfWorkingWeekends",
+    "consecutive_shifts": "numberOfConsecutiveAssignments",
+    "consecutive_working_days": "numberOfConsecutiveWorkingDays",
+    "consecutive_days_off": "numberOfConsecutiveDaysOff",
+}
+
+def get_history_arrays(history_data, num_shifts):
+    """
+    Converts history of the nurses in 'history_data' to arrays (nurses) keyed by "last_shift" (-1 for a nurse
+    not working on the last day) and the names of 'history_fields'.
+    """
+
+    history = history_data["nurseHistory"]
+    last_shift = np.array([shift_to_int[nurse_history["lastAssignedShiftType"]] for nurse_history in history])
+    arrays = {"last_shift": np.where(last_shift < num_shifts, last_shift, -1).astype(np.int8)}
+    for name, field in history_fields.items():
+        arrays[name] = np.array([nurse_history[field] for nurse_history in history], dtype=np.int16)
+    return arrays
+
+def get_instance_arrays(sc_data, h0_data, all_wd_data):
+    """
+    Converts loaded scenario, history and week data to typed arrays.
+    Returns a dictionary of numpy arrays: per nurse "nurse_skills" (nurses x skills), "nurse_contract" and the history
+    ("history_..."), per contract the limits ("contract_..."), per shift the consecutive assignment limits ("shift_..."),
+    "forbidden_successions" (shifts x shifts), "demand" (weeks x days x shifts x skills x [minimum, optimal]) and
+    "requested_off" (weeks x nurses x days x shifts).
+    """
+
+    num_nurses = len(sc_data["nurses"])
+    num_shifts = len(sc_data["shiftTypes"])
+    num_skills = len(sc_data["skills"])
+    contract_to_int = {contract["id"]: c for c, contract in enumerate(sc_data["contracts"])}
+
+    arrays = {}
+    arrays["nurse_skills"] = np.zeros((num_nurses, num_skills), dtype=bool)
+    for n, nurse in enumerate(sc_data["nurses"]):
+        arrays["nurse_skills"][n, [skill_to_int[skill] for skill in nurse["skills"]]] = True
+    arrays["nurse_contract"] = np.array([contract_to_int[nurse["contract"]] for nurse in sc_data["nurses"]], dtype=np.int8)
+
+    contract_fields = {
+        "min_assignments": "minimumNumberOfAssignments",
+        "max_assignments": "maximumNumberOfAssignments",
+        "min_consecutive_working_days": "minimumNumberOfConsecutiveWorkingDays",
+        "max_consecutive_working_days": "maximumNumberOfConsecutiveWorkingDays",
+        "min_consecutive_days_off": "minimumNumberOfConsecutiveDaysOff",
+        "max_consecutive_days_off": "maximumNumberOfConsecutiveDaysOff",
+        "max_working_weekends": "maximumNumberOfWorkingWeekends",
+        "complete_weekends": "completeWeekends",
+    }
+    for name, field in contract_fields.items():
+        arrays[f"contract_{name}"] = np.array([contract[field] for contract in sc_data["contracts"]], dtype=np.int16)
+    arrays["shift_min_consecutive"] = np.array([shift["minimumNumberOfConsecutiveAssignments"] for shift in sc_data["shiftTypes"]], dtype=np.int16)
+    arrays["shift_max_consecutive"] = np.array([shift["maximumNumberOfConsecutiveAssignments"] for shift in sc_data["shiftTypes"]], dtype=np.int16)
+    arrays["forbidden_successions"] = np.zeros((num_shifts, num_shifts), dtype=bool)
+    for succession in sc_data["forbiddenShiftTypeSuccessions"]:
+        for succeeding_shift in succession["succeedingShiftTypes"]:
+            arrays["forbidden_successions"][shift_to_int[succession["precedingShiftType"]], shift_to_int[succeeding_shift]] = True
+
+    for name, array in get_history_arrays(h0_data, num_shifts).items():
+        arrays[f"history_{name}"] = array
+
+    arrays["demand"] = np.zeros((len(all_wd_data), len(day_to_int), num_shifts, num_skills, 2), dtype=np.int16)
+    arrays["requested_off"] = np.zeros((len(all_wd_data), num_nurses, len(day_to_int), num_shifts), dtype=bool)
+    for week, wd_data in enumerate(all_wd_data):
+        for req in wd_data["requirements"]:
+            for day, day_name in enumerate(day_to_int):
+                requirement = req[f"requirementOn{day_name}"]
+                cell = arrays["demand"][week, day, shift_to_int[req["shiftType"]], skill_to_int[req["skill"]]]
+                np.maximum(cell, [requirement["minimum"], requirement["optimal"]], out=cell)
+        for preference in wd_data["shiftOffRequests"]:
+            nurse_id = int(preference["nurse"].split("_")[1])
+            shift_id = shift_to_int[preference["shiftType"]]
+            shifts = slice(None) if shift_id == shift_to_int["Any"] else shift_id
+            arrays["requested_off"][week, nurse_id, day_to_int[preference["day"]], shifts] = True
+    return arrays
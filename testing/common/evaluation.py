@@ -0,0 +1,138 @@
+#!/usr/bin/python
+
+import numpy as np
+
+from common.dataset import get_history_arrays
+
+# Soft constraint families of INRC-II with their weights. Families evaluated per day are reported
+# for every week, the total assignments and total working weekends only for the whole horizon.
+weights = {
+    "coverage": 30,
+    "consecutive_working_days": 30,
+    "consecutive_days_off": 30,
+    "consecutive_shifts": 15,
+    "preferences": 10,
+    "complete_weekends": 30,
+    "total_assignments": 20,
+    "total_working_weekends": 30,
+}
+
+def get_horizon_coverage(constants, number_weeks, level):
+    """
+    Returns array (days of all weeks x shifts x skills) of coverage of the first 'number_weeks' weeks,
+    'level' is "minimum" or "optimal".
+    """
+
+    demand = constants["instance"].demand[:number_weeks, ..., ["minimum", "optimal"].index(level)]
+    return demand.reshape(-1, constants["num_shifts"], constants["num_skills"]).astype(int)
+
+def get_evaluation_data(constants, history_data, number_weeks):
+    """
+    Collects arrays of the scenario, the week data of the first 'number_weeks' weeks and the history at their start.
+    Returns a dictionary 'evaluation_data'.
+    """
+
+    instance = constants["instance"]
+    history = get_history_arrays(history_data, constants["num_shifts"])
+    num_shifts = constants["num_shifts"]
+    # weeks x nurses x days x shifts to nurses x days of all weeks x shifts
+    requested_off = instance.requested_off[:number_weeks].transpose(1, 0, 2, 3).reshape(constants["num_nurses"], -1, num_shifts)
+
+    evaluation_data = {}
+    evaluation_data["num_weeks"] = number_weeks
+    evaluation_data["optimal"] = get_horizon_coverage(constants, number_weeks, "optimal")
+    evaluation_data["requested_off"] = requested_off
+    evaluation_data["min_working_days"] = instance.min_consecutive_working_days.astype(int)
+    evaluation_data["max_working_days"] = instance.max_consecutive_working_days.astype(int)
+    evaluation_data["min_days_off"] = instance.min_consecutive_days_off.astype(int)
+    evaluation_data["max_days_off"] = instance.max_consecutive_days_off.astype(int)
+    evaluation_data["min_shifts"] = instance.shift_min_consecutive.astype(int)
+    evaluation_data["max_shifts"] = instance.shift_max_consecutive.astype(int)
+    evaluation_data["min_assignments"] = instance.min_assignments.astype(int)
+    evaluation_data["max_assignments"] = instance.max_assignments.astype(int)
+    evaluation_data["max_working_weekends"] = instance.max_working_weekends.astype(int)
+    evaluation_data["complete_weekends"] = instance.complete_weekends
+    evaluation_data["history_working_days"] = history["consecutive_working_days"].astype(int)
+    evaluation_data["history_days_off"] = history["consecutive_days_off"].astype(int)
+    evaluation_data["history_shifts"] = np.where(history["last_shift"][:, None] == np.arange(num_shifts), history["consecutive_shifts"][:, None].astype(int), 0)
+    evaluation_data["history_assignments"] = history["assignments"].astype(int)
+    evaluation_data["history_working_weekends"] = history["working_weekends"].astype(int)
+    return evaluation_data
+
+def series_penalties(series, history_length, minimal, maximal):
+    """
+    Evaluates series of consecutive True values in boolean array 'series' (... x days), continuing 'history_length'
+    True values before the first day. Every day of a series over 'maximal' costs 1 on that day, a series shorter than
+    'minimal' costs the missing days on its last day (a series from the history ending before the first day on the
+    first day). The last series of the evaluated days is not penalized for its length under 'minimal'.
+    Returns array (... x days) of penalties.
+    """
+
+    num_days = series.shape[-1]
+    days = np.arange(num_days)
+    history_length = np.broadcast_to(history_length, series.shape[:-1])
+    # length of the series ending on every day, counted from the last day without the series
+    last_break = np.maximum.accumulate(np.where(series, -1 - history_length[..., None], days), axis=-1)
+    length = np.where(series, days - last_break, 0)
+
+    penalties = np.where(series & (length > maximal[..., None]), 1, 0)
+    ends = series & ~np.concatenate([series[..., 1:], np.ones(series.shape[:-1] + (1,), dtype=bool)], axis=-1)
+    penalties += np.where(ends, np.maximum(0, minimal[..., None] - length), 0)
+    history_ended = (history_length > 0) & ~series[..., 0]
+    penalties[..., 0] += np.where(history_ended, np.maximum(0, minimal - history_length), 0)
+    return penalties
+
+def evaluate_schedules(schedules, evaluation_data):
+    """
+    Evaluates INRC-II soft constraints of one schedule (nurses x days x shifts x skills) or a batch of schedules
+    (batch x nurses x days x shifts x skills) covering the weeks of 'evaluation_data'.
+    Returns dictionary of penalties (already weighted) keyed by family, arrays (batch x weeks) for the families evaluated
+    per day and (batch) for the whole horizon families, and under "weeks" and "total" the sums; the batch axis is dropped
+    for a single schedule.
+    """
+
+    schedules = np.asarray(schedules, dtype=bool)
+    single = schedules.ndim == 4
+    if single:
+        schedules = schedules[None]
+    batch, num_nurses, num_days, num_shifts, num_skills = schedules.shape
+    num_weeks = evaluation_data["num_weeks"]
+
+    def by_week(penalties_by_day):
+        return penalties_by_day.reshape(batch, -1, num_weeks, 7).sum(axis=(1, 3))
+
+    shifts = schedules.any(axis=4)
+    working = shifts.any(axis=3)
+
+    penalties = {}
+    coverage = schedules.sum(axis=1)
+    penalties["coverage"] = np.maximum(0, evaluation_data["optimal"][None] - coverage).reshape(batch, num_weeks, -1).sum(axis=2)
+    penalties["preferences"] = by_week((shifts & evaluation_data["requested_off"][None]).sum(axis=3))
+    penalties["consecutive_working_days"] = by_week(series_penalties(working, evaluation_data["history_working_days"], evaluation_data["min_working_days"], evaluation_data["max_working_days"]))
+    penalties["consecutive_days_off"] = by_week(series_penalties(~working, evaluation_data["history_days_off"], evaluation_data["min_days_off"], evaluation_data["max_days_off"]))
+    shift_series = np.moveaxis(shifts, 3, 2)
+    shift_penalties = series_penalties(shift_series, evaluation_data["history_shifts"], np.broadcast_to(evaluation_data["min_shifts"], (num_nurses, num_shifts)), np.broadcast_to(evaluation_data["max_shifts"], (num_nurses, num_shifts)))
+    penalties["consecutive_shifts"] = by_week(shift_penalties.sum(axis=2))
+    weekends = working.reshape(batch, num_nurses, num_weeks, 7)[..., 5:]
+    penalties["complete_weekends"] = ((weekends[..., 0] != weekends[..., 1]) & evaluation_data["complete_weekends"][None, :, None]).sum(axis=1)
+
+    assignments = evaluation_data["history_assignments"] + working.sum(axis=2)
+    penalties["total_assignments"] = (np.maximum(0, evaluation_data["min_assignments"] - assignments) + np.maximum(0, assignments - evaluation_data["max_assignments"])).sum(axis=1)
+    working_weekends = evaluation_data["history_working_weekends"] + weekends.any(axis=3).sum(axis=2)
+    penalties["total_working_weekends"] = np.maximum(0, working_weekends - evaluation_data["max_working_weekends"]).sum(axis=1)
+
+    penalties = {family: weights[family] * value for family, value in penalties.items()}
+    penalties["weeks"] = sum(value for value in penalties.values() if value.ndim == 2)
+    penalties["total"] = penalties["weeks"].sum(axis=1) + penalties["total_assignments"] + penalties["total_working_weekends"]
+    if single:
+        penalties = {family: value[0] for family, value in penalties.items()}
+    return penalties
+
+def evaluate_results(results, constants, history_data, number_weeks):
+    """
+    Evaluates the schedule accumulated in 'results' for 'number_weeks' weeks starting with 'history_data'.
+    Returns dictionary of penalties as 'evaluate_schedules' does for a single schedule.
+    """
+
+    evaluation_data = get_evaluation_data(constants, history_data, number_weeks)
+    return evaluate_schedules(results.get_schedule(number_weeks), evaluation_data)
@@ -0,0 +1,44 @@
+#!/usr/bin/python
+
+import numpy as np
+
+int_to_shift = ["Early", "Day", "Late", "Night", "Any", "None"]
+
+def trailing_run_length(series):
+    """
+    Returns for every row of boolean array 'series' (nurses x days) the number of True values at the end of the row.
+    """
+
+    reversed_series = series[:, ::-1]
+    return np.where(reversed_series.all(axis=1), series.shape[1], np.argmin(reversed_series, axis=1))
+
+def update_history(history_data, shifts, working_weekends):
+    """
+    Updates history of every nurse after one week with the computed schedule.
+    'shifts' is 0/1 array (nurses x days x shifts) of assigned shifts, 'working_weekends' 0/1 array (nurses) of worked weekends.
+    """
+
+    shifts = np.asarray(shifts, dtype=bool)
+    working_days = shifts.any(axis=2)
+    num_nurses, num_days, _ = shifts.shape
+
+    number_of_assignments = working_days.sum(axis=1)
+    consecutive_days_off = trailing_run_length(~working_days)
+    consecutive_working_days = trailing_run_length(working_days)
+    last_shift = np.argmax(shifts[:, num_days - 1, :], axis=1)
+    consecutive_shifts = trailing_run_length(shifts[np.arange(num_nurses), :, last_shift])
+    works_last_day = working_days[:, num_days - 1]
+
+    for n, nurse_history in enumerate(history_data["nurseHistory"]):
+        nurse_history["numberOfAssignments"] += int(number_of_assignments[n])
+        nurse_history["numberOfWorkingWeekends"] += int(working_weekends[n])
+        if works_last_day[n]:
+            nurse_history["numberOfConsecutiveWorkingDays"] = int(consecutive_working_days[n])
+            nurse_history["numberOfConsecutiveDaysOff"] = 0
+            nurse_history["lastAssignedShiftType"] = int_to_shift[last_shift[n]]
+            nurse_history["numberOfConsecutiveAssignments"] = int(consecutive_shifts[n])
+        else:
+            nurse_history["numberOfConsecutiveDaysOff"] = int(consecutive_days_off[n])
+            nurse_history["numberOfConsecutiveWorkingDays"] = 0
+            nurse_history["numberOfConsecutiveAssignments"] = 0
+            nurse_history["lastAssignedShiftType"] = "None"
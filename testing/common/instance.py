@@ -0,0 +1,90 @@
+#!/usr/bin/python
+
+from common.dataset import get_history_arrays
+
+class Instance:
+    """
+    Instance data as typed arrays, built once by 'load_data' from the arrays of 'get_instance_arrays'.
+    Contract limits, skills and history are indexed by nurse, shift limits by shift. Demand and requested shifts off
+    are kept for all weeks, 'week_demand' and 'week_requested_off' give those of the current week set by 'set_week'
+    together with the history at its start.
+    """
+
+    __slots__ = (
+        "num_nurses", "num_shifts", "num_skills", "num_days", "num_weeks", "week_number",
+        "nurse_skills", "nurse_contract",
+        "min_assignments", "max_assignments",
+        "min_consecutive_working_days", "max_consecutive_working_days",
+        "min_consecutive_days_off", "max_consecutive_days_off",
+        "max_working_weekends", "complete_weekends",
+        "shift_min_consecutive", "shift_max_consecutive", "forbidden_successions",
+        "demand", "requested_off",
+        "history_assignments", "history_working_weekends", "history_last_shift",
+        "history_consecutive_shifts", "history_consecutive_working_days", "history_consecutive_days_off",
+    )
+
+    def __init__(self, arrays):
+        self.num_nurses, self.num_skills = arrays["nurse_skills"].shape
+        self.num_weeks, self.num_days, self.num_shifts = arrays["demand"].shape[:3]
+        self.week_number = 0
+
+        self.nurse_skills = arrays["nurse_skills"]
+        self.nurse_contract = arrays["nurse_contract"]
+        contract = self.nurse_contract.astype(int)
+        self.min_assignments = arrays["contract_min_assignments"][contract]
+        self.max_assignments = arrays["contract_max_assignments"][contract]
+        self.min_consecutive_working_days = arrays["contract_min_consecutive_working_days"][contract]
+        self.max_consecutive_working_days = arrays["contract_max_consecutive_working_days"][contract]
+        self.min_consecutive_days_off = arrays["contract_min_consecutive_days_off"][contract]
+        self.max_consecutive_days_off = arrays["contract_max_consecutive_days_off"][contract]
+        self.max_working_weekends = arrays["contract_max_working_weekends"][contract]
+        self.complete_weekends = arrays["contract_complete_weekends"][contract] == 1
+
+        self.shift_min_consecutive = arrays["shift_min_consecutive"]
+        self.shift_max_consecutive = arrays["shift_max_consecutive"]
+        self.forbidden_successions = arrays["forbidden_successions"]
+        # weeks x days x shifts x skills x (minimum, optimal)
+        self.demand = arrays["demand"]
+        # weeks x nurses x days x shifts
+        self.requested_off = arrays["requested_off"]
+
+        self.history_assignments = arrays["history_assignments"]
+        self.history_working_weekends = arrays["history_working_weekends"]
+        self.history_last_shift = arrays["history_last_shift"]
+        self.history_consecutive_shifts = arrays["history_consecutive_shifts"]
+        self.history_consecutive_working_days = arrays["history_consecutive_working_days"]
+        self.history_consecutive_days_off = arrays["history_consecutive_days_off"]
+
+    def set_week(self, week_number, history_data):
+        """
+        Makes 'week_number' the current week and takes the history at its start from 'history_data'.
+        """
+
+        self.week_number = week_number
+        for name, array in get_history_arrays(history_data, self.num_shifts).items():
+            setattr(self, f"history_{name}", array)
+
+    @property
+    def week_demand(self):
+        """
+        Demand of the current week (days x shifts x skills x (minimum, optimal)).
+        """
+
+        return self.demand[self.week_number]
+
+    @property
+    def week_requested_off(self):
+        """
+        Boolean array (nurses x days x shifts) of shifts requested off in the current week.
+        """
+
+        return self.requested_off[self.week_number]
+
+def get_week_instance(constants, week_number):
+    """
+    Returns the 'Instance' of 'constants' set to week 'week_number' with the current history.
+    """
+
+    instance = constants["instance"]
+    instance.set_week(week_number, constants["h0_data"])
+    return instance
@@ -0,0 +1,284 @@
+#!/usr/bin/python
+
+import copy
+import math
+import time
+
+import numpy as np
+
+from common.history import update_history
+from common.instance import get_week_instance
+from common.schedule_store import encode_schedule, decode_schedule
+
+# Local search on a compact schedule of one week: array (nurses x days) of int8 codes,
+# 0 for a day off and 1 + shift * num_skills + skill for an assignment.
+# Costs follow the week objective of the CP-SAT model (the same weights, the same counting of violations and
+# the same per week limits of the whole horizon), every move is evaluated only on the rows of the nurses it changes.
+
+def get_week_objective_data(constants):
+    """
+    Collects arrays needed to evaluate the week objective of the current week and history from the 'Instance'
+    of 'constants'. Returns a dictionary 'objective_data' of int arrays, so costs do not overflow the small types.
+    """
+
+    instance = constants["instance"]
+    prev_working_days = instance.history_consecutive_working_days.astype(int)
+
+    objective_data = {}
+    objective_data["num_shifts"] = constants["num_shifts"]
+    objective_data["num_skills"] = constants["num_skills"]
+    objective_data["requested_off"] = instance.week_requested_off
+    objective_data["weekends_history"] = instance.history_working_weekends.astype(int)
+    objective_data["weekends_limit"] = instance.max_working_weekends.astype(int)
+    objective_data["complete_weekends"] = instance.complete_weekends
+    objective_data["upper_limit"] = np.ceil(instance.max_assignments / 4).astype(int) + 1
+    objective_data["lower_limit"] = np.ceil(instance.min_assignments / 4).astype(int) - 1
+    objective_data["max_working_days"] = instance.max_consecutive_working_days.astype(int)
+    objective_data["max_days_off"] = instance.max_consecutive_days_off.astype(int)
+    objective_data["min_working_days"] = instance.min_consecutive_working_days.astype(int)
+    objective_data["min_days_off"] = instance.min_consecutive_days_off.astype(int)
+    # working days in the first days of the week continuing the series of the previous week
+    objective_data["prev_week_days"] = np.where(prev_working_days > 0, np.minimum(prev_working_days, objective_data["max_working_days"]), 0)
+    objective_data["max_shifts"] = instance.shift_max_consecutive.astype(int)
+    objective_data["min_shifts"] = instance.shift_min_consecutive.astype(int)
+    objective_data["minimal"] = instance.week_demand[..., 0].astype(int)
+    objective_data["optimal"] = instance.week_demand[..., 1].astype(int)
+    objective_data["has_skill"] = instance.nurse_skills
+    objective_data["last_shift"] = instance.history_last_shift.astype(int)
+    objective_data["forbidden"] = instance.forbidden_successions
+    return objective_data
+
+def count_full_windows(cumulative, length):
+    """
+    For every row of prefix sums 'cumulative' (rows x days + 1) counts windows of 'length' (rows) days all counted.
+    """
+
+    num_days = cumulative.shape[1] - 1
+    ends = np.arange(num_days)[None, :] + length[:, None]
+    sums = np.take_along_axis(cumulative, np.minimum(ends, num_days), axis=1) - cumulative[:, :num_days]
+    return ((ends <= num_days) & (sums == length[:, None])).sum(axis=1)
+
+def nurse_week_costs(rows, nurses, objective_data):
+    """
+    Returns costs (rows) of week schedules 'rows' (rows x days of codes) of 'nurses' (rows) without the coverage.
+    """
+
+    num_shifts = objective_data["num_shifts"]
+    num_skills = objective_data["num_skills"]
+    rows = np.asarray(rows, dtype=int)
+    num_rows, num_days = rows.shape
+
+    working = rows > 0
+    days_off = ~working
+    shifts = working[:, :, None] & (((rows - 1) // num_skills)[:, :, None] == np.arange(num_shifts))
+    working_weekend = working[:, 5] | working[:, 6]
+    total = working.sum(axis=1)
+
+    def prefix_sums(values):
+        return np.concatenate([np.zeros(values.shape[:1] + (1,) + values.shape[2:], dtype=int), np.cumsum(values, axis=1)], axis=1)
+
+    cumulative_working = prefix_sums(working)
+    cumulative_days_off = prefix_sums(days_off)
+    cumulative_shifts = prefix_sums(shifts)
+
+    cost = 10 * (shifts & objective_data["requested_off"][nurses]).sum(axis=(1, 2))
+    cost += 30 * np.abs(working_weekend + objective_data["weekends_history"][nurses] - objective_data["weekends_limit"][nurses])
+    cost += 30 * (objective_data["complete_weekends"][nurses] & (working[:, 5] != working[:, 6]))
+    cost += 20 * np.maximum(0, total - objective_data["upper_limit"][nurses])
+    cost += 20 * np.maximum(0, objective_data["lower_limit"][nurses] - total)
+    cost += 30 * count_full_windows(cumulative_working, objective_data["max_working_days"][nurses] + 1)
+    cost += 30 * (working & (np.arange(num_days) < objective_data["prev_week_days"][nurses][:, None])).sum(axis=1)
+    cost += 30 * count_full_windows(cumulative_days_off, objective_data["max_days_off"][nurses] + 1)
+    for s in range(num_shifts):
+        cost += 15 * count_full_windows(cumulative_shifts[:, :, s], np.full(num_rows, objective_data["max_shifts"][s] + 1))
+
+    # series of 'dd' days ending before day 'd' and bounded by the opposite on both sides
+    longest = max(objective_data["min_days_off"].max(), objective_data["min_working_days"].max(), objective_data["min_shifts"].max()) - 1
+    for dd in range(1, min(longest, num_days - 2) + 1):
+        d = np.arange(dd + 1, num_days)
+        before = d - dd - 1
+        days_off_series = cumulative_days_off[:, d] - cumulative_days_off[:, d - dd] == dd
+        working_series = cumulative_working[:, d] - cumulative_working[:, d - dd] == dd
+        short_days_off = (working[:, d] & days_off_series & working[:, before]).sum(axis=1)
+        short_working = (days_off[:, d] & working_series & days_off[:, before]).sum(axis=1)
+        short_shifts = (~shifts[:, d, :] & working_series[:, :, None] & ~shifts[:, before, :]).sum(axis=1)
+        cost += 30 * dd * short_days_off * (dd < objective_data["min_days_off"][nurses])
+        cost += 30 * dd * short_working * (dd < objective_data["min_working_days"][nurses])
+        cost += 15 * dd * (short_shifts * (dd < objective_data["min_shifts"])).sum(axis=1)
+    return cost
+
+def get_coverage_counts(codes, num_codes):
+    """
+    Returns array (days x codes) with the number of nurses assigned to every code on every day.
+    """
+
+    num_days = codes.shape[1]
+    return np.array([np.bincount(codes[:, d].astype(int), minlength=num_codes) for d in range(num_days)])
+
+def coverage_cost(counts, objective_data):
+    """
+    Returns cost of insufficient staffing under the optimal coverage for coverage 'counts' (days x codes).
+    """
+
+    optimal = objective_data["optimal"].reshape(counts.shape[0], -1)
+    return 30 * int(np.maximum(0, optimal - counts[:, 1:]).sum())
+
+def week_objective(codes, objective_data):
+    """
+    Returns the week objective of schedule 'codes' (nurses x days).
+    """
+
+    num_codes = objective_data["num_shifts"] * objective_data["num_skills"] + 1
+    nurse_costs = nurse_week_costs(codes, np.arange(codes.shape[0]), objective_data)
+    return int(nurse_costs.sum()) + coverage_cost(get_coverage_counts(codes, num_codes), objective_data)
+
+def local_search(codes, constants, time_limit, seed=0, initial_temperature=30.0, final_temperature=1.0):
+    """
+    Improves feasible schedule 'codes' (nurses x days) of the current week by simulated annealing.
+    Moves change the assignment (shift and skill or a day off) of one nurse on one day to the best allowed one
+    or swap assignments of two nurses on one day; minimal coverage, skills and successions are kept.
+    Returns the best schedule found and a dictionary of statistics.
+    """
+
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    objective_data = get_week_objective_data(constants)
+    num_shifts = objective_data["num_shifts"]
+    num_skills = objective_data["num_skills"]
+    num_codes = num_shifts * num_skills + 1
+    num_nurses, num_days = codes.shape
+
+    # code properties, code 0 (day off) has shift -1
+    code_shift = np.concatenate([[-1], np.repeat(np.arange(num_shifts), num_skills)])
+    code_skill = np.concatenate([[-1], np.tile(np.arange(num_skills), num_shifts)])
+    allowed_code = np.concatenate([np.ones((num_nurses, 1), dtype=bool), objective_data["has_skill"][:, code_skill[1:]]], axis=1)
+    forbidden = np.zeros((num_shifts + 1, num_shifts + 1), dtype=bool)
+    forbidden[:num_shifts, :num_shifts] = objective_data["forbidden"]
+    minimal = np.concatenate([np.zeros((num_days, 1), dtype=int), objective_data["minimal"].reshape(num_days, -1)], axis=1)
+    optimal = np.concatenate([np.zeros((num_days, 1), dtype=int), objective_data["optimal"].reshape(num_days, -1)], axis=1)
+    last_shift = objective_data["last_shift"]
+
+    codes = np.array(codes, dtype=int)
+    counts = get_coverage_counts(codes, num_codes)
+    nurse_costs = nurse_week_costs(codes, np.arange(num_nurses), objective_data)
+    cost = int(nurse_costs.sum()) + coverage_cost(counts, objective_data)
+    initial_cost = cost
+    best_codes, best_cost = codes.copy(), cost
+
+    def shift_before(n, d):
+        return code_shift[codes[n, d - 1]] if d > 0 else last_shift[n]
+
+    def shift_after(n, d):
+        return code_shift[codes[n, d + 1]] if d + 1 < num_days else -1
+
+    def successions_allowed(n, d, new_codes):
+        new_shifts = code_shift[new_codes]
+        return ~forbidden[shift_before(n, d), new_shifts] & ~forbidden[new_shifts, shift_after(n, d)]
+
+    moves = 0
+    accepted = 0
+    temperature = initial_temperature
+    while True:
+        if moves % 50 == 0:
+            elapsed = time.perf_counter() - start
+            if elapsed >= time_limit:
+                break
+            temperature = initial_temperature * (final_temperature / initial_temperature) ** (elapsed / time_limit)
+        moves += 1
+        d = rng.integers(num_days)
+
+        if rng.random() < 0.5:
+            # change of the assignment of one nurse
+            n = rng.integers(num_nurses)
+            old = codes[n, d]
+            if old > 0 and counts[d, old] <= minimal[d, old]:
+                continue
+            candidates = np.flatnonzero(allowed_code[n] & successions_allowed(n, d, np.arange(num_codes)))
+            candidates = candidates[candidates != old]
+            if len(candidates) == 0:
+                continue
+            rows = np.repeat(codes[n][None, :], len(candidates), axis=0)
+            rows[:, d] = candidates
+            nurse_delta = nurse_week_costs(rows, np.full(len(candidates), n), objective_data) - nurse_costs[n]
+            coverage_delta = 30 * ((old > 0) & (counts[d, old] <= optimal[d, old])) - 30 * ((candidates > 0) & (counts[d, candidates] < optimal[d, candidates]))
+            delta = nurse_delta + coverage_delta
+            best = np.argmin(delta)
+            if delta[best] > 0 and rng.random() >= math.exp(-delta[best] / temperature):
+                continue
+            new = candidates[best]
+            nurse_costs[n] += nurse_delta[best]
+            counts[d, old] -= 1
+            counts[d, new] += 1
+            codes[n, d] = new
+            cost += int(delta[best])
+        else:
+            # swap of the assignments of two nurses
+            n1, n2 = rng.choice(num_nurses, 2, replace=False)
+            code1, code2 = codes[n1, d], codes[n2, d]
+            if code1 == code2 or not allowed_code[n1, code2] or not allowed_code[n2, code1]:
+                continue
+            if not successions_allowed(n1, d, code2) or not successions_allowed(n2, d, code1):
+                continue
+            rows = codes[[n1, n2]].copy()
+            rows[0, d], rows[1, d] = code2, code1
+            new_costs = nurse_week_costs(rows, np.array([n1, n2]), objective_data)
+            delta = int(new_costs.sum() - nurse_costs[n1] - nurse_costs[n2])
+            if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+                continue
+            codes[n1, d], codes[n2, d] = code2, code1
+            nurse_costs[n1], nurse_costs[n2] = new_costs
+            cost += delta
+
+        accepted += 1
+        if cost < best_cost:
+            best_codes, best_cost = codes.copy(), cost
+
+    statistics = {}
+    statistics["initial"] = initial_cost
+    statistics["final"] = best_cost
+    statistics["improvement"] = initial_cost - best_cost
+    statistics["moves"] = moves
+    statistics["accepted"] = accepted
+    statistics["time"] = time.perf_counter() - start
+    return best_codes.astype(np.int8), statistics
+
+def search_week_schedule(results, constants, week_number, history_data, time_limit):
+    """
+    Runs the local search from the schedule of week 'week_number' stored in 'results', 'history_data' is the history
+    from the start of the week. Statistics are stored under (week_number, "local_search").
+    Returns the improved schedule (nurses x days x shifts x skills) or None if the schedule is not improved.
+    """
+
+    schedule = results.get_week(week_number)
+    if schedule is None:
+        return None
+
+    constants_of_week = dict(constants)
+    constants_of_week["h0_data"] = history_data
+    get_week_instance(constants_of_week, week_number)
+    codes, statistics = local_search(encode_schedule(schedule), constants_of_week, time_limit)
+    results[(week_number, "local_search")] = statistics
+    if statistics["improvement"] <= 0:
+        return None
+    return decode_schedule(codes, constants["num_shifts"], constants["num_skills"])
+
+def improve_week_schedule(results, constants, week_number, history_data, time_limit):
+    """
+    Polishes the schedule of week 'week_number' stored in 'results' by the local search. 'history_data' is the history
+    from the start of the week. An improved schedule replaces the stored one, the value of the week decreases by the
+    improvement and the history in 'constants' is recomputed. Statistics are stored under (week_number, "local_search").
+    The value is the week objective of the local search, the CPLEX backend evaluates the schedule by its own model
+    (see 'polish_week_schedule' in 'ibm/nsp_cplex.py').
+    """
+
+    improved = search_week_schedule(results, constants, week_number, history_data, time_limit)
+    if improved is None:
+        return
+
+    results.set_week(week_number, improved)
+    results[(week_number, "value")] -= results[(week_number, "local_search")]["improvement"]
+
+    new_history_data = copy.deepcopy(history_data)
+    working_days = improved.any(axis=(2, 3))
+    update_history(new_history_data, improved.any(axis=3), working_days[:, 5] | working_days[:, 6])
+    constants["h0_data"]["nurseHistory"] = new_history_data["nurseHistory"]
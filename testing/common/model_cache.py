@@ -0,0 +1,102 @@
+#!/usr/bin/python
+
+import hashlib
+import json
+import os
+import tempfile
+
+# Cache of built week models stored on disk, enabled by option 'model_cache' with the directory of the cache.
+# Every entry consists of files '<key><suffix>' where key is a hash of the loaded data, the current history,
+# the options changing the model and the formulation version of the backend. Least recently used entries are removed when the cache
+# is larger than option 'model_cache_size' (in MB).
+
+default_model_cache_size = 1024
+
+# options changing the built model, other options (time limits, threads, warm starts, ...) share its entry
+model_options = ["presolve", "cp_sat_skeleton", "cplex_builder", "cplex_persistent", "symmetry_breaking"]
+
+def get_model_cache(constants):
+    """
+    Returns dictionary describing the model cache of the current run or None if the cache is not enabled.
+    """
+
+    options = constants["options"]
+    if not options.get("model_cache"):
+        return None
+
+    if "model_cache" not in constants:
+        directory = options["model_cache"] if options["model_cache"] is not True else os.path.join("outputs", "model_cache")
+        os.makedirs(directory, exist_ok=True)
+        model_cache = {}
+        model_cache["directory"] = directory
+        model_cache["max_size"] = float(options.get("model_cache_size", default_model_cache_size)) * 1024 * 1024
+        model_cache["hits"] = 0
+        model_cache["misses"] = 0
+        constants["model_cache"] = model_cache
+    return constants["model_cache"]
+
+def get_model_cache_key(constants, week_number, backend, formulation_version):
+    """
+    Returns hash of everything the model of the current week is built from.
+    """
+
+    options = {name: constants["options"][name] for name in model_options if name in constants["options"]}
+    content = [backend, formulation_version, week_number, options, constants["sc_data"], constants["h0_data"], constants["wd_data"]]
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+def load_from_model_cache(model_cache, key, suffixes):
+    """
+    Looks up entry 'key' consisting of files with given suffixes and counts the hit or miss.
+    Returns dictionary of paths keyed by suffixes or None if the entry is not in the cache.
+    """
+
+    paths = {suffix: os.path.join(model_cache["directory"], key + suffix) for suffix in suffixes}
+    if not all(os.path.isfile(path) for path in paths.values()):
+        model_cache["misses"] += 1
+        return None
+
+    model_cache["hits"] += 1
+    for path in paths.values():
+        os.utime(path)
+    return paths
+
+def store_in_model_cache(model_cache, key, writers):
+    """
+    Stores entry 'key', 'writers' is a dictionary of functions writing a file with given path keyed by suffixes.
+    Files are written under temporary names of the process first, so an interrupted write never leaves an incomplete
+    entry and processes storing the same entry at once do not write the same file.
+    """
+
+    for suffix, write in writers.items():
+        descriptor, temporary_path = tempfile.mkstemp(dir=model_cache["directory"], prefix=key + ".tmp.", suffix=suffix)
+        os.close(descriptor)
+        try:
+            write(temporary_path)
+            os.replace(temporary_path, os.path.join(model_cache["directory"], key + suffix))
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+    evict_model_cache(model_cache)
+
+def evict_model_cache(model_cache):
+    """
+    Removes least recently used entries until the cache fits into its maximal size.
+    """
+
+    directory = model_cache["directory"]
+    entries = {}
+    for file_name in os.listdir(directory):
+        if ".tmp." in file_name:
+            continue
+        path = os.path.join(directory, file_name)
+        key = file_name.split(".")[0]
+        last_used, size, paths = entries.get(key, (0, 0, []))
+        entries[key] = (max(last_used, os.path.getmtime(path)), size + os.path.getsize(path), paths + [path])
+
+    total_size = sum(size for _, size, _ in entries.values())
+    for last_used, size, paths in sorted(entries.values()):
+        if total_size <= model_cache["max_size"]:
+            break
+        for path in paths:
+            os.remove(path)
+        total_size -= size
@@ -0,0 +1,98 @@
+#!/usr/bin/python
+
+import numpy as np
+
+def get_allowed_shifts(constants):
+    """
+    Returns boolean array (nurses x days x shifts) with False for a shift forbidden on the first day
+    by the last shift of the history.
+    """
+
+    instance = constants["instance"]
+    last_shift = instance.history_last_shift
+    allowed = np.ones((constants["num_nurses"], constants["num_days"], constants["num_shifts"]), dtype=bool)
+    allowed[:, 0] = ~((last_shift[:, None] >= 0) & instance.forbidden_successions[np.maximum(last_shift, 0)])
+    return allowed
+
+def get_maximum_assignment(eligible, demand):
+    """
+    Assigns nurses to cells, every nurse to at most one cell it is 'eligible' for (nurses x cells)
+    and at most 'demand' nurses to a cell, maximizing the number of assigned nurses (augmenting paths).
+    Returns array (cells) of the number of nurses assigned to every cell.
+    """
+
+    assigned = [[] for _ in range(len(demand))]
+    eligible_cells = [np.flatnonzero(row).tolist() for row in eligible]
+
+    def augment(n, visited):
+        for c in eligible_cells[n]:
+            if visited[c]:
+                continue
+            visited[c] = True
+            if len(assigned[c]) < demand[c]:
+                assigned[c].append(n)
+                return True
+            for i, m in enumerate(assigned[c]):
+                if augment(m, visited):
+                    assigned[c][i] = n
+                    return True
+        return False
+
+    total_demand = demand.sum()
+    matched = 0
+    for n in range(len(eligible)):
+        if matched == total_demand:
+            break
+        if eligible_cells[n] and augment(n, [False] * len(demand)):
+            matched += 1
+    return np.array([len(nurses) for nurses in assigned])
+
+def check_week_capacity(constants):
+    """
+    Checks that the minimal coverage of the current week can be met at all: for every day, shift and skill there have to be
+    enough nurses with the skill allowed to work the shift after their history, and for every day the nurses have to be
+    assignable to all minimal demands at once with one shift per nurse.
+    Returns list of problems, each a dictionary with the "check", "day" and the "required" and "available" number of nurses
+    ("shift" and "skill" for a single demand). Empty list if no problem is found, which does not prove feasibility.
+    """
+
+    instance = constants["instance"]
+    minimal = instance.week_demand[..., 0]
+    has_skill = instance.nurse_skills
+    # eligible nurses (nurses x days x shifts x skills)
+    eligible = get_allowed_shifts(constants)[:, :, :, None] & has_skill[:, None, None, :]
+    qualified = eligible.sum(axis=0)
+
+    problems = []
+    for d, s, sk in np.argwhere(qualified < minimal).tolist():
+        problems.append({"check": "qualified_nurses", "day": d, "shift": s, "skill": sk, "required": int(minimal[d, s, sk]), "available": int(qualified[d, s, sk])})
+    if problems:
+        return problems
+
+    for d in range(constants["num_days"]):
+        demand = minimal[d].ravel()
+        required = int(demand.sum())
+        if required > constants["num_nurses"]:
+            problems.append({"check": "nurses_per_day", "day": d, "required": required, "available": constants["num_nurses"]})
+            continue
+        assignment = get_maximum_assignment(eligible[:, d].reshape(constants["num_nurses"], -1) & (demand > 0), demand)
+        if assignment.sum() < required:
+            problems.append({"check": "matching", "day": d, "required": required, "available": int(assignment.sum())})
+    return problems
+
+def set_precheck_results(results, week_number, problems):
+    """
+    Stores results of a week skipped because of 'problems' found by 'check_week_capacity'.
+    """
+
+    first = problems[0]
+    results[(week_number, "status")] = f"The problem is infeasible (precheck: {first['check']} on day {first['day']}, {first['required']} nurses required, {first['available']} available)."
+    results[(week_number, "value")] = 99999
+    results[(week_number, "allweeksoft")] = 0
+    results[("allweeksoft")] = 0
+    results[(week_number, "build")] = "skipped"
+    results[(week_number, "build_time")] = 0.0
+    results[(week_number, "solve_time")] = 0.0
+    results[(week_number, "incumbents")] = []
+    results[(week_number, "precheck")] = problems
+    return
@@ -0,0 +1,101 @@
+#!/usr/bin/python
+
+import numpy as np
+
+from common.successions import get_first_day_forbidden
+
+# Presolve of the week model shared by both solvers. Variables that are zero in some optimal solution are not created
+# and slack variables get bounds derived from the data instead of constants.
+# Reductions depending on the week (demand, shift off requests, history) are made only for a model built for one week,
+# a model reused for more weeks (CP-SAT skeleton, persistent CPLEX model) only drops what depends on the scenario.
+
+def get_presolve_data(constants, week=True):
+    """
+    Returns dictionary with boolean masks of variables that are created:
+    "shifts_with_skills" (nurses x days x shifts x skills), "insufficient_staffing" (days x shifts x skills),
+    "unsatisfied_preferences" (nurses x days x shifts) and "incomplete_weekends" (nurses), with mask "minimal_staffing"
+    (days x shifts x skills) of minimal staffing constraints that are not trivially satisfied, with dictionary
+    "upper_bounds" of arrays of bounds of slack variables and with "removed", the number of variables that are not created
+    in every family. 'week' is False for a model reused for more weeks.
+    """
+
+    instance = constants["instance"]
+    shape = (constants["num_nurses"], constants["num_days"], constants["num_shifts"], constants["num_skills"])
+    demand = instance.week_demand
+
+    # nurses work only with skills they have
+    shifts_with_skills = np.broadcast_to(instance.nurse_skills[:, None, None, :], shape).copy()
+    presolve = {"week": week, "upper_bounds": {}}
+    if week:
+        shifts_with_skills[:, 0] &= ~get_first_day_forbidden(instance)[:, :, None]
+        # a skill without demand in the shift is kept only when the nurse has no skill with demand in it,
+        # moving the assignment to a skill with demand never makes the solution worse
+        useful = shifts_with_skills & (demand > 0).any(axis=3)[None]
+        first_skill = shifts_with_skills & (np.cumsum(shifts_with_skills, axis=3) == 1)
+        shifts_with_skills = np.where(useful.any(axis=3, keepdims=True), useful, first_skill)
+
+        presolve["insufficient_staffing"] = demand[..., 1] > 0
+        # staffing can not be insufficient by more than the optimal staffing
+        presolve["upper_bounds"]["insufficient_staffing"] = demand[..., 1]
+        presolve["minimal_staffing"] = demand[..., 0] > 0
+        presolve["unsatisfied_preferences"] = instance.week_requested_off.copy()
+    else:
+        presolve["insufficient_staffing"] = np.ones(shape[1:], dtype=bool)
+        presolve["minimal_staffing"] = np.ones(shape[1:], dtype=bool)
+        presolve["unsatisfied_preferences"] = np.ones(shape[:3], dtype=bool)
+    presolve["shifts_with_skills"] = shifts_with_skills
+    presolve["incomplete_weekends"] = instance.complete_weekends.copy()
+
+    presolve["removed"] = {family: int((~presolve[family]).sum())
+                           for family in ["shifts_with_skills", "insufficient_staffing", "unsatisfied_preferences", "incomplete_weekends"]}
+    return presolve
+
+def set_presolve(constants, week=True):
+    """
+    Sets presolve data of the current week into 'constants' if option "presolve" is on, otherwise removes it.
+    Returns the presolve data or None.
+    """
+
+    presolve = get_presolve_data(constants, week) if constants["options"].get("presolve") else None
+    constants["presolve"] = presolve
+    return presolve
+
+def get_mask(constants, family, shape):
+    """
+    Returns boolean array of variables of 'family' that are created, all of them without presolve.
+    """
+
+    presolve = constants.get("presolve")
+    if presolve is None:
+        return np.ones(shape, dtype=bool)
+    return presolve[family]
+
+def get_upper_bounds(constants, family, default, shape):
+    """
+    Returns array with 'shape' of upper bounds of variables of 'family', 'default' where presolve does not derive them.
+    """
+
+    presolve = constants.get("presolve")
+    if presolve is None or family not in presolve["upper_bounds"]:
+        return np.full(shape, default)
+    return presolve["upper_bounds"][family]
+
+def is_week_presolve(constants):
+    """
+    Returns True if the model is presolved for the current week and history.
+    """
+
+    presolve = constants.get("presolve")
+    return presolve is not None and presolve["week"]
+
+def project_schedule(schedule, shifts_with_skills):
+    """
+    Moves assignments of 0/1 schedule (nurses x days x shifts x skills) with a skill whose variable is not created
+    to the first created skill of the same shift, assignments to shifts without any created variable are dropped.
+    Returns the schedule that can be used as a start of the presolved model.
+    """
+
+    schedule = np.asarray(schedule).astype(bool)
+    moved = (schedule & ~shifts_with_skills).any(axis=3)
+    first_skill = shifts_with_skills & (np.cumsum(shifts_with_skills, axis=3) == 1)
+    return np.where(moved[..., None], first_skill, schedule & shifts_with_skills).astype(int)
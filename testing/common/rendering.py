@@ -0,0 +1,81 @@
+#!/usr/bin/python
+
+import os
+from multiprocessing import Pool
+
+import numpy as np
+import matplotlib.ticker as ticker
+from matplotlib.figure import Figure
+
+# Figures are created without pyplot, so no interactive backend or window is involved
+# and rendering works in worker processes of a benchmark.
+
+skill_names = ["HeadNurse", "Nurse", "Caretaker", "Trainee", "Not working"]
+
+def get_schedule_table(codes, num_shifts, num_skills):
+    """
+    Converts array (nurses x days) of codes of a schedule to the table of the figure (nurses x days * shifts),
+    1 - 0.2 * skill in the column of the worked shift, 0 elsewhere.
+    """
+
+    codes = np.asarray(codes, dtype=int)
+    num_nurses, num_days = codes.shape
+    # column of every code, code 0 (day off) falls to a dropped column
+    columns = np.concatenate([[num_shifts], np.repeat(np.arange(num_shifts), num_skills)])
+    levels = np.concatenate([[0.0], np.tile(1 - 0.2 * np.arange(num_skills), num_shifts)])
+    table = np.zeros((num_nurses, num_days, num_shifts + 1))
+    table[np.arange(num_nurses)[:, None], np.arange(num_days), columns[codes]] = levels[codes]
+    return table[:, :, :num_shifts].reshape(num_nurses, num_days * num_shifts)
+
+def draw_schedule(fig, codes, num_shifts, num_skills, title="Schedule"):
+    """
+    Draws schedule given by array (nurses x days) of codes with the legend of skills into figure 'fig'.
+    """
+
+    schedule_table = get_schedule_table(codes, num_shifts, num_skills)
+    legend = np.zeros([1, num_skills + 1])
+    legend[0, :num_skills] = 1 - 0.2 * np.arange(num_skills)
+
+    ax0, ax1 = fig.subplots(2, 1)
+
+    # cells are embedded as an image also in vector formats
+    ax0.pcolormesh(schedule_table, rasterized=True)
+    ax0.set_title(title)
+    # a tick at the first shift of every day labelled with the day
+    ax0.xaxis.set_major_locator(ticker.MultipleLocator(num_shifts))
+    ax0.xaxis.set_major_formatter(ticker.FuncFormatter(lambda column, position: f"{column / num_shifts:g}"))
+
+    ax1.pcolor(legend, edgecolors='k', linewidths=5)
+    ax1.set_title('Legend - skills')
+    ax1.set_xticks(np.arange(num_skills + 1) + 0.5)
+    ax1.set_xticklabels(skill_names[:num_skills] + skill_names[-1:])
+
+    fig.tight_layout()
+
+def render_schedule(codes, num_shifts, num_skills, path, title="Schedule"):
+    """
+    Writes figure of schedule given by array (nurses x days) of codes to 'path', the format (png, svg, ...)
+    is given by the extension. Returns 'path'.
+    """
+
+    fig = Figure(figsize=(max(6.4, codes.shape[1] * num_shifts / 16), max(4.8, codes.shape[0] / 8)))
+    draw_schedule(fig, codes, num_shifts, num_skills, title)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fig.savefig(path)
+    return path
+
+def _render_job(job):
+    return render_schedule(*job)
+
+def render_schedules(jobs, processes=None):
+    """
+    Renders many schedules in parallel worker processes. Every job is a tuple of arguments of 'render_schedule'
+    (codes, num_shifts, num_skills, path[, title]). Returns list of written paths.
+    """
+
+    if processes == 1 or len(jobs) <= 1:
+        return [_render_job(job) for job in jobs]
+    with Pool(processes) as pool:
+        return pool.map(_render_job, jobs)
@@ -0,0 +1,142 @@
+#!/usr/bin/python
+
+from collections.abc import MutableMapping
+
+import numpy as np
+
+# Schedule of all weeks is kept as array (nurses x days of all weeks) of int8 codes,
+# 0 for a day off and 1 + shift * num_skills + skill for an assignment.
+
+def encode_schedule(schedule):
+    """
+    Converts 0/1 array (nurses x days x shifts x skills) to array (nurses x days) of codes.
+    """
+
+    num_nurses, num_days, num_shifts, num_skills = schedule.shape
+    flat = np.asarray(schedule).reshape(num_nurses, num_days, num_shifts * num_skills)
+    return np.where(flat.any(axis=2), flat.argmax(axis=2) + 1, 0).astype(np.int8)
+
+def decode_schedule(codes, num_shifts, num_skills):
+    """
+    Converts array (nurses x days) of codes to 0/1 array (nurses x days x shifts x skills).
+    """
+
+    codes = np.asarray(codes, dtype=int)
+    flat = codes[:, :, None] == np.arange(1, num_shifts * num_skills + 1)
+    return flat.reshape(codes.shape + (num_shifts, num_skills)).astype(int)
+
+class ScheduleStore(MutableMapping):
+    """
+    Results of all weeks. Keys (n, d, s, sk) of the schedule are mapped to the array of codes, keys (week, "status")
+    and (week, "value") to arrays with an item for every week, other keys are kept in a dictionary.
+    """
+
+    def __init__(self, num_nurses, num_weeks, num_shifts, num_skills, num_days=7):
+        self.num_days = num_days
+        self.num_shifts = num_shifts
+        self.num_skills = num_skills
+        self.codes = np.zeros((num_nurses, num_days * num_weeks), dtype=np.int8)
+        self.saved = np.zeros(num_weeks, dtype=bool)
+        self.status = np.full(num_weeks, None, dtype=object)
+        self.value = np.full(num_weeks, np.nan)
+        self.other = {}
+
+    def _is_cell(self, key):
+        return isinstance(key, tuple) and len(key) == 4
+
+    def _is_week_array(self, key):
+        return isinstance(key, tuple) and len(key) == 2 and key[1] in ("status", "value")
+
+    def __getitem__(self, key):
+        if self._is_cell(key):
+            n, d, s, sk = key
+            if not self.saved[d // self.num_days]:
+                raise KeyError(key)
+            return int(self.codes[n, d] == 1 + s * self.num_skills + sk)
+        if self._is_week_array(key):
+            week_number, name = key
+            if name == "status" and self.status[week_number] is not None:
+                return self.status[week_number]
+            if name == "value" and not np.isnan(self.value[week_number]):
+                return self.value[week_number].item()
+            raise KeyError(key)
+        return self.other[key]
+
+    def __setitem__(self, key, value):
+        if self._is_cell(key):
+            n, d, s, sk = key
+            code = 1 + s * self.num_skills + sk
+            if value:
+                self.codes[n, d] = code
+            elif self.codes[n, d] == code:
+                self.codes[n, d] = 0
+            self.saved[d // self.num_days] = True
+        elif self._is_week_array(key):
+            week_number, name = key
+            getattr(self, name)[week_number] = value
+        else:
+            self.other[key] = value
+
+    def __delitem__(self, key):
+        if self._is_cell(key) or self._is_week_array(key):
+            raise KeyError(f"{key} is stored in an array and can not be deleted")
+        del self.other[key]
+
+    def __iter__(self):
+        for week_number in np.flatnonzero(self.status != None).tolist():
+            yield (week_number, "status")
+        for week_number in np.flatnonzero(~np.isnan(self.value)).tolist():
+            yield (week_number, "value")
+        for week_number in np.flatnonzero(self.saved).tolist():
+            first_day = week_number * self.num_days
+            for n, d, s, sk in np.ndindex(self.codes.shape[0], self.num_days, self.num_shifts, self.num_skills):
+                yield (n, first_day + d, s, sk)
+        yield from self.other
+
+    def __len__(self):
+        cells = self.saved.sum() * self.codes.shape[0] * self.num_days * self.num_shifts * self.num_skills
+        return int((self.status != None).sum() + (~np.isnan(self.value)).sum() + cells) + len(self.other)
+
+    def __array__(self, dtype=None, copy=None):
+        codes = self.codes if dtype is None else self.codes.astype(dtype)
+        return codes.copy() if copy else codes
+
+    def set_week(self, week_number, shifts_with_skills):
+        """
+        Stores 0/1 array (nurses x days x shifts x skills) as the schedule of week 'week_number'.
+        """
+
+        self.week_codes(week_number)[:] = encode_schedule(shifts_with_skills)
+        self.saved[week_number] = True
+
+    def week_codes(self, week_number):
+        """
+        Returns view (nurses x days) of codes of week 'week_number'.
+        """
+
+        return self.codes[:, week_number * self.num_days:(week_number + 1) * self.num_days]
+
+    def get_week(self, week_number):
+        """
+        Returns 0/1 array (nurses x days x shifts x skills) of week 'week_number' or None if it was not saved.
+        """
+
+        if week_number < 0 or week_number >= len(self.saved) or not self.saved[week_number]:
+            return None
+        return decode_schedule(self.week_codes(week_number), self.num_shifts, self.num_skills)
+
+    def get_schedule(self, number_weeks=None):
+        """
+        Returns 0/1 array (nurses x days x shifts x skills) of the first 'number_weeks' weeks (all weeks by default),
+        weeks that were not saved are empty.
+        """
+
+        number_weeks = len(self.saved) if number_weeks is None else number_weeks
+        return decode_schedule(self.codes[:, :number_weeks * self.num_days], self.num_shifts, self.num_skills)
+
+def create_schedule_store(constants):
+    """
+    Returns empty 'ScheduleStore' for all weeks of the instance in 'constants'.
+    """
+
+    return ScheduleStore(constants["num_nurses"], constants["num_weeks"], constants["num_shifts"], constants["num_skills"], constants["num_days"])
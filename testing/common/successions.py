@@ -0,0 +1,40 @@
+#!/usr/bin/python
+
+import numpy as np
+
+# Forbidden successions of shift types are read from "forbiddenShiftTypeSuccessions" of the scenario
+# (Instance.forbidden_successions, preceding shift x succeeding shift) and compiled into clique rows.
+
+def get_succession_cliques(forbidden):
+    """
+    Covers forbidden successions (shifts x shifts) with cliques: every preceding shift of a clique is forbidden to be
+    followed by every succeeding shift of it, so at most one of them is worked (shifts of one day exclude each other).
+    Maximal cliques are chosen greedily by the number of successions they newly cover.
+    Returns list of pairs (preceding shifts, succeeding shifts), one row per pair of days.
+    """
+
+    num_shifts = len(forbidden)
+    cliques = []
+    for subset in range(1, 2 ** num_shifts):
+        preceding = [s for s in range(num_shifts) if subset >> s & 1]
+        succeeding = np.flatnonzero(forbidden[preceding].all(axis=0)).tolist()
+        # the clique is maximal when no other preceding shift forbids all its succeeding shifts
+        if succeeding and preceding == np.flatnonzero(forbidden[:, succeeding].all(axis=1)).tolist():
+            cliques.append((preceding, succeeding))
+
+    uncovered = np.array(forbidden, dtype=bool)
+    chosen = []
+    while uncovered.any():
+        preceding, succeeding = max(cliques, key=lambda clique: uncovered[np.ix_(*clique)].sum())
+        uncovered[np.ix_(preceding, succeeding)] = False
+        chosen.append((preceding, succeeding))
+    return chosen
+
+def get_first_day_forbidden(instance):
+    """
+    Returns boolean array (nurses x shifts) of shifts that can not be worked on the first day of the week,
+    because they can not follow the last shift of the previous week.
+    """
+
+    last_shift = instance.history_last_shift
+    return (last_shift >= 0)[:, None] & instance.forbidden_successions[np.maximum(last_shift, 0)]
@@ -0,0 +1,56 @@
+#!/usr/bin/python
+
+import numpy as np
+
+# Nurses with the same contract, skills, history and shifts requested off are interchangeable in the model of a week,
+# every permutation of their schedules has the same value. Their shift patterns are ordered lexicographically
+# so the solvers search only one of the permutations.
+
+def get_interchangeable_groups(constants):
+    """
+    Groups nurses that are interchangeable in the model of the current week.
+    Returns list of arrays of nurse indices in ascending order, only groups of at least two nurses.
+    """
+
+    instance = constants["instance"]
+    keys = np.column_stack([
+        instance.nurse_skills, instance.nurse_contract,
+        instance.history_assignments, instance.history_working_weekends, instance.history_last_shift,
+        instance.history_consecutive_shifts, instance.history_consecutive_working_days, instance.history_consecutive_days_off,
+        instance.week_requested_off.reshape(constants["num_nurses"], -1),
+    ])
+    _, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+    return [np.flatnonzero(inverse == group) for group in np.flatnonzero(counts > 1)]
+
+def get_symmetry_pairs(constants):
+    """
+    Returns list of pairs (n1, n2) of successive nurses of the interchangeable groups, the pattern of n1 is not smaller.
+    """
+
+    return [(int(n1), int(n2)) for group in get_interchangeable_groups(constants) for n1, n2 in zip(group[:-1], group[1:])]
+
+def get_pattern_weights(constants):
+    """
+    Returns array (days x shifts) of weights whose sum over the worked shifts of a nurse orders shift patterns
+    lexicographically by days, a day off is before Early, Day, ... on every day.
+    """
+
+    base = constants["num_shifts"] + 1
+    days = np.arange(constants["num_days"])
+    return base ** (constants["num_days"] - 1 - days)[:, None] * np.arange(1, base)[None, :]
+
+def order_start_schedule(schedule, constants):
+    """
+    Permutes schedules of interchangeable nurses in 0/1 schedule (nurses x days x shifts x skills) so that the start
+    satisfies the symmetry breaking constraints if option "symmetry_breaking" is on, the value of the schedule does not change.
+    Returns the permuted schedule.
+    """
+
+    if not constants["options"].get("symmetry_breaking"):
+        return schedule
+    schedule = np.array(schedule)
+    values = (schedule.any(axis=3) * get_pattern_weights(constants)).sum(axis=(1, 2))
+    for group in get_interchangeable_groups(constants):
+        schedule[group] = schedule[group[np.argsort(-values[group], kind="stable")]]
+    return schedule
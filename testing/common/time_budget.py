@@ -0,0 +1,48 @@
+#!/usr/bin/python
+
+import time
+
+import numpy as np
+
+# Time budget of a whole horizon. Every week gets the wall time left in the budget in proportion of its weight
+# to the weights of the weeks not computed yet, so time a week leaves unused (solved to optimality, skipped by the
+# precheck, ...) is carried forward to the following weeks and time spent over its limit (building the model, local search)
+# is taken from them. The weight of a week estimates the size of its model by the nurse-day pairs and the nurses
+# that can cover the cells with demand of the week. Time of the following weeks spent outside the solver is reserved
+# by the mean overhead (wall time over the allocation) of the computed weeks.
+
+def get_week_weights(constants):
+    """
+    Returns array (weeks) of weights of the weeks of the horizon.
+    """
+
+    instance = constants["instance"]
+    nurses_with_skill = instance.nurse_skills.sum(axis=0)
+    demanded = instance.demand[:constants["num_weeks"]].max(axis=-1) > 0
+    return constants["num_nurses"] * constants["num_days"] + (demanded * nurses_with_skill).sum(axis=(1, 2, 3))
+
+def create_time_budget(constants, total_time):
+    """
+    Returns dictionary 'time_budget' with the "total" wall time of the horizon in seconds, the "start" time,
+    the "weights" of the weeks and lists of "allocations" and "week_starts" of the computed weeks, the budget starts now.
+    """
+
+    return {"total": total_time, "start": time.perf_counter(), "weights": get_week_weights(constants), "allocations": [], "week_starts": []}
+
+def allocate_week_time(time_budget, week_number, min_time=1.0):
+    """
+    Returns time limit of the week in seconds, its share of the time left in the budget, at least 'min_time'.
+    """
+
+    now = time.perf_counter()
+    remaining = time_budget["total"] - (now - time_budget["start"])
+    if time_budget["week_starts"]:
+        week_times = np.diff(time_budget["week_starts"] + [now])
+        overhead = np.maximum(0.0, week_times - time_budget["allocations"]).mean()
+        remaining -= overhead * (len(time_budget["weights"]) - week_number)
+
+    weights = time_budget["weights"][week_number:]
+    allocation = max(min_time, remaining * float(weights[0]) / float(weights.sum()))
+    time_budget["allocations"].append(allocation)
+    time_budget["week_starts"].append(now)
+    return allocation
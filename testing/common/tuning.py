@@ -0,0 +1,99 @@
+#!/usr/bin/python
+
+import json
+import os
+
+import numpy as np
+
+from common.dataset import build_manifest, default_data_root
+
+# Parameters of the solvers tuned by 'tune_parameters.py', stored per backend and instance size class in a JSON file.
+# main loads the parameters of its backend and size class, the backends set them over the default solver profile
+# when no profile is selected (see 'set_solver_profile').
+
+default_tuned_parameters_file = "tuned_parameters.json"
+
+# (name, largest number of nurses) of the size classes, the last class has no limit
+size_classes = [("small", 50), ("medium", 80), ("large", None)]
+
+def get_size_class(num_nurses):
+    """
+    Returns name of the size class of an instance with 'num_nurses' nurses.
+    """
+
+    for name, max_nurses in size_classes:
+        if max_nurses is None or num_nurses <= max_nurses:
+            return name
+
+def read_tuned_parameters(tuned_parameters_file=default_tuned_parameters_file):
+    """
+    Returns dictionary of tuned parameters keyed by backend and size class, empty if the file does not exist.
+    """
+
+    if not os.path.exists(tuned_parameters_file):
+        return {}
+    with open(tuned_parameters_file) as file:
+        return json.load(file)
+
+def load_tuned_parameters(backend, num_nurses, tuned_parameters_file=default_tuned_parameters_file):
+    """
+    Returns dictionary of parameters tuned for 'backend' ("cp_sat" or "cplex") and the size class of 'num_nurses',
+    empty if they were not tuned.
+    """
+
+    return read_tuned_parameters(tuned_parameters_file).get(backend, {}).get(get_size_class(num_nurses), {}).get("parameters", {})
+
+def store_tuned_parameters(backend, size_class, entry, tuned_parameters_file=default_tuned_parameters_file):
+    """
+    Stores 'entry' (dictionary with "parameters" and information about the tuning) of 'backend' and 'size_class',
+    entries of other backends and size classes are kept.
+    """
+
+    tuned_parameters = read_tuned_parameters(tuned_parameters_file)
+    tuned_parameters.setdefault(backend, {})[size_class] = entry
+    with open(tuned_parameters_file, "w") as file:
+        json.dump(tuned_parameters, file, indent=4, sort_keys=True)
+
+def get_training_instances(size_class, number_instances, rng, data_root=default_data_root):
+    """
+    Draws 'number_instances' instances of 'size_class' from all data directories, every instance has a random history
+    and random week data files. Returns list of tuples (number_nurses, number_weeks, history_data_file_id, week_data_files_ids),
+    the ids as written in the file names.
+    """
+
+    candidates = []
+    for instance_name, entry in sorted(build_manifest(data_root).items()):
+        number_nurses, number_weeks = int(instance_name[1:4]), int(instance_name[5:])
+        histories = sorted(entry["histories"])
+        weeks = sorted(entry["weeks"])
+        if get_size_class(number_nurses) == size_class and entry["scenario"] and histories and weeks:
+            candidates.append((number_nurses, number_weeks, histories, weeks))
+
+    instances = []
+    for index in rng.choice(len(candidates), size=number_instances, replace=len(candidates) < number_instances).tolist():
+        number_nurses, number_weeks, histories, weeks = candidates[index]
+        instances.append((number_nurses, number_weeks, str(rng.choice(histories)), rng.choice(weeks, size=number_weeks).tolist()))
+    return instances
+
+def sample_configurations(space, number_configurations, rng):
+    """
+    Draws 'number_configurations' parameter sets from 'space' (dictionary of lists of values of parameters),
+    the first set is empty (the default profile), so the tuning never ends worse than the default on its training set.
+    """
+
+    configurations = [{}]
+    while len(configurations) < number_configurations:
+        configuration = {name: values[rng.integers(len(values))] for name, values in space.items()}
+        if configuration not in configurations:
+            configurations.append(configuration)
+    return configurations
+
+def get_scores(objectives):
+    """
+    Returns array (configurations) of mean ratios of the objectives (configurations x instances) to the best objective
+    of every instance, the best configuration has the lowest score.
+    """
+
+    objectives = np.asarray(objectives, dtype=float)
+    best = objectives.min(axis=0)
+    return (objectives / np.maximum(best, 1.0)).mean(axis=1)
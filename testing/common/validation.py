@@ -0,0 +1,64 @@
+#!/usr/bin/python
+
+import numpy as np
+
+from common.dataset import get_history_arrays
+from common.evaluation import get_horizon_coverage
+
+def get_validation_data(constants, history_data, number_weeks):
+    """
+    Collects arrays needed to check hard constraints of the first 'number_weeks' weeks starting with 'history_data'.
+    Returns a dictionary 'validation_data'.
+    """
+
+    instance = constants["instance"]
+    validation_data = {}
+    validation_data["minimum"] = get_horizon_coverage(constants, number_weeks, "minimum")
+    validation_data["has_skill"] = instance.nurse_skills
+    validation_data["forbidden"] = instance.forbidden_successions
+    validation_data["last_shift"] = get_history_arrays(history_data, constants["num_shifts"])["last_shift"].astype(int)
+    return validation_data
+
+def find_violations(schedule, validation_data):
+    """
+    Checks hard constraints of 'schedule' (nurses x days x shifts x skills) covering the days of 'validation_data'.
+    Returns dictionary of boolean arrays marking violations keyed by constraint: "one_shift_per_day" (nurses x days),
+    "skill" (nurses x days x shifts x skills), "minimal_coverage" (days x shifts x skills)
+    and "forbidden_succession" (nurses x days, marked on the day of the succeeding shift).
+    """
+
+    schedule = np.asarray(schedule, dtype=bool)
+    shifts = schedule.any(axis=3)
+    # shift of every day with the last shift of the history in front, -1 for a day off
+    worked_shift = np.where(shifts.any(axis=2), shifts.argmax(axis=2), -1)
+    previous_shift = np.concatenate([validation_data["last_shift"][:, None], worked_shift[:, :-1]], axis=1)
+
+    violations = {}
+    violations["one_shift_per_day"] = schedule.sum(axis=(2, 3)) > 1
+    violations["skill"] = schedule & ~validation_data["has_skill"][:, None, None, :]
+    violations["minimal_coverage"] = schedule.sum(axis=0) < validation_data["minimum"]
+    violations["forbidden_succession"] = (previous_shift >= 0) & (worked_shift >= 0) & validation_data["forbidden"][previous_shift, worked_shift]
+    return violations
+
+def validate_schedule(schedule, validation_data):
+    """
+    Checks hard constraints of 'schedule' (nurses x days x shifts x skills) covering the days of 'validation_data'.
+    Returns list of violations, each a dictionary with the "constraint", "week" and "day" of the week
+    and the "nurse", "shift", "skill" where they apply ("required" and "assigned" for minimal coverage).
+    Empty list for a feasible schedule.
+    """
+
+    schedule = np.asarray(schedule, dtype=bool)
+    violations = find_violations(schedule, validation_data)
+    records = []
+    for n, d in np.argwhere(violations["one_shift_per_day"]).tolist():
+        records.append({"constraint": "one_shift_per_day", "week": d // 7, "day": d % 7, "nurse": n, "assigned": int(schedule[n, d].sum())})
+    for n, d, s, sk in np.argwhere(violations["skill"]).tolist():
+        records.append({"constraint": "skill", "week": d // 7, "day": d % 7, "nurse": n, "shift": s, "skill": sk})
+    for d, s, sk in np.argwhere(violations["minimal_coverage"]).tolist():
+        records.append({"constraint": "minimal_coverage", "week": d // 7, "day": d % 7, "shift": s, "skill": sk,
+                        "required": int(validation_data["minimum"][d, s, sk]), "assigned": int(schedule[:, d, s, sk].sum())})
+    for n, d in np.argwhere(violations["forbidden_succession"]).tolist():
+        records.append({"constraint": "forbidden_succession", "week": d // 7, "day": d % 7, "nurse": n,
+                        "shift": int(schedule[n, d].any(axis=1).argmax())})
+    return records
@@ -0,0 +1,70 @@
+#!/usr/bin/python
+
+import numpy as np
+
+def repair_schedule(schedule, constants):
+    """
+    Repairs a candidate schedule (nurses x days x shifts x skills) for the current week:
+    removes assignments of the first day forbidden by the last shift of the history and adds assignments
+    of nurses with the right skill and a free day until minimal coverage is met (where it is possible).
+    Returns the repaired 0/1 array.
+    """
+
+    instance = constants["instance"]
+    num_nurses, num_days, num_shifts, num_skills = schedule.shape
+    forbidden = instance.forbidden_successions
+
+    schedule = np.array(schedule, dtype=bool)
+    has_skill = instance.nurse_skills
+    schedule &= has_skill[:, None, None, :]
+
+    # shift of every nurse on every day with -1 for a day off, column 0 is the last day of the previous week
+    last_shift = instance.history_last_shift
+
+    def assigned_shifts():
+        working = schedule.any(axis=3)
+        return np.concatenate([last_shift[:, None], np.where(working.any(axis=2), working.argmax(axis=2), -1)], axis=1)
+
+    shift_of_day = assigned_shifts()
+    first_day_forbidden = (shift_of_day[:, 0] >= 0) & (shift_of_day[:, 1] >= 0) & forbidden[shift_of_day[:, 0], shift_of_day[:, 1]]
+    schedule[first_day_forbidden, 0] = False
+
+    shift_of_day = assigned_shifts()
+    minimal = instance.week_demand[..., 0]
+    for d in range(num_days):
+        previous_shift = shift_of_day[:, d]
+        next_shift = shift_of_day[:, d + 2] if d + 1 < num_days else np.full(num_nurses, -1)
+        for s in range(num_shifts):
+            allowed = has_skill & ~((previous_shift >= 0) & forbidden[previous_shift, s])[:, None]
+            allowed &= ~((next_shift >= 0) & forbidden[s, next_shift])[:, None]
+            for sk in range(num_skills):
+                while schedule[:, d, s, sk].sum() < minimal[d, s, sk]:
+                    # a free nurse with the least working days is used first,
+                    # otherwise a nurse is moved from a shift and skill covered over its minimum
+                    working = schedule[:, d].any(axis=(1, 2))
+                    candidates = np.flatnonzero(allowed[:, sk] & ~working)
+                    if len(candidates) > 0:
+                        nurse = candidates[np.argmin(schedule[candidates].any(axis=(2, 3)).sum(axis=1))]
+                    else:
+                        surplus = schedule[:, d].sum(axis=0) > minimal[d]
+                        movable = np.flatnonzero(allowed[:, sk] & (schedule[:, d] & surplus).any(axis=(1, 2)) & ~schedule[:, d, s].any(axis=1))
+                        if len(movable) == 0:
+                            break
+                        nurse = movable[0]
+                        schedule[nurse, d] = False
+                    schedule[nurse, d, s, sk] = True
+                    shift_of_day[nurse, d + 1] = s
+
+    return schedule.astype(int)
+
+def get_warm_start_schedule(results, constants, week_number):
+    """
+    Builds a candidate schedule of week 'week_number' from the schedule of the previous week repaired against
+    the coverage and history of the current week.
+    Returns 0/1 array (nurses x days x shifts x skills) or None for the first week or a week after a week without a solution.
+    """
+
+    schedule = results.get_week(week_number - 1)
+    if schedule is None:
+        return None
+    return repair_schedule(schedule, constants)
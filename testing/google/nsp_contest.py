@@ -2,16 +2,61 @@
 
 from ortools.sat.python import cp_model
 
+import copy
 import json
+import time
 
 import numpy as np 
 import math
 
+from common.history import update_history
+from common.instance import get_week_instance
+from common.model_cache import get_model_cache, get_model_cache_key, load_from_model_cache, store_in_model_cache
+from common.warm_start import get_warm_start_schedule
+from common.construction import construct_schedule
+from common.aggregation import solve_aggregate_week
+from common.local_search import improve_week_schedule
+from common.precheck import check_week_capacity, set_precheck_results
+from common.symmetry import get_symmetry_pairs, get_pattern_weights, order_start_schedule
+from common.successions import get_succession_cliques, get_first_day_forbidden
+from common.presolve import set_presolve, get_mask, get_upper_bounds, is_week_presolve, project_schedule
+from common.bounds import set_bounds
+
 shift_to_int = {"Early": 0, "Day": 1, "Late": 2, "Night": 3, "Any": 4, "None": 5}
 skill_to_int = {"HeadNurse": 0, "Nurse": 1, "Caretaker": 2, "Trainee": 3}
-contract_to_int = {"FullTime": 0, "PartTime": 1, "HalfTime": 2}
+contract_to_int = {"FullTime": 0, "PartTime": 1, "HalfTime": 2, "20Percent": 3}
 day_to_int = {"Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3, "Friday": 4, "Saturday": 5, "Sunday": 6}
 
+# increase with every change of the built model, models stored in the model cache are keyed by it
+formulation_version = 2
+
+# Named settings of the solver, selected by option "solver_profile". "fast" keeps the settings the backend always had,
+# "optimal" runs the portfolio of 8 workers also on fewer cores, its workers with the linear relaxation raise the bound
+# while the workers without it and the LNS workers find the solutions (the linear relaxation in every worker found no
+# solution of n050 to n080 in 4 s). With 4 s on one core it is within 10 % of "fast" from n030 to n080, it is better
+# with longer time limits (n040w4 in 30 s: 20630 against 28610), so give it at least 30 s per week.
+# "deterministic" interleaves the workers with a fixed seed and limits the search by deterministic time,
+# so repeated runs give the same results. Worker count 0 lets the solver use all cores, option "threads" overrides it.
+solver_profiles = {
+    "fast": {"num_workers": 0, "cp_model_presolve": True, "linearization_level": 0,
+             "search_branching": "AUTOMATIC_SEARCH"},
+    "optimal": {"num_workers": 8, "cp_model_presolve": True, "linearization_level": 0,
+                "search_branching": "AUTOMATIC_SEARCH"},
+    "deterministic": {"num_workers": 8, "interleave_search": True, "random_seed": 0, "cp_model_presolve": True,
+                      "linearization_level": 0, "search_branching": "AUTOMATIC_SEARCH"},
+}
+default_solver_profile = "fast"
+
+# values of parameters searched by 'tune_parameters.py', the tuned parameters are set over the default profile
+tuning_space = {
+    "linearization_level": [0, 1, 2],
+    "search_branching": ["AUTOMATIC_SEARCH", "FIXED_SEARCH", "PORTFOLIO_SEARCH", "LP_SEARCH", "PSEUDO_COST_SEARCH"],
+    "cp_model_probing_level": [0, 1, 2],
+    "symmetry_level": [0, 1, 2],
+    "optimize_with_core": [False, True],
+    "random_seed": list(range(10)),
+}
+
 def init_ilp_vars(model, constants):
     all_nurses = constants["all_nurses"]
     all_shifts = constants["all_shifts"]
@@ -32,18 +77,24 @@ def init_ilp_vars(model, constants):
 
     # Creates shifts_with_skills variables.
     # shifts_with_skills[(n, d, s, sk)]: nurse 'n' works shift 's' on day 'd' with skill 'sk'.
+    # Variables removed by presolve are missing in the dictionary.
+    created = get_mask(constants, "shifts_with_skills", (len(all_nurses), len(all_days), len(all_shifts), len(all_skills))).tolist()
     shifts_with_skills = {}
     for n in all_nurses:
         for d in all_days:
             for s in all_shifts:
                 for sk in all_skills:
-                    shifts_with_skills[(n, d, s, sk)] = model.NewBoolVar(f"shift_n{n}_d{d}_s{s}_sk{sk}")
+                    if created[n][d][s][sk]:
+                        shifts_with_skills[(n, d, s, sk)] = model.NewBoolVar(f"shift_n{n}_d{d}_s{s}_sk{sk}")
 
+    created = get_mask(constants, "insufficient_staffing", (len(all_days), len(all_shifts), len(all_skills))).tolist()
+    upper_bounds = get_upper_bounds(constants, "insufficient_staffing", 10, (len(all_days), len(all_shifts), len(all_skills))).tolist()
     insufficient_staffing = {}
     for d in all_days:
         for s in all_shifts:
             for sk in all_skills:
-                insufficient_staffing[(d, s, sk)] = model.NewIntVar(0, 10, f"insufficient_staffing_d{d}_s{s}_sk{sk}")
+                if created[d][s][sk]:
+                    insufficient_staffing[(d, s, sk)] = model.NewIntVar(0, upper_bounds[d][s][sk], f"insufficient_staffing_d{d}_s{s}_sk{sk}")
 
     basic_ILP_vars = {}
     basic_ILP_vars["working_days"] = working_days
@@ -59,16 +110,16 @@ def init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants):
     num_days = constants["num_days"]
     shifts = basic_ILP_vars["shifts"]
     working_days = basic_ILP_vars["working_days"]
-    wd_data = constants["wd_data"]
-    sc_data = constants["sc_data"]
-    history_data = constants["h0_data"]
+    instance = constants["instance"]
 
     # Preferences for shifts off
+    created = get_mask(constants, "unsatisfied_preferences", (len(all_nurses), len(all_days), len(all_shifts))).tolist()
     unsatisfied_preferences = {}
     for n in all_nurses:
         for d in all_days:
             for s in all_shifts:
-                unsatisfied_preferences[(n, d, s)] = model.NewBoolVar(f"unsatisfied_preferences_n{n}_d{d}_s{s}")
+                if created[n][d][s]:
+                    unsatisfied_preferences[(n, d, s)] = model.NewBoolVar(f"unsatisfied_preferences_n{n}_d{d}_s{s}")
 
     # Vars for each nurse how many days they worked
     total_working_days = {}
@@ -93,24 +144,38 @@ def init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants):
 
     total_working_weekends_over_limit = {}
     for n in all_nurses:
-        total_working_weekends_over_limit[(n)] = model.NewIntVar(0, 4, f"total_working_weekends_over_limit_n{n}")
+        upper_bound = 4
+        if is_week_presolve(constants):
+            # the weekend of this week changes the difference from the limit by at most one
+            difference = int(instance.history_working_weekends[n]) - int(instance.max_working_weekends[n])
+            upper_bound = max(abs(difference), abs(difference + 1))
+        total_working_weekends_over_limit[(n)] = model.NewIntVar(0, upper_bound, f"total_working_weekends_over_limit_n{n}")
     
+    created = get_mask(constants, "incomplete_weekends", (len(all_nurses),)).tolist()
     total_incomplete_weekends = {}
     for n in all_nurses:
-        total_incomplete_weekends[(n)] = model.NewIntVar(0, 4, f"total_incomplete_weekends_n{n}")
+        if created[n]:
+            total_incomplete_weekends[(n)] = model.NewIntVar(0, 4 if constants.get("presolve") is None else 1, f"total_incomplete_weekends_n{n}")
 
     total_working_days_over_limit = {}
     total_working_days_under_limit = {}
     for n in all_nurses:
-        total_working_days_over_limit[(n)] = model.NewIntVar(0, num_days, f"total_working_days_over_limit_n{n}")
-        total_working_days_under_limit[(n)] = model.NewIntVar(0, num_days, f"total_working_days_under_limit_n{n}")
+        upper_limit, lower_limit = get_total_working_days_limits(instance, n)
+        over_bound, under_bound = num_days, num_days
+        if constants.get("presolve") is not None:
+            over_bound, under_bound = max(0, num_days - upper_limit), max(0, lower_limit)
+        total_working_days_over_limit[(n)] = model.NewIntVar(0, over_bound, f"total_working_days_over_limit_n{n}")
+        total_working_days_under_limit[(n)] = model.NewIntVar(0, under_bound, f"total_working_days_under_limit_n{n}")
 
     violations_of_max_consecutive_working_days = {}
     violations_of_max_consecutive_working_days_for_nurse = {}
+    violations_of_max_consecutive_working_days_from_prev_week_for_nurse = {}
     for n in all_nurses:
         violations_of_max_consecutive_working_days_for_nurse[(n)] = model.NewIntVar(0, num_days, f"violations_of_max_consecutive_working_days_for_nurse{n}")
-        all_violation_for_nurse = []
-        max_consecutive_working_days = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["maximumNumberOfConsecutiveWorkingDays"]
+        # violations of series started in the previous week are added by 'add_max_consecutive_working_days_from_prev_week_constraint'
+        violations_of_max_consecutive_working_days_from_prev_week_for_nurse[(n)] = model.NewIntVar(0, num_days, f"violations_of_max_consecutive_working_days_from_prev_week_for_nurse{n}")
+        all_violation_for_nurse = [violations_of_max_consecutive_working_days_from_prev_week_for_nurse[(n)]]
+        max_consecutive_working_days = int(instance.max_consecutive_working_days[n])
         for d in all_days:
             if d + max_consecutive_working_days >= num_days:
                 break
@@ -122,21 +187,6 @@ def init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants):
                     working_days_to_sum.append(shifts[(n, d + dd, s)])
             model.Add(violations_of_max_consecutive_working_days[(n, d + max_consecutive_working_days)] >= (sum(working_days_to_sum) - max_consecutive_working_days))
         
-        violations_of_max_consecutive_working_days_from_prev_week = {}
-        prev_week_consecutive_working_days = history_data["nurseHistory"][n]["numberOfConsecutiveWorkingDays"]
-        if prev_week_consecutive_working_days > 0:
-            for d in range(max_consecutive_working_days):
-                if prev_week_consecutive_working_days - d == 0:
-                    break
-
-                violations_of_max_consecutive_working_days_from_prev_week[(n, d)] = model.NewBoolVar(f"violations_of_max_consecutive_working_days_from_prev_week{n}_d{d}")
-                all_violation_for_nurse.append(violations_of_max_consecutive_working_days_from_prev_week[(n, d)])
-                
-                working_days_to_sum = []
-                for dd in range(max_consecutive_working_days - d):
-                    working_days_to_sum.append(working_days[(n, d)])
-                model.Add(violations_of_max_consecutive_working_days_from_prev_week[(n, d)] >= (sum(working_days_to_sum) + d + 1 - max_consecutive_working_days))
-
         model.Add(violations_of_max_consecutive_working_days_for_nurse[(n)] == sum(all_violation_for_nurse))
     
     violations_of_max_consecutive_working_shifts = {}
@@ -145,7 +195,7 @@ def init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants):
         for s in all_shifts:
             violations_of_max_consecutive_working_shifts_for_nurse_for_shift_type[(n, s)] = model.NewIntVar(0, num_days, f"violations_of_max_consecutive_working_shifts_for_nurse_for_shift_type_n{n}_s{s}")
             all_violation_for_nurse_for_shift_type = []
-            max_consecutive_working_shifts = sc_data["shiftTypes"][s]["maximumNumberOfConsecutiveAssignments"]
+            max_consecutive_working_shifts = int(instance.shift_max_consecutive[s])
             for d in all_days:
                 if d + max_consecutive_working_shifts >= num_days:
                     break
@@ -162,7 +212,7 @@ def init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants):
     for n in all_nurses:
         violations_of_max_consecutive_days_off_for_nurse[(n)] = model.NewIntVar(0, num_days, f"violations_of_max_consecutive_days_off_for_nurse{n}")
         all_violation_for_nurse = []
-        max_consecutive_days_off = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["maximumNumberOfConsecutiveDaysOff"]
+        max_consecutive_days_off = int(instance.max_consecutive_days_off[n])
         for d in all_days:
             if d + max_consecutive_days_off >= num_days:
                 break
@@ -177,14 +227,14 @@ def init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants):
 
     violations_of_min_consecutive_days_off = {}
     for n in all_nurses:
-        min_consecutive_days_off = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["minimumNumberOfConsecutiveDaysOff"]
+        min_consecutive_days_off = int(instance.min_consecutive_days_off[n])
         for d in all_days:
             for dd in range(1, min_consecutive_days_off):
                 violations_of_min_consecutive_days_off[(n, d, dd)] = model.NewBoolVar(f"violations_of_min_consecutive_days_off_n{n}_d{d}_dd{dd}")
     
     violations_of_min_consecutive_working_days = {}
     for n in all_nurses:
-        min_consecutive_working_days = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["minimumNumberOfConsecutiveWorkingDays"]
+        min_consecutive_working_days = int(instance.min_consecutive_working_days[n])
         for d in all_days:
             for dd in range(1, min_consecutive_working_days):
                 violations_of_min_consecutive_working_days[(n, d, dd)] = model.NewBoolVar(f"violations_of_min_consecutive_working_days_n{n}_d{d}_dd{dd}")
@@ -193,7 +243,7 @@ def init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants):
     for n in all_nurses:
         for d in all_days:
             for s in all_shifts:
-                min_consecutive_working_shifts = sc_data["shiftTypes"][s]["minimumNumberOfConsecutiveAssignments"]
+                min_consecutive_working_shifts = int(instance.shift_min_consecutive[s])
                 for dd in range(1, min_consecutive_working_shifts):
                     violations_of_min_consecutive_shifts[(n, d, s, dd)] = model.NewBoolVar(f"violations_of_min_consecutive_shifts_n{n}_d{d}_s{s}_dd{dd}")
                 
@@ -221,6 +271,7 @@ def init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants):
     soft_ILP_vars["total_working_days_under_limit"] = total_working_days_under_limit
     soft_ILP_vars["total_incomplete_weekends"] = total_incomplete_weekends
     soft_ILP_vars["violations_of_max_consecutive_working_days_for_nurse"] = violations_of_max_consecutive_working_days_for_nurse
+    soft_ILP_vars["violations_of_max_consecutive_working_days_from_prev_week_for_nurse"] = violations_of_max_consecutive_working_days_from_prev_week_for_nurse
     soft_ILP_vars["violations_of_max_consecutive_days_off_for_nurse"] = violations_of_max_consecutive_days_off_for_nurse
     soft_ILP_vars["violations_of_max_consecutive_working_shifts_for_nurse_for_shift_type"] = violations_of_max_consecutive_working_shifts_for_nurse_for_shift_type
     soft_ILP_vars["violations_of_min_consecutive_days_off"] = violations_of_min_consecutive_days_off
@@ -235,8 +286,7 @@ def add_hard_constrains(model, basic_ILP_vars, constants):
     all_days = constants["all_days"]
     all_skills = constants["all_skills"]
     num_days = constants["num_days"]
-    sc_data = constants["sc_data"]
-    h0_data = constants["h0_data"]
+    instance = constants["instance"]
     shifts = basic_ILP_vars["shifts"]
     working_days = basic_ILP_vars["working_days"]
     shifts_with_skills = basic_ILP_vars["shifts_with_skills"]
@@ -249,7 +299,9 @@ def add_hard_constrains(model, basic_ILP_vars, constants):
     for n in all_nurses:
         for d in all_days:
             for s in all_shifts:
-                model.AddAtMostOne(shifts_with_skills[(n, d, s, sk)] for sk in all_skills)
+                skills_worked = [shifts_with_skills[(n, d, s, sk)] for sk in all_skills if (n, d, s, sk) in shifts_with_skills]
+                if len(skills_worked) > 1:
+                    model.AddAtMostOne(skills_worked)
 
     # If nurse is working with skill that shift, she is working that shift.
     for n in all_nurses:
@@ -257,7 +309,8 @@ def add_hard_constrains(model, basic_ILP_vars, constants):
             for s in all_shifts:
                 skills_worked = []
                 for sk in all_skills:
-                    skills_worked.append(shifts_with_skills[(n, d, s, sk)])
+                    if (n, d, s, sk) in shifts_with_skills:
+                        skills_worked.append(shifts_with_skills[(n, d, s, sk)])
                 model.Add(sum(skills_worked) == shifts[(n, d, s)])
     
     for n in all_nurses:
@@ -268,7 +321,7 @@ def add_hard_constrains(model, basic_ILP_vars, constants):
             model.Add(sum(shifts_worked) == working_days[(n, d)])
 
     add_shift_succession_reqs(model, shifts, all_nurses, all_days, all_shifts, num_days, constants)
-    add_missing_skill_req(model, sc_data["nurses"], shifts_with_skills, all_days, all_shifts, all_skills)
+    add_missing_skill_req(model, instance, shifts_with_skills, all_days, all_shifts, all_skills)
 
     return
 
@@ -277,9 +330,7 @@ def add_soft_constraints(model, basic_ILP_vars, soft_ILP_vars, constants):
     all_days = constants["all_days"]
     all_shifts = constants["all_shifts"]
     all_skills = constants["all_skills"]
-    sc_data = constants["sc_data"]
-    h0_data = constants["h0_data"]
-    wd_data = constants["wd_data"]
+    instance = constants["instance"]
     shifts = basic_ILP_vars["shifts"]
     working_days = basic_ILP_vars["working_days"]
     unsatisfied_preferences = soft_ILP_vars["unsatisfied_preferences"]
@@ -291,13 +342,9 @@ def add_soft_constraints(model, basic_ILP_vars, soft_ILP_vars, constants):
     total_working_days_under_limit = soft_ILP_vars["total_working_days_under_limit"]
     total_incomplete_weekends = soft_ILP_vars["total_incomplete_weekends"]
     
-    add_insatisfied_preferences_reqs(model, wd_data["shiftOffRequests"], unsatisfied_preferences, shifts, all_nurses, all_days, all_shifts, all_skills)
-
-    add_total_working_days_out_of_bounds_constraint(model, sc_data["nurses"], sc_data["contracts"], h0_data["nurseHistory"], total_working_days, total_working_days_over_limit, total_working_days_under_limit, all_nurses)
-    
-    add_total_incomplete_weekends_constraint(model, sc_data["nurses"], sc_data["contracts"], total_incomplete_weekends, working_weekends, shifts, working_days, all_nurses, all_days, all_shifts)
+    add_total_working_days_out_of_bounds_constraint(model, instance, total_working_days, total_working_days_over_limit, total_working_days_under_limit, all_nurses)
     
-    add_total_working_weekends_soft_constraints(model, sc_data["nurses"], sc_data["contracts"], h0_data["nurseHistory"], total_working_weekends_over_limit, working_weekends, all_nurses)
+    add_total_incomplete_weekends_constraint(model, instance, total_incomplete_weekends, working_weekends, shifts, working_days, all_nurses, all_days, all_shifts)
     
     add_min_consecutive_days_off_constraint(model, basic_ILP_vars, soft_ILP_vars, constants)
 
@@ -307,27 +354,89 @@ def add_soft_constraints(model, basic_ILP_vars, soft_ILP_vars, constants):
 
     return 
 
-def add_min_consecutive_days_off_constraint(model, basic_ILP_vars, soft_ILP_vars, constants):
+def add_history_constraints(model, basic_ILP_vars, soft_ILP_vars, constants):
+    """
+    Adds constraints which depend on the history of nurses from the previous week (and symmetry breaking of the week).
+    """
+
+    add_first_day_shift_succession_reqs(model, basic_ILP_vars["shifts"], constants["all_nurses"], constants)
+
+    add_max_consecutive_working_days_from_prev_week_constraint(model, basic_ILP_vars, soft_ILP_vars, constants)
+
+    add_min_consecutive_days_off_constraint(model, basic_ILP_vars, soft_ILP_vars, constants, from_prev_week=True)
+
+    add_min_consecutive_working_days_constraint(model, basic_ILP_vars, soft_ILP_vars, constants, from_prev_week=True)
+
+    add_min_consecutive_shifts_constraint(model, basic_ILP_vars, soft_ILP_vars, constants, from_prev_week=True)
+
+    # interchangeable nurses change every week with the history and shift off requests
+    if constants["options"].get("symmetry_breaking"):
+        add_symmetry_breaking_constraints(model, basic_ILP_vars["shifts"], constants)
+
+    return
+
+def add_symmetry_breaking_constraints(model, shifts, constants):
+    """
+    Orders shift patterns of interchangeable nurses lexicographically, so only one of their permutations is searched.
+    """
+
+    weights = get_pattern_weights(constants).tolist()
+    all_days = constants["all_days"]
+    all_shifts = constants["all_shifts"]
+    for n1, n2 in get_symmetry_pairs(constants):
+        model.Add(sum(weights[d][s] * (shifts[(n1, d, s)] - shifts[(n2, d, s)]) for d in all_days for s in all_shifts) >= 0)
+    return
+
+def add_max_consecutive_working_days_from_prev_week_constraint(model, basic_ILP_vars, soft_ILP_vars, constants):
+    all_nurses = constants["all_nurses"]
+    instance = constants["instance"]
+    working_days = basic_ILP_vars["working_days"]
+    violations_of_max_consecutive_working_days_from_prev_week_for_nurse = soft_ILP_vars["violations_of_max_consecutive_working_days_from_prev_week_for_nurse"]
+
+    for n in all_nurses:
+        all_violation_for_nurse = []
+        max_consecutive_working_days = int(instance.max_consecutive_working_days[n])
+        violations_of_max_consecutive_working_days_from_prev_week = {}
+        prev_week_consecutive_working_days = int(instance.history_consecutive_working_days[n])
+        if prev_week_consecutive_working_days > 0:
+            for d in range(max_consecutive_working_days):
+                if prev_week_consecutive_working_days - d == 0:
+                    break
+
+                violations_of_max_consecutive_working_days_from_prev_week[(n, d)] = model.NewBoolVar(f"violations_of_max_consecutive_working_days_from_prev_week{n}_d{d}")
+                all_violation_for_nurse.append(violations_of_max_consecutive_working_days_from_prev_week[(n, d)])
+                
+                working_days_to_sum = []
+                for dd in range(max_consecutive_working_days - d):
+                    working_days_to_sum.append(working_days[(n, d)])
+                model.Add(violations_of_max_consecutive_working_days_from_prev_week[(n, d)] >= (sum(working_days_to_sum) + d + 1 - max_consecutive_working_days))
+
+        model.Add(violations_of_max_consecutive_working_days_from_prev_week_for_nurse[(n)] == sum(all_violation_for_nurse))
+    return
+
+def add_min_consecutive_days_off_constraint(model, basic_ILP_vars, soft_ILP_vars, constants, from_prev_week=False):
     violations_of_min_consecutive_days_off = soft_ILP_vars["violations_of_min_consecutive_days_off"]
     all_nurses = constants["all_nurses"]
     all_days = constants["all_days"]
-    sc_data = constants["sc_data"]
+    instance = constants["instance"]
     working_days = basic_ILP_vars["working_days"]
     not_working_days = soft_ILP_vars["not_working_days"]
 
     for n in all_nurses:
-        consecutive_working_days_prev_week = constants["h0_data"]["nurseHistory"][n]["numberOfConsecutiveDaysOff"]
-        min_consecutive_days_off = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["minimumNumberOfConsecutiveDaysOff"]
+        consecutive_working_days_prev_week = int(instance.history_consecutive_days_off[n])
+        min_consecutive_days_off = int(instance.min_consecutive_days_off[n])
         for d in all_days:
             for dd in range(1, min_consecutive_days_off):
                 if (d - dd) > 0:
+                    if from_prev_week:
+                        continue
                     model.Add(dd + 1 >= sum(
                         [-violations_of_min_consecutive_days_off[(n, d, dd)]] 
                         + [working_days[(n, d)]]
                         + list(not_working_days[(n, ddd)] for ddd in range(d - dd, d))
                         + [working_days[(n,d - dd - 1)]]
                     ))
-                else:
+                elif from_prev_week:
                     if consecutive_working_days_prev_week == d - dd:
                         model.Add(dd + 1 >= sum(
                             [-violations_of_min_consecutive_days_off[(n, d, dd)]] 
@@ -335,27 +444,29 @@ def add_min_consecutive_days_off_constraint(model, basic_ILP_vars, soft_ILP_vars
                             + list(not_working_days[(n, ddd)] for ddd in range(0, d))
                         ))
 
-def add_min_consecutive_working_days_constraint(model, basic_ILP_vars, soft_ILP_vars, constants):
+def add_min_consecutive_working_days_constraint(model, basic_ILP_vars, soft_ILP_vars, constants, from_prev_week=False):
     violations_of_min_consecutive_working_days = soft_ILP_vars["violations_of_min_consecutive_working_days"]
     all_nurses = constants["all_nurses"]
     all_days = constants["all_days"]
-    sc_data = constants["sc_data"]
+    instance = constants["instance"]
     working_days = basic_ILP_vars["working_days"]
     not_working_days = soft_ILP_vars["not_working_days"]
 
     for n in all_nurses:
-        consecutive_working_days_prev_week = constants["h0_data"]["nurseHistory"][n]["numberOfConsecutiveDaysOff"]
-        min_consecutive_working_days = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["minimumNumberOfConsecutiveWorkingDays"]
+        consecutive_working_days_prev_week = int(instance.history_consecutive_days_off[n])
+        min_consecutive_working_days = int(instance.min_consecutive_working_days[n])
         for d in all_days:
             for dd in range(1, min_consecutive_working_days):
                 if (d - dd) > 0:
+                    if from_prev_week:
+                        continue
                     model.Add(dd + 1 >= sum(
                         [-violations_of_min_consecutive_working_days[(n, d, dd)]] 
                         + [not_working_days[(n, d)]]
                         + list(working_days[(n, ddd)] for ddd in range(d - dd, d))
                         + [not_working_days[(n,d - dd - 1)]]
                     ))
-                else:
+                elif from_prev_week:
                     if consecutive_working_days_prev_week == d - dd:
                         model.Add(dd + 1 >= sum(
                             [-violations_of_min_consecutive_working_days[(n, d, dd)]] 
@@ -363,31 +474,32 @@ def add_min_consecutive_working_days_constraint(model, basic_ILP_vars, soft_ILP_
                             + list(working_days[(n, ddd)] for ddd in range(0, d))
                         ))
 
-def add_min_consecutive_shifts_constraint(model, basic_ILP_vars, soft_ILP_vars, constants):
+def add_min_consecutive_shifts_constraint(model, basic_ILP_vars, soft_ILP_vars, constants, from_prev_week=False):
     violations_of_min_consecutive_shifts = soft_ILP_vars["violations_of_min_consecutive_shifts"]
     all_nurses = constants["all_nurses"]
     all_days = constants["all_days"]
     all_shifts = constants["all_shifts"]
-    sc_data = constants["sc_data"]
+    instance = constants["instance"]
     working_days = basic_ILP_vars["working_days"]
     not_working_shifts = soft_ILP_vars["not_working_shifts"]
 
     for n in all_nurses:
-        consecutive_working_shifts_prev_week = constants["h0_data"]["nurseHistory"][n]["numberOfConsecutiveWorkingDays"]
-        lastAssignedShiftType = constants["h0_data"]["nurseHistory"][n]["lastAssignedShiftType"]
-        lastShittTypeAsInt = shift_to_int[lastAssignedShiftType]
+        consecutive_working_shifts_prev_week = int(instance.history_consecutive_working_days[n])
+        lastShittTypeAsInt = int(instance.history_last_shift[n])
         for d in all_days:
             for s in all_shifts:
-                min_consecutive_shifts = sc_data["shiftTypes"][s]["minimumNumberOfConsecutiveAssignments"]
+                min_consecutive_shifts = int(instance.shift_min_consecutive[s])
                 for dd in range(1, min_consecutive_shifts):
                     if (d - dd) > 0:
+                        if from_prev_week:
+                            continue
                         model.Add(dd + 1 >= sum(
                             [-violations_of_min_consecutive_shifts[(n, d, s, dd)]] 
                             + [not_working_shifts[(n, d, s)]]
                             + list(working_days[(n, ddd)] for ddd in range(d - dd, d))
                             + [not_working_shifts[(n,d - dd - 1, s)]]
                         ))
-                    else:
+                    elif from_prev_week:
                         if (consecutive_working_shifts_prev_week == d - dd) and (lastShittTypeAsInt == s):
                             model.Add(dd + 1 >= sum(
                                 [-violations_of_min_consecutive_shifts[(n, d, s, dd)]] 
@@ -395,26 +507,34 @@ def add_min_consecutive_shifts_constraint(model, basic_ILP_vars, soft_ILP_vars,
                                 + list(working_days[(n, ddd)] for ddd in range(0, d))
                             ))
 
-def add_total_incomplete_weekends_constraint(model, nurses_data, contracts_data, total_incomplete_weekends, working_weekends, shifts, working_days, all_nurses, all_days, all_shifts):
+def add_total_incomplete_weekends_constraint(model, instance, total_incomplete_weekends, working_weekends, shifts, working_days, all_nurses, all_days, all_shifts):
     incomplete_weekends = {}
     for n in all_nurses:
-        isCompleteWeekendRequested = contracts_data[contract_to_int[nurses_data[n]["contract"]]]["completeWeekends"]
+        isCompleteWeekendRequested = int(instance.complete_weekends[n])
         if isCompleteWeekendRequested == 1:
             incomplete_weekends[(n)] = model.NewBoolVar(f"incomplete_weekends_n{n}")
             model.Add(incomplete_weekends[(n)] == 2*working_weekends[(n)] - working_days[(n, 5)] - working_days[(n, 6)])
                 
     for n in all_nurses:
-        isCompleteWeekendRequested = contracts_data[contract_to_int[nurses_data[n]["contract"]]]["completeWeekends"]
+        isCompleteWeekendRequested = int(instance.complete_weekends[n])
         if isCompleteWeekendRequested == 1:
             incomplete_weekends_n = []
             incomplete_weekends_n.append(incomplete_weekends[(n)])
             model.Add(total_incomplete_weekends[(n)] == sum(incomplete_weekends_n))
     return 
 
-def add_total_working_days_out_of_bounds_constraint(model, nurses_data, contracts_data, history, total_working_days, total_working_days_over_limit, total_working_days_under_limit, all_nurses):
+def get_total_working_days_limits(instance, n):
+    """
+    Returns tuple of the upper and lower limit of working days of nurse 'n' in one week.
+    """
+
+    upper_limit = math.ceil(int(instance.max_assignments[n]) / 4) + 1
+    lower_limit = math.ceil(int(instance.min_assignments[n]) / 4) - 1
+    return upper_limit, lower_limit
+
+def add_total_working_days_out_of_bounds_constraint(model, instance, total_working_days, total_working_days_over_limit, total_working_days_under_limit, all_nurses):
     for n in all_nurses:
-        upper_limit = math.ceil(contracts_data[contract_to_int[nurses_data[n]["contract"]]]["maximumNumberOfAssignments"] / 4) + 1
-        lower_limit = math.ceil(contracts_data[contract_to_int[nurses_data[n]["contract"]]]["minimumNumberOfAssignments"] / 4) - 1
+        upper_limit, lower_limit = get_total_working_days_limits(instance, n)
         model.Add(total_working_days_over_limit[(n)] >= total_working_days[(n)] - upper_limit)
         model.Add(total_working_days_under_limit[(n)] >= lower_limit - total_working_days[(n)])
     return 
@@ -423,106 +543,182 @@ def add_shift_skill_req(model, req, basic_ILP_vars, soft_ILP_vars, constants):
     all_nurses = constants["all_nurses"]
     shifts_with_skills = basic_ILP_vars["shifts_with_skills"]
     insufficient_staffing = basic_ILP_vars["insufficient_staffing"]
+    week_demand = constants["instance"].week_demand
 
     shift = shift_to_int[req["shiftType"]]
     skill = skill_to_int[req["skill"]]
-    minimal_capacities_in_week = [
-        req["requirementOnMonday"]["minimum"],
-        req["requirementOnTuesday"]["minimum"],
-        req["requirementOnWednesday"]["minimum"],
-        req["requirementOnThursday"]["minimum"],
-        req["requirementOnFriday"]["minimum"],
-        req["requirementOnSaturday"]["minimum"],
-        req["requirementOnSunday"]["minimum"],
-    ]
-    optimal_capacities_in_week = [
-        req["requirementOnMonday"]["optimal"],
-        req["requirementOnTuesday"]["optimal"],
-        req["requirementOnWednesday"]["optimal"],
-        req["requirementOnThursday"]["optimal"],
-        req["requirementOnFriday"]["optimal"],
-        req["requirementOnSaturday"]["optimal"],
-        req["requirementOnSunday"]["optimal"],
-    ]
+    minimal_capacities_in_week = week_demand[:, shift, skill, 0].tolist()
+    optimal_capacities_in_week = week_demand[:, shift, skill, 1].tolist()
+
+    # rows without demand are not added by presolve
+    minimal_staffing = get_mask(constants, "minimal_staffing", week_demand.shape[:3])
 
     for day, min_capacity in enumerate(minimal_capacities_in_week):
+        if not minimal_staffing[day, shift, skill]:
+            continue
         skills_worked = []
         for n in all_nurses:
-            skills_worked.append(shifts_with_skills[(n, day, shift, skill)])
+            if (n, day, shift, skill) in shifts_with_skills:
+                skills_worked.append(shifts_with_skills[(n, day, shift, skill)])
         model.Add(sum(skills_worked) >= min_capacity)
 
     for day, opt_capacity in enumerate(optimal_capacities_in_week):
+        if (day, shift, skill) not in insufficient_staffing:
+            continue
         skills_worked = []
         for n in all_nurses:
-            skills_worked.append(shifts_with_skills[(n, day, shift, skill)])
+            if (n, day, shift, skill) in shifts_with_skills:
+                skills_worked.append(shifts_with_skills[(n, day, shift, skill)])
         model.Add(opt_capacity - sum(skills_worked) <= insufficient_staffing[(day, shift, skill)])
     return
 
-def add_shift_succession_reqs(model, shifts, all_nurses, all_days, all_shifts, num_days, constants):
-    for n in all_nurses:
-        last_shift = shift_to_int[constants["h0_data"]["nurseHistory"][n]["lastAssignedShiftType"]]
+def add_first_day_shift_succession_reqs(model, shifts, all_nurses, constants):
+    """
+    Fixes to zero shifts of the first day that can not follow the last shift of the previous week.
+    """
 
-        if(last_shift == 2):
-            model.Add(0 == shifts[(n, 0, last_shift - 1)] + shifts[(n, 0, last_shift - 2)])
-        if(last_shift == 3):
-            model.Add(0 == shifts[(n, 0, last_shift - 1)] + shifts[(n, 0, last_shift - 2)] + shifts[(n, 0, last_shift - 3)])
+    variables = model.Proto().variables
+    for n, s in np.argwhere(get_first_day_forbidden(constants["instance"])[list(all_nurses)]).tolist():
+        domain = variables[shifts[(n, 0, s)].Index()].domain
+        domain[0] = 0
+        domain[1] = 0
+    return
+
+def add_shift_succession_reqs(model, shifts, all_nurses, all_days, all_shifts, num_days, constants):
+    """
+    Adds one clique of forbidden successions of the scenario per pair of successive days.
+    """
 
+    cliques = get_succession_cliques(constants["instance"].forbidden_successions)
+    for n in all_nurses:
         for d in range(num_days - 1):
-            for s in all_shifts:
-                # if(s == 1):
-                #     model.AddAtMostOne([shifts[(n, d, s)], shifts[(n, d + 1, s - 1)]])
-                if(s == 2):
-                    model.AddAtMostOne([shifts[(n, d, s)], shifts[(n, d + 1, s - 1)], shifts[(n, d + 1, s - 2)]])
-                if(s == 3):
-                    model.AddAtMostOne([shifts[(n, d, s)], shifts[(n, d + 1, s - 1)], shifts[(n, d + 1, s - 2)], shifts[(n, d + 1, s - 3)]])
+            for preceding, succeeding in cliques:
+                model.AddAtMostOne([shifts[(n, d, s)] for s in preceding] + [shifts[(n, d + 1, s)] for s in succeeding])
     return 
 
-def add_missing_skill_req(model, nurses_data, shifts_with_skills, all_days, all_shifts, all_skills):
-    for index, nurse_data in enumerate(nurses_data):
-        for sk in all_skills:
-            has_skill = False
-            for skill in nurse_data["skills"]:
-                if sk == skill_to_int[skill]:
-                    has_skill = True
-                    break
-            if has_skill is False:
-                # print(f"  Nurse {nurse_data['id']} does not have skill {sk}")
-                for d in all_days:
-                    for s in all_shifts:
-                        model.Add(shifts_with_skills[(index, d, s, sk)] == 0)
+def add_missing_skill_req(model, instance, shifts_with_skills, all_days, all_shifts, all_skills):
+    for index, sk in zip(*np.nonzero(~instance.nurse_skills[:, list(all_skills)])):
+        for d in all_days:
+            for s in all_shifts:
+                # presolve does not create the variable at all
+                if (int(index), d, s, int(sk)) in shifts_with_skills:
+                    model.Add(shifts_with_skills[(int(index), d, s, int(sk))] == 0)
 
     return
 
-def add_insatisfied_preferences_reqs(model, preferences, unsatisfied_preferences, shifts, all_nurses, all_days, all_shifts, all_skills):
-    for preference in preferences:
-        nurse_id = int(preference["nurse"].split("_")[1])
-        day_id = day_to_int[preference["day"]]
-        shift_id = shift_to_int[preference["shiftType"]]
-
-        if shift_id != shift_to_int["Any"]:
-            model.Add(unsatisfied_preferences[(nurse_id, day_id, shift_id)] == shifts[(nurse_id, day_id, shift_id)])
-        else:
-            shifts_worked = []
-            for shift in all_shifts:
-                model.Add(unsatisfied_preferences[(nurse_id, day_id, shift)] == shifts[(nurse_id, day_id, shift)])
+def add_insatisfied_preferences_reqs(model, requested_off, unsatisfied_preferences, shifts):
+    for nurse_id, day_id, shift_id in np.argwhere(requested_off).tolist():
+        model.Add(unsatisfied_preferences[(nurse_id, day_id, shift_id)] == shifts[(nurse_id, day_id, shift_id)])
     return
 
-def add_total_working_weekends_soft_constraints(model, nurses_data, contracts_data, history, total_working_weekends_over_limit, working_weekends, all_nurses):
+def add_total_working_weekends_soft_constraints(model, instance, total_working_weekends_over_limit, working_weekends, all_nurses):
     for n in all_nurses:
         worked_weekends = []
-        worked_weekends_limit = contracts_data[contract_to_int[nurses_data[n]["contract"]]]["maximumNumberOfWorkingWeekends"]
+        worked_weekends_limit = int(instance.max_working_weekends[n])
         worked_weekends.append(working_weekends[(n)])
-        model.Add(total_working_weekends_over_limit[(n)] >= sum(worked_weekends) - worked_weekends_limit + history[n]["numberOfWorkingWeekends"])
-        model.Add(total_working_weekends_over_limit[(n)] >= -(sum(worked_weekends) - worked_weekends_limit + history[n]["numberOfWorkingWeekends"]))
+        model.Add(total_working_weekends_over_limit[(n)] >= sum(worked_weekends) - worked_weekends_limit + int(instance.history_working_weekends[n]))
+        model.Add(total_working_weekends_over_limit[(n)] >= -(sum(worked_weekends) - worked_weekends_limit + int(instance.history_working_weekends[n])))
+    return
+
+def add_week_data_constraints(model, basic_ILP_vars, soft_ILP_vars, constants):
+    """
+    Adds constraints depending on week data and history counters with placeholder bounds for every nurse, day, shift and skill.
+    Returns dictionary with indices of the constraints, their bounds are set for each week by 'set_week_data_bounds'.
+    """
+
+    all_nurses = constants["all_nurses"]
+    all_days = constants["all_days"]
+    all_shifts = constants["all_shifts"]
+    all_skills = constants["all_skills"]
+    shifts = basic_ILP_vars["shifts"]
+    shifts_with_skills = basic_ILP_vars["shifts_with_skills"]
+    insufficient_staffing = basic_ILP_vars["insufficient_staffing"]
+    unsatisfied_preferences = soft_ILP_vars["unsatisfied_preferences"]
+    working_weekends = soft_ILP_vars["working_weekends"]
+    total_working_weekends_over_limit = soft_ILP_vars["total_working_weekends_over_limit"]
+
+    week_data_constraints = {}
+    for d in all_days:
+        for s in all_shifts:
+            for sk in all_skills:
+                skills_worked = [shifts_with_skills[(n, d, s, sk)] for n in all_nurses if (n, d, s, sk) in shifts_with_skills]
+                week_data_constraints[(d, s, sk, "minimum")] = model.AddLinearConstraint(sum(skills_worked), 0, cp_model.INT_MAX).Index()
+                week_data_constraints[(d, s, sk, "optimal")] = model.AddLinearConstraint(sum(skills_worked) + insufficient_staffing[(d, s, sk)], 0, cp_model.INT_MAX).Index()
+
+    # unsatisfied preference is equal to the shift if it is requested off, otherwise it is free
+    for n in all_nurses:
+        for d in all_days:
+            for s in all_shifts:
+                week_data_constraints[(n, d, s)] = model.AddLinearConstraint(unsatisfied_preferences[(n, d, s)] - shifts[(n, d, s)], -1, 1).Index()
+
+    for n in all_nurses:
+        week_data_constraints[(n, "weekends_over")] = model.AddLinearConstraint(total_working_weekends_over_limit[(n)] - working_weekends[(n)], cp_model.INT_MIN, cp_model.INT_MAX).Index()
+        week_data_constraints[(n, "weekends_under")] = model.AddLinearConstraint(total_working_weekends_over_limit[(n)] + working_weekends[(n)], cp_model.INT_MIN, cp_model.INT_MAX).Index()
+
+    return week_data_constraints
+
+def set_week_data_bounds(model, week_data_constraints, constants):
+    """
+    Sets bounds of constraints created by 'add_week_data_constraints' according to current week data and history.
+    """
+
+    all_nurses = constants["all_nurses"]
+    all_days = constants["all_days"]
+    all_shifts = constants["all_shifts"]
+    all_skills = constants["all_skills"]
+    instance = constants["instance"]
+    constraints = model.Proto().constraints
+
+    def set_bounds(index, lower_bound, upper_bound):
+        domain = constraints[index].linear.domain
+        domain[0] = lower_bound
+        domain[1] = upper_bound
+
+    week_demand = instance.week_demand.tolist()
+    for d in all_days:
+        for s in all_shifts:
+            for sk in all_skills:
+                minimal_capacity, optimal_capacity = week_demand[d][s][sk]
+                set_bounds(week_data_constraints[(d, s, sk, "minimum")], minimal_capacity, cp_model.INT_MAX)
+                set_bounds(week_data_constraints[(d, s, sk, "optimal")], optimal_capacity, cp_model.INT_MAX)
+
+    requested_off = instance.week_requested_off.tolist()
+    for n in all_nurses:
+        for d in all_days:
+            for s in all_shifts:
+                if requested_off[n][d][s]:
+                    set_bounds(week_data_constraints[(n, d, s)], 0, 0)
+                else:
+                    set_bounds(week_data_constraints[(n, d, s)], -1, 1)
+
+    for n in all_nurses:
+        worked_weekends_limit = int(instance.max_working_weekends[n])
+        set_bounds(week_data_constraints[(n, "weekends_over")], int(instance.history_working_weekends[n]) - worked_weekends_limit, cp_model.INT_MAX)
+        set_bounds(week_data_constraints[(n, "weekends_under")], worked_weekends_limit - int(instance.history_working_weekends[n]), cp_model.INT_MAX)
     return
 
+def build_week_skeleton(constants):
+    """
+    Builds model of one week without constraints depending on week data and history.
+    Returns tuple (model, basic_ILP_vars, soft_ILP_vars, week_data_constraints).
+    """
+
+    model = cp_model.CpModel()
+    basic_ILP_vars = init_ilp_vars(model, constants)
+    add_hard_constrains(model, basic_ILP_vars, constants)
+    soft_ILP_vars = init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants)
+    add_soft_constraints(model, basic_ILP_vars, soft_ILP_vars, constants)
+    week_data_constraints = add_week_data_constraints(model, basic_ILP_vars, soft_ILP_vars, constants)
+    set_objective_function(model, basic_ILP_vars, soft_ILP_vars, constants)
+    return model, basic_ILP_vars, soft_ILP_vars, week_data_constraints
+
 def set_objective_function(model, basic_ILP_vars, soft_ILP_vars, constants):
     all_nurses = constants["all_nurses"]
     all_days = constants["all_days"]
     all_shifts = constants["all_shifts"]
     all_skills = constants["all_skills"]
 
-    sc_data = constants["sc_data"]
+    instance = constants["instance"]
 
     insufficient_staffing = basic_ILP_vars["insufficient_staffing"]
 
@@ -541,14 +737,14 @@ def set_objective_function(model, basic_ILP_vars, soft_ILP_vars, constants):
 
     summed_violations_of_min_cons_days_off = []
     for n in all_nurses:
-        min_consecutive_days_off = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["minimumNumberOfConsecutiveDaysOff"]
+        min_consecutive_days_off = int(instance.min_consecutive_days_off[n])
         for d in all_days:
             for dd in range(1, min_consecutive_days_off):
                 summed_violations_of_min_cons_days_off.append(dd * violations_of_min_consecutive_days_off[(n, d, dd)])
 
     summed_violations_of_min_cons_working_days = []
     for n in all_nurses:
-        min_consecutive_wokring_days = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["minimumNumberOfConsecutiveWorkingDays"]
+        min_consecutive_wokring_days = int(instance.min_consecutive_working_days[n])
         for d in all_days:
             for dd in range(1, min_consecutive_wokring_days):
                 summed_violations_of_min_cons_working_days.append(dd * violations_of_min_consecutive_working_days[(n, d, dd)])
@@ -557,18 +753,18 @@ def set_objective_function(model, basic_ILP_vars, soft_ILP_vars, constants):
     for n in all_nurses:
         for d in all_days:
             for s in all_shifts:
-                min_consecutive_shifts = sc_data["shiftTypes"][s]["minimumNumberOfConsecutiveAssignments"]
+                min_consecutive_shifts = int(instance.shift_min_consecutive[s])
                 for dd in range(1, min_consecutive_shifts):
                     summed_violations_of_min_cons_shift_type.append(dd * violations_of_min_consecutive_shifts[(n, d, s, dd)])
 
     model.Minimize( 
-                    (30 * sum(insufficient_staffing[(d, s, sk)] for d in all_days for s in all_shifts for sk in all_skills))
+                    (30 * sum(insufficient_staffing.values()))
                     + 
-                    (10 * sum(unsatisfied_preferences[(n, d, s)] for n in all_nurses for d in all_days for s in all_shifts))
+                    (10 * sum(unsatisfied_preferences.values()))
                     +
                     (30 * sum(total_working_weekends_over_limit[(n)] for n in all_nurses))
                     +
-                    (30 * sum(total_incomplete_weekends[(n)] for n in all_nurses))
+                    (30 * sum(total_incomplete_weekends.values()))
                     +
                     (20 * sum(total_working_days_over_limit[(n)] for n in all_nurses))
                     +
@@ -610,7 +806,7 @@ def print_results(solver, solution_printer, basic_ILP_vars, soft_ILP_vars, const
         for n in range(num_nurses):
             for s in range(num_shifts):
                 for sk in range(num_skills):
-                    if solver.Value(shifts_with_skills[(n, d, s, sk)]) == 1:
+                    if (n, d, s, sk) in shifts_with_skills and solver.Value(shifts_with_skills[(n, d, s, sk)]) == 1:
                         schedule_table[n][d*num_shifts + s] = 1 - (0.2 * sk)
 
 def handle_status(status):
@@ -625,17 +821,49 @@ def handle_status(status):
     result = switch.get(status, "Unknown status code: {}".format(status))
     return (result)
 
-def save_tmp_results(results, solver, status, constants, basic_ILP_vars, soft_ILP_vars, week_number):
+def get_var_indices(variables, shape):
+    """
+    Returns numpy array with proto indices of variables stored in a dictionary keyed by indices of array with 'shape'.
+    """
+
+    if len(shape) == 1:
+        return np.array([variables[(n)].Index() for n in range(shape[0])])
+    # -1 for variables removed by presolve
+    return np.array([variables[key].Index() if key in variables else -1 for key in np.ndindex(*shape)]).reshape(shape)
+
+def get_columns(basic_ILP_vars, soft_ILP_vars, constants):
+    """
+    Returns dictionary of numpy arrays with proto indices of variables read by 'save_tmp_results'.
+    """
+
     num_days = constants["num_days"]
     num_nurses = constants["num_nurses"]
     num_skills = constants["num_skills"]
     num_shifts = constants["num_shifts"]
-    history_data = constants["h0_data"]
-    working_weekends = soft_ILP_vars["working_weekends"]
 
-    shifts_with_skills = basic_ILP_vars["shifts_with_skills"]
-    working_days = basic_ILP_vars["working_days"]
-    shifts = basic_ILP_vars["shifts"]
+    columns = {}
+    columns["shifts_with_skills"] = get_var_indices(basic_ILP_vars["shifts_with_skills"], (num_nurses, num_days, num_shifts, num_skills))
+    columns["shifts"] = get_var_indices(basic_ILP_vars["shifts"], (num_nurses, num_days, num_shifts))
+    columns["working_weekends"] = get_var_indices(soft_ILP_vars["working_weekends"], (num_nurses,))
+    return columns
+
+def add_warm_start(model, schedule, basic_ILP_vars):
+    """
+    Adds candidate schedule (nurses x days x shifts x skills) to the model as a solution hint.
+    """
+
+    columns = basic_ILP_vars["columns"]
+    schedule = project_schedule(schedule, columns["shifts_with_skills"] >= 0)
+    hinted = [(columns["shifts_with_skills"], schedule), (columns["shifts"], schedule.any(axis=3))]
+    for indices, values in hinted:
+        for index, value in zip(indices.ravel().tolist(), values.ravel().tolist()):
+            if index >= 0:
+                model.AddHint(model.GetBoolVarFromProtoIndex(index), value)
+    return
+
+def save_tmp_results(results, solver, status, constants, basic_ILP_vars, soft_ILP_vars, week_number):
+    history_data = constants["h0_data"]
+    columns = basic_ILP_vars["columns"]
 
     if(status != cp_model.FEASIBLE and status != cp_model.OPTIMAL):
         results[(week_number, "status")] = handle_status(status)
@@ -649,111 +877,201 @@ def save_tmp_results(results, solver, status, constants, basic_ILP_vars, soft_IL
     results[(week_number, "allweeksoft")] = 0
     results[("allweeksoft")] = 0
 
-    for n in range(num_nurses):
-        for d in range(num_days):
-            for s in range(num_shifts):
-                for sk in range(num_skills):
-                    results[(n, d + 7 * week_number, s, sk)] = solver.Value(shifts_with_skills[(n, d, s, sk)])
-                    # if(results[(n, d + 7 * week_number, s, sk)]) == 1:
-            history_data["nurseHistory"][n]["numberOfAssignments"] += solver.Value(working_days[(n, d)])
-        history_data["nurseHistory"][n]["numberOfWorkingWeekends"] += solver.Value(working_weekends[(n)])
-
-        if solver.Value(working_days[(n, 6)]) == 0:
-            consecutive_free_days = 1
-            d = 5
-            while d >= 0 and solver.Value(working_days[(n, d)]) == 0:
-                consecutive_free_days += 1
-                d -= 1
-            history_data["nurseHistory"][n]["numberOfConsecutiveDaysOff"] = consecutive_free_days
-            history_data["nurseHistory"][n]["numberOfConsecutiveWorkingDays"] = 0
-            history_data["nurseHistory"][n]["numberOfConsecutiveAssignments"] = 0
-            history_data["nurseHistory"][n]["lastAssignedShiftType"] = "None"
-        else:
-            consecutive_work_days = 1
-            d = 5
-            while d >= 0 and solver.Value(working_days[(n, d)]) == 1:
-                consecutive_work_days += 1
-                d -= 1
-            history_data["nurseHistory"][n]["numberOfConsecutiveWorkingDays"] = consecutive_work_days
-            history_data["nurseHistory"][n]["numberOfConsecutiveDaysOff"] = 0
-
-            consecutive_shift = 0
-            for s in range(num_shifts):
-                if solver.Value(shifts[(n, 6, s)]) == 1:
-                    consecutive_shift = s
-                    break
-            consecutive_shifts = 1
-            for shift_name, shift_id in shift_to_int.items():
-                if( shift_id == consecutive_shift):
-                    history_data["nurseHistory"][n]["lastAssignedShiftType"] = shift_name
-                    
-            d = 5
-            while d >= 0 and solver.Value(shifts[(n, d, consecutive_shift)]) == 1:
-                consecutive_shifts += 1
-                d -= 1
-            history_data["nurseHistory"][n]["numberOfConsecutiveAssignments"] = consecutive_shifts
-
-                        
+    # whole solution is read at once and indexed by proto indices of the variables,
+    # index -1 of a variable removed by presolve reads the appended zero
+    values = np.append(solver.ResponseProto().solution, 0)
+
+    results.set_week(week_number, values[columns["shifts_with_skills"]])
+    update_history(history_data, values[columns["shifts"]], values[columns["working_weekends"]])
     return
 
+def set_solver_profile(solver, time_limit, constants):
+    """
+    Sets parameters of the solver of profile given by option "solver_profile" and the time limit of the week,
+    the deterministic profile limits deterministic time and gives the search at most 10 times more wall time.
+    Without the option, parameters tuned for the size of the instance (constants["tuned_parameters"]) are set
+    over the default profile. Option "threads" sets the number of workers.
+    """
+
+    profile_name = constants["options"].get("solver_profile", default_solver_profile)
+    if profile_name not in solver_profiles:
+        raise ValueError(f"Unknown solver profile '{profile_name}', profiles are {', '.join(solver_profiles)}.")
+    parameters = dict(solver_profiles[profile_name])
+    if "solver_profile" not in constants["options"]:
+        parameters.update(constants.get("tuned_parameters", {}))
+    for name, value in parameters.items():
+        # search branching is given by its name, so that parameters can be stored in JSON
+        if name == "search_branching":
+            value = getattr(cp_model, value)
+        setattr(solver.parameters, name, value)
+
+    solver.parameters.max_time_in_seconds = time_limit
+    if profile_name == "deterministic":
+        solver.parameters.max_deterministic_time = time_limit
+        solver.parameters.max_time_in_seconds = 10 * time_limit
+
+    # number of search workers, the benchmark runner splits its cores between jobs and workers
+    if constants["options"].get("threads"):
+        solver.parameters.num_workers = int(constants["options"]["threads"])
+
 def compute_one_week(time_limit_for_week, week_number, constants, results):
-    # Creates the model.
-    model = cp_model.CpModel()
+    get_week_instance(constants, week_number)
+
+    # Week whose minimal coverage can not be met is not given to the solver.
+    problems = check_week_capacity(constants)
+    if problems:
+        set_precheck_results(results, week_number, problems)
+        return
+
+    build_start = time.perf_counter()
+
+    # The skeleton is reused for all weeks, so it is presolved only by the scenario.
+    presolve = set_presolve(constants, week=not constants["options"].get("cp_sat_skeleton"))
+
+    model_cache = get_model_cache(constants)
+    cached = None
+    if model_cache is not None:
+        model_cache_key = get_model_cache_key(constants, week_number, "cp_sat", formulation_version)
+        cached = load_from_model_cache(model_cache, model_cache_key, [".pbtxt", ".npz"])
+
+    if cached is not None:
+        # Model was built by an earlier run for the same data and history.
+        model = cp_model.CpModel()
+        with open(cached[".pbtxt"]) as file:
+            model.Proto().parse_text_format(file.read())
+        with np.load(cached[".npz"]) as file:
+            basic_ILP_vars = {"columns": dict(file)}
+        soft_ILP_vars = {}
+        results[(week_number, "build")] = "cached"
+    elif constants["options"].get("cp_sat_skeleton"):
+        # Skeleton of the week is built once and kept in 'constants', every week works on its copy.
+        if "cp_sat_skeleton" in constants:
+            results[(week_number, "build")] = "updated"
+        else:
+            constants["cp_sat_skeleton"] = build_week_skeleton(constants)
+            results[(week_number, "build")] = "built"
+        skeleton, basic_ILP_vars, soft_ILP_vars, week_data_constraints = constants["cp_sat_skeleton"]
+        model = skeleton.Clone()
+        set_week_data_bounds(model, week_data_constraints, constants)
+        add_history_constraints(model, basic_ILP_vars, soft_ILP_vars, constants)
+    else:
+        # Creates the model.
+        model = cp_model.CpModel()
+
+        # Create ILP variables.
+        # shifts, shifts_with_skills, insufficient_staffing = init_ilp_vars(model, all_nurses, all_days, all_shifts, all_skills)
+        basic_ILP_vars = init_ilp_vars(model, constants)
+
+        # Add hard constrains to model
+        add_hard_constrains(model, basic_ILP_vars, constants)
+        
+        soft_ILP_vars = init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants)
 
-    # Create ILP variables.
-    # shifts, shifts_with_skills, insufficient_staffing = init_ilp_vars(model, all_nurses, all_days, all_shifts, all_skills)
-    basic_ILP_vars = init_ilp_vars(model, constants)
+        for req in constants["wd_data"]["requirements"]:
+            add_shift_skill_req(model, req, basic_ILP_vars, soft_ILP_vars, constants)
 
-    # Add hard constrains to model
-    add_hard_constrains(model, basic_ILP_vars, constants)
-    
-    soft_ILP_vars = init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants)
+        add_soft_constraints(model, basic_ILP_vars, soft_ILP_vars, constants)
 
-    for req in constants["wd_data"]["requirements"]:
-        add_shift_skill_req(model, req, basic_ILP_vars, soft_ILP_vars, constants)
+        add_insatisfied_preferences_reqs(model, constants["instance"].week_requested_off, soft_ILP_vars["unsatisfied_preferences"], basic_ILP_vars["shifts"])
 
-    add_soft_constraints(model, basic_ILP_vars, soft_ILP_vars, constants)
+        add_total_working_weekends_soft_constraints(model, constants["instance"], soft_ILP_vars["total_working_weekends_over_limit"], soft_ILP_vars["working_weekends"], constants["all_nurses"])
 
-    # Sets objective function
-    set_objective_function(model, basic_ILP_vars, soft_ILP_vars, constants)
+        add_history_constraints(model, basic_ILP_vars, soft_ILP_vars, constants)
+
+        # Sets objective function
+        set_objective_function(model, basic_ILP_vars, soft_ILP_vars, constants)
+        results[(week_number, "build")] = "built"
+
+    if "columns" not in basic_ILP_vars:
+        basic_ILP_vars["columns"] = get_columns(basic_ILP_vars, soft_ILP_vars, constants)
+
+    if cached is None and model_cache is not None:
+        def write_columns(path):
+            with open(path, "wb") as file:
+                np.savez(file, **basic_ILP_vars["columns"])
+        store_in_model_cache(model_cache, model_cache_key, {".pbtxt": model.ExportToFile, ".npz": write_columns})
+
+    results[(week_number, "build_time")] = time.perf_counter() - build_start
+    results[(week_number, "model_size")] = (len(model.Proto().variables), len(model.Proto().constraints))
+    if presolve is not None:
+        results[(week_number, "presolve")] = presolve["removed"]
+
+    # Aggregated model of nurse classes gives a start schedule, its lower bound of the week is kept as a by-product
+    # (there is no mode computing only the bound, it is 0 on nearly every INRC-II week).
+    aggregate = None
+    if constants["options"].get("aggregate") == "hint":
+        aggregate = solve_aggregate_week(constants, float(constants["options"].get("aggregate_time", 5)))
+        results[(week_number, "aggregate_bound")] = aggregate["bound"]
+
+    # Schedule of the previous week, the disaggregated or the greedy schedule is used as a hint, the hint is not part of the cached model.
+    start_schedule = None
+    if constants["options"].get("warm_start"):
+        start_schedule = get_warm_start_schedule(results, constants, week_number)
+    if start_schedule is None and aggregate is not None and constants["options"]["aggregate"] == "hint":
+        start_schedule = aggregate["schedule"]
+    if start_schedule is None and constants["options"].get("greedy_hint"):
+        start_schedule = construct_schedule(constants)
+    if start_schedule is not None:
+        add_warm_start(model, order_start_schedule(start_schedule, constants), basic_ILP_vars)
 
     # Creates the solver and solve.
     solver = cp_model.CpSolver()
-    solver.parameters.linearization_level = 0
-    # Enumerate all solutions.
-    solver.parameters.enumerate_all_solutions = True
+    set_solver_profile(solver, time_limit_for_week, constants)
 
     class NursesPartialSolutionPrinter(cp_model.CpSolverSolutionCallback):
         """Print intermediate solutions."""
 
-        def __init__(self, basic_ILP_vars, soft_ILP_vars, constants, solution_limit):
+        def __init__(self, basic_ILP_vars, soft_ILP_vars, constants):
             cp_model.CpSolverSolutionCallback.__init__(self)
-            self._shifts = basic_ILP_vars["shifts"]
-            self._shifts_with_skills = basic_ILP_vars["shifts_with_skills"]
             self._num_nurses = constants["num_nurses"]
             self._num_days = constants["num_days"]
             self._num_shifts = constants["num_shifts"]
             self._solution_count = 0
-            self._solution_limit = solution_limit
+            self._incumbents = []
 
         def on_solution_callback(self):
             self._solution_count += 1
+            if not self._incumbents or self.ObjectiveValue() < self._incumbents[-1][1]:
+                self._incumbents.append((self.WallTime(), self.ObjectiveValue()))
 
             # print(f"Solution {self._solution_count} with value: {self.ObjectiveValue()} and time: {self.WallTime()} s")   
-            if self._solution_count >= self._solution_limit:
-                # print(f"Stop search after {self._solution_limit} solutions")
-                self.StopSearch()
 
         def solution_count(self):
             return self._solution_count
 
-    # Display the first five solutions.
-    solution_limit = 100000
-    solution_printer = NursesPartialSolutionPrinter(basic_ILP_vars, soft_ILP_vars, constants, solution_limit)
+        def incumbents(self):
+            return self._incumbents
 
-    solver.parameters.max_time_in_seconds = time_limit_for_week
+    solution_printer = NursesPartialSolutionPrinter(basic_ILP_vars, soft_ILP_vars, constants)
+
+    solve_start = time.perf_counter()
     status = solver.Solve(model, solution_printer)
 
+    # (time, objective value) of every improving solution
+    results[(week_number, "incumbents")] = solution_printer.incumbents()
+    solver_bound = solver.BestObjectiveBound() if status != cp_model.INFEASIBLE and status != cp_model.MODEL_INVALID else None
+
+    greedy_fallback = status != cp_model.FEASIBLE and status != cp_model.OPTIMAL and constants["options"].get("greedy_fallback")
+    if greedy_fallback:
+        # No solution was found in the time limit, the solver only completes the greedy schedule.
+        model.ClearHints()
+        add_warm_start(model, order_start_schedule(construct_schedule(constants), constants), basic_ILP_vars)
+        solver.parameters.fix_variables_to_their_hinted_value = True
+        solver.parameters.max_time_in_seconds = float(constants["options"].get("greedy_fallback_time", 10))
+        solver.parameters.max_deterministic_time = float("inf")
+        status = solver.Solve(model)
+        # the completed greedy schedule is the only solution, timed from the start of the fallback solve
+        results[(week_number, "fallback_incumbents")] = [(solver.WallTime(), solver.ObjectiveValue())] if status == cp_model.FEASIBLE or status == cp_model.OPTIMAL else []
+    results[(week_number, "solve_time")] = time.perf_counter() - solve_start
+
+    # history from the start of the week is needed by the local search
+    history_data = copy.deepcopy(constants["h0_data"])
     save_tmp_results(results, solver, status, constants, basic_ILP_vars, soft_ILP_vars, week_number)
+    if greedy_fallback and (status == cp_model.FEASIBLE or status == cp_model.OPTIMAL):
+        results[(week_number, "status")] = "No solution found by the solver, the greedy schedule is used."
+
+    if constants["options"].get("local_search") and results[(week_number, "value")] != 99999:
+        improve_week_schedule(results, constants, week_number, history_data, float(constants["options"].get("local_search_time", 5)))
+    set_bounds(results, week_number, constants, solver_bound=solver_bound)
     # print_results(solver, solution_printer, basic_ILP_vars, soft_ILP_vars, constants)
     return
\ No newline at end of file
@@ -2,16 +2,62 @@
 
 from math import fabs
 
+import copy
+import functools
 import itertools
 import math
+import time
 
 import cplex
+import numpy as np
+
+from common.history import update_history
+from common.instance import get_week_instance
+from common.model_cache import get_model_cache, get_model_cache_key, load_from_model_cache, store_in_model_cache
+from common.warm_start import get_warm_start_schedule
+from common.construction import construct_schedule
+from common.aggregation import solve_aggregate_week
+from common.local_search import search_week_schedule
+from common.precheck import check_week_capacity, set_precheck_results
+from common.symmetry import get_symmetry_pairs, get_pattern_weights, order_start_schedule
+from common.successions import get_succession_cliques, get_first_day_forbidden
+from common.presolve import set_presolve, project_schedule
+from common.bounds import set_bounds
 
 shift_to_int = {"Early": 0, "Day": 1, "Late": 2, "Night": 3, "Any": 4, "None": 5}
 skill_to_int = {"HeadNurse": 0, "Nurse": 1, "Caretaker": 2, "Trainee": 3}
-contract_to_int = {"FullTime": 0, "PartTime": 1, "HalfTime": 2}
+contract_to_int = {"FullTime": 0, "PartTime": 1, "HalfTime": 2, "20Percent": 3}
 day_to_int = {"Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3, "Friday": 4, "Saturday": 5, "Sunday": 6}
 
+# increase with every change of the built model, models stored in the model cache are keyed by it
+formulation_version = 2
+
+# Named settings of the solver, selected by option "solver_profile", parameters are given by their path in 'c.parameters'.
+# "optimal" keeps the settings the backend always had, "fast" searches for good solutions first and stops at the default
+# gaps, "deterministic" uses the deterministic parallel mode with a fixed seed and limits the search by deterministic
+# time (ticks), so repeated runs give the same results. Threads 0 lets CPLEX use all cores, option "threads" overrides it.
+solver_profiles = {
+    "fast": {"threads": 0, "parallel": 0, "emphasis.mip": 1,
+             "mip.tolerances.mipgap": 1e-4, "mip.tolerances.absmipgap": 1e-6},
+    "optimal": {"threads": 0, "parallel": 0, "emphasis.mip": 2,
+                "mip.tolerances.mipgap": 1e-4, "mip.tolerances.absmipgap": 0.0},
+    "deterministic": {"threads": 0, "parallel": 1, "randomseed": 0, "emphasis.mip": 2,
+                      "mip.tolerances.mipgap": 1e-4, "mip.tolerances.absmipgap": 0.0},
+}
+default_solver_profile = "optimal"
+# values of parameters searched by 'tune_parameters.py', the tuned parameters are set over the default profile
+tuning_space = {
+    "emphasis.mip": [0, 1, 2, 3, 4],
+    "mip.strategy.heuristicfreq": [-1, 0, 5, 10, 20],
+    "mip.strategy.rinsheur": [-1, 0, 10, 50],
+    "mip.strategy.probe": [-1, 0, 1, 2, 3],
+    "mip.strategy.nodeselect": [0, 1, 2, 3],
+    "mip.strategy.variableselect": [-1, 0, 1, 2, 3, 4],
+    "randomseed": list(range(10)),
+}
+# nominal deterministic ticks of a second of the time limit for the deterministic profile
+deterministic_ticks_per_second = 1000
+
 def init_ilp_vars(model, constants):
     """
     Initializes basic variables for primarly for hard contraints.
@@ -77,54 +123,37 @@ def init_ilp_vars(model, constants):
 
 def add_shift_succession_reqs(model, shifts, all_nurses, all_days, all_shifts, num_days, constants):
     """
-    Adds hard constraint that disables invalid pairs of succcessive shift types.
+    Adds hard constraint that disables successions of shift types forbidden by the scenario, one clique row per pair of days.
     """
 
-    for n in all_nurses:
-        last_shift = shift_to_int[constants["h0_data"]["nurseHistory"][n]["lastAssignedShiftType"]]
-        if(last_shift == 2):
-            model.linear_constraints.add(
-                lin_expr=[cplex.SparsePair([shifts[n][0][last_shift - 1], shifts[n][0][last_shift - 2]], [1] * 2)],
-                senses=["E"],
-                rhs=[0])
-        if(last_shift == 3):
-            model.linear_constraints.add(
-                lin_expr=[cplex.SparsePair([shifts[n][0][last_shift - 1], shifts[n][0][last_shift - 2], shifts[n][0][last_shift - 3]], [1] * 3)],
-                senses=["E"],
-                rhs=[0])
+    # shifts of the first day that can not follow the last shift of the previous week are fixed to zero
+    first_day_forbidden = get_first_day_forbidden(constants["instance"])
+    fixed = [(shifts[n][0][s], 0) for n, s in np.argwhere(first_day_forbidden[list(all_nurses)]).tolist()]
+    if fixed:
+        model.variables.set_upper_bounds(fixed)
 
+    cliques = get_succession_cliques(constants["instance"].forbidden_successions)
+    for n in all_nurses:
         for d in range(num_days - 1):
-            for s in all_shifts:
-                if(s == 2):
-                    model.linear_constraints.add(
-                        lin_expr=[cplex.SparsePair([shifts[n][d][s], shifts[n][d + 1][s - 1], shifts[n][d + 1][s - 2]], [1] * 3)],
-                        senses=["L"],
-                        rhs=[1])
-                if(s == 3):
-                    model.linear_constraints.add(
-                        lin_expr=[cplex.SparsePair([shifts[n][d][s], shifts[n][d + 1][s - 1], shifts[n][d + 1][s - 2], shifts[n][d + 1][s - 3]], [1] * 4)],
-                        senses=["L"],
-                        rhs=[1])
+            for preceding, succeeding in cliques:
+                clique = [shifts[n][d][s] for s in preceding] + [shifts[n][d + 1][s] for s in succeeding]
+                model.linear_constraints.add(
+                    lin_expr=[cplex.SparsePair(clique, [1] * len(clique))],
+                    senses=["L"],
+                    rhs=[1])
 
-def add_missing_skill_req(model, nurses_data, shifts_with_skills, all_days, all_shifts, all_skills):
+def add_missing_skill_req(model, instance, shifts_with_skills, all_days, all_shifts, all_skills):
     """
     Adds hard constraint that disables nurses working shift with a skill that they do not possess.
     """
 
-    for n, nurse_data in enumerate(nurses_data):
-        for sk in all_skills:
-            has_skill = False
-            for skill in nurse_data["skills"]:
-                if sk == skill_to_int[skill]:
-                    has_skill = True
-                    break
-            if has_skill is False:
-                for d in all_days:
-                    for s in all_shifts:
-                        model.linear_constraints.add(
-                        lin_expr=[cplex.SparsePair([shifts_with_skills[n][d][s][sk]], [1])],
-                        senses=["E"],
-                        rhs=[0])
+    for n, sk in np.argwhere(~instance.nurse_skills[:, list(all_skills)]).tolist():
+        for d in all_days:
+            for s in all_shifts:
+                model.linear_constraints.add(
+                lin_expr=[cplex.SparsePair([shifts_with_skills[n][d][s][sk]], [1])],
+                senses=["E"],
+                rhs=[0])
 
 
 def add_hard_constrains(model, basic_ILP_vars, constants):
@@ -137,9 +166,8 @@ def add_hard_constrains(model, basic_ILP_vars, constants):
     all_days = constants["all_days"]
     all_skills = constants["all_skills"]
     num_days = constants["num_days"]
-    sc_data = constants["sc_data"]
+    instance = constants["instance"]
     wd_data = constants["wd_data"]
-    h0_data = constants["h0_data"]
     shifts = basic_ILP_vars["shifts"]
     working_days = basic_ILP_vars["working_days"]
     shifts_with_skills = basic_ILP_vars["shifts_with_skills"]
@@ -179,7 +207,7 @@ def add_hard_constrains(model, basic_ILP_vars, constants):
             rhs=[0])
 
     add_shift_succession_reqs(model, shifts, all_nurses, all_days, all_shifts, num_days, constants)
-    add_missing_skill_req(model, sc_data["nurses"], shifts_with_skills, all_days, all_shifts, all_skills)
+    add_missing_skill_req(model, instance, shifts_with_skills, all_days, all_shifts, all_skills)
 
     for req in wd_data["requirements"]:
         add_shift_skill_req_minimal(model, req, basic_ILP_vars, constants)
@@ -194,15 +222,7 @@ def add_shift_skill_req_minimal(model, req, basic_ILP_vars, constants):
 
     s = shift_to_int[req["shiftType"]]
     sk = skill_to_int[req["skill"]]
-    minimal_capacities_in_week = [
-        req["requirementOnMonday"]["minimum"],
-        req["requirementOnTuesday"]["minimum"],
-        req["requirementOnWednesday"]["minimum"],
-        req["requirementOnThursday"]["minimum"],
-        req["requirementOnFriday"]["minimum"],
-        req["requirementOnSaturday"]["minimum"],
-        req["requirementOnSunday"]["minimum"],
-    ]
+    minimal_capacities_in_week = constants["instance"].week_demand[:, s, sk, 0].tolist()
 
     for d, min_capacity in enumerate(minimal_capacities_in_week):
         skills_worked = []
@@ -221,9 +241,7 @@ def init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants):
     num_days = constants["num_days"]
     shifts = basic_ILP_vars["shifts"]
     working_days = basic_ILP_vars["working_days"]
-    wd_data = constants["wd_data"]
-    sc_data = constants["sc_data"]
-    history_data = constants["h0_data"]
+    instance = constants["instance"]
 
     # Creates insufficient staffing variables.
     # shifts[(d,s,sk)]: number of nurses under optimal number for day d shift s and skill sk
@@ -332,7 +350,7 @@ def init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants):
     vars_to_add = []
     violations_of_min_consecutive_days_off = {}
     for n in all_nurses:
-        min_consecutive_days_off = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["minimumNumberOfConsecutiveDaysOff"]
+        min_consecutive_days_off = int(instance.min_consecutive_days_off[n])
         for d in all_days:
             for dd in range(1, min_consecutive_days_off):
                 var_name = f"violations_of_min_consecutive_days_off_n{n}_d{d}_dd{dd}"
@@ -343,7 +361,7 @@ def init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants):
     vars_to_add = []
     violations_of_min_consecutive_working_days = {}
     for n in all_nurses:
-        min_consecutive_working_days = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["minimumNumberOfConsecutiveWorkingDays"]
+        min_consecutive_working_days = int(instance.min_consecutive_working_days[n])
         for d in all_days:
             for dd in range(1, min_consecutive_working_days):
                 var_name = f"violations_of_min_consecutive_working_days_n{n}_d{d}_dd{dd}"
@@ -356,7 +374,7 @@ def init_ilp_vars_for_soft_constraints(model, basic_ILP_vars, constants):
     for n in all_nurses:
         for d in all_days:
             for s in all_shifts:
-                min_consecutive_working_shifts = sc_data["shiftTypes"][s]["minimumNumberOfConsecutiveAssignments"]
+                min_consecutive_working_shifts = int(instance.shift_min_consecutive[s])
                 for dd in range(1, min_consecutive_working_shifts):
                     var_name = f"violations_of_min_consecutive_working_shifts_n{n}_d{d}_s{s}_dd{dd}"
                     violations_of_min_consecutive_working_shifts[(n, d, s, dd)] = var_name
@@ -424,15 +442,7 @@ def add_shift_skill_req_optimal(model, req, basic_ILP_vars, soft_ILP_vars, const
 
     s = shift_to_int[req["shiftType"]]
     sk = skill_to_int[req["skill"]]
-    optimal_capacities_in_week = [
-        req["requirementOnMonday"]["optimal"],
-        req["requirementOnTuesday"]["optimal"],
-        req["requirementOnWednesday"]["optimal"],
-        req["requirementOnThursday"]["optimal"],
-        req["requirementOnFriday"]["optimal"],
-        req["requirementOnSaturday"]["optimal"],
-        req["requirementOnSunday"]["optimal"],
-    ]
+    optimal_capacities_in_week = constants["instance"].week_demand[:, s, sk, 1].tolist()
 
     for d, opt_capacity in enumerate(optimal_capacities_in_week):
         skills_worked = []
@@ -467,8 +477,7 @@ def add_insatisfied_preferences_reqs(model, wd_data, basic_ILP_vars, soft_ILP_va
             #     rhs=[0])
 
 def add_total_working_weekends_soft_constraints(model, basic_ILP_vars, soft_ILP_vars, constants, week_number):
-    sc_data = constants["sc_data"]
-    h0_data = constants["h0_data"]
+    instance = constants["instance"]
     total_working_weekends_over_limit = soft_ILP_vars["total_working_weekends_over_limit"]
     working_weekends = soft_ILP_vars["working_weekends"]
 
@@ -488,8 +497,8 @@ def add_total_working_weekends_soft_constraints(model, basic_ILP_vars, soft_ILP_
     
     for n in all_nurses:
         # worked_weekends_limit_for_this_week = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["maximumNumberOfWorkingWeekends"]
-        worked_weekends_limit_for_this_week = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["maximumNumberOfWorkingWeekends"] * ((week_number + 1) / num_weeks)
-        worked_weekends_in_previous_weeks = h0_data["nurseHistory"][n]["numberOfWorkingWeekends"]
+        worked_weekends_limit_for_this_week = int(instance.max_working_weekends[n]) * ((week_number + 1) / num_weeks)
+        worked_weekends_in_previous_weeks = int(instance.history_working_weekends[n])
         model.linear_constraints.add(
             lin_expr=[cplex.SparsePair([total_working_weekends_over_limit[(n)], working_weekends[(n)]], [-1, 1])],
             senses=["L"],
@@ -499,15 +508,14 @@ def add_total_working_weekends_soft_constraints(model, basic_ILP_vars, soft_ILP_
         # model.Add(total_working_weekends_over_limit[(n)] >= -(sum(worked_weekends) - worked_weekends_limit + worked_weekends_in_previous_weeks))
 
 def add_incomplete_weekends_constraint(model, basic_ILP_vars, soft_ILP_vars, constants):
-    nurses_data = constants["sc_data"]["nurses"]
-    contracts_data = constants["sc_data"]["contracts"]
+    instance = constants["instance"]
     incomplete_weekends = soft_ILP_vars["incomplete_weekends"]
     working_weekends = soft_ILP_vars["working_weekends"]
     working_days = basic_ILP_vars["working_days"]
     all_nurses = constants["all_nurses"]
 
     for n in all_nurses:
-        isCompleteWeekendRequested = contracts_data[contract_to_int[nurses_data[n]["contract"]]]["completeWeekends"]
+        isCompleteWeekendRequested = int(instance.complete_weekends[n])
         if isCompleteWeekendRequested == 1:
             # incomplete_weekends[(n)] = model.NewBoolVar(f"incomplete_weekends_n{n}")
             # model.Add(incomplete_weekends[(n)] == 2*working_weekends[(n)] - working_days[(n, 5)] - working_days[(n, 6)])
@@ -517,19 +525,17 @@ def add_incomplete_weekends_constraint(model, basic_ILP_vars, soft_ILP_vars, con
                 rhs=[0])
             
 def add_total_working_days_out_of_bounds_constraint(model, basic_ILP_vars, soft_ILP_vars, constants, week_number):
-    nurses_data = constants["sc_data"]["nurses"]
-    contracts_data = constants["sc_data"]["contracts"]
+    instance = constants["instance"]
     total_working_days = soft_ILP_vars["total_working_days"]
     total_working_days_over_limit = soft_ILP_vars["total_working_days_over_limit"]
     total_working_days_under_limit = soft_ILP_vars["total_working_days_under_limit"]
     all_nurses = constants["all_nurses"]
     num_weeks = constants["num_weeks"]
-    h0_data = constants["h0_data"]
     
     for n in all_nurses:
-        worked_days_in_previous_weeks = h0_data["nurseHistory"][n]["numberOfAssignments"]
-        upper_limit = math.ceil(contracts_data[contract_to_int[nurses_data[n]["contract"]]]["maximumNumberOfAssignments"] * ((week_number + 1) / num_weeks))
-        lower_limit = math.ceil(contracts_data[contract_to_int[nurses_data[n]["contract"]]]["minimumNumberOfAssignments"] * ((week_number + 1) / num_weeks))
+        worked_days_in_previous_weeks = int(instance.history_assignments[n])
+        upper_limit = math.ceil(int(instance.max_assignments[n]) * ((week_number + 1) / num_weeks))
+        lower_limit = math.ceil(int(instance.min_assignments[n]) * ((week_number + 1) / num_weeks))
         model.linear_constraints.add(
                 lin_expr=[cplex.SparsePair([total_working_days_over_limit[(n)], total_working_days[(n)]], [-1, 1])],
                 senses=["L"],
@@ -544,12 +550,12 @@ def add_max_consecutive_work_days_constraint(model, basic_ILP_vars, soft_ILP_var
     violations_of_max_consecutive_working_days = soft_ILP_vars["violations_of_max_consecutive_working_days"]
     all_nurses = constants["all_nurses"]
     all_days = constants["all_days"]
-    sc_data = constants["sc_data"]
+    instance = constants["instance"]
     working_days = basic_ILP_vars["working_days"]
 
     for n in all_nurses:
-        consecutive_working_days_prev_week = constants["h0_data"]["nurseHistory"][n]["numberOfConsecutiveWorkingDays"]
-        max_consecutive_working_days = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["maximumNumberOfConsecutiveWorkingDays"]
+        consecutive_working_days_prev_week = int(instance.history_consecutive_working_days[n])
+        max_consecutive_working_days = int(instance.max_consecutive_working_days[n])
         for d in all_days:
             if d > max_consecutive_working_days:
                 model.linear_constraints.add(
@@ -567,13 +573,13 @@ def add_min_consecutive_work_days_constraint(model, basic_ILP_vars, soft_ILP_var
     violations_of_min_consecutive_working_days = soft_ILP_vars["violations_of_min_consecutive_working_days"]
     all_nurses = constants["all_nurses"]
     all_days = constants["all_days"]
-    sc_data = constants["sc_data"]
+    instance = constants["instance"]
     working_days = basic_ILP_vars["working_days"]
     not_working_days = soft_ILP_vars["not_working_days"]
 
     for n in all_nurses:
-        consecutive_working_days_prev_week = constants["h0_data"]["nurseHistory"][n]["numberOfConsecutiveWorkingDays"]
-        min_consecutive_working_days = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["minimumNumberOfConsecutiveWorkingDays"]
+        consecutive_working_days_prev_week = int(instance.history_consecutive_working_days[n])
+        min_consecutive_working_days = int(instance.min_consecutive_working_days[n])
         for d in all_days:
             for dd in range(1, min_consecutive_working_days):
                 if (d - dd) > 0:
@@ -600,18 +606,17 @@ def add_min_consecutive_shifts_constraint(model, basic_ILP_vars, soft_ILP_vars,
     all_nurses = constants["all_nurses"]
     all_days = constants["all_days"]
     all_shifts = constants["all_shifts"]
-    sc_data = constants["sc_data"]
+    instance = constants["instance"]
     working_days = basic_ILP_vars["working_days"]
     shifts = basic_ILP_vars["shifts"]
     not_working_shifts = soft_ILP_vars["not_working_shifts"]
 
     for n in all_nurses:
-        consecutive_working_shifts_prev_week = constants["h0_data"]["nurseHistory"][n]["numberOfConsecutiveWorkingDays"]
-        lastAssignedShiftType = constants["h0_data"]["nurseHistory"][n]["lastAssignedShiftType"]
-        lastShittTypeAsInt = shift_to_int[lastAssignedShiftType]
+        consecutive_working_shifts_prev_week = int(instance.history_consecutive_working_days[n])
+        lastShittTypeAsInt = int(instance.history_last_shift[n])
         for d in all_days:
             for s in all_shifts:
-                min_consecutive_shifts = sc_data["shiftTypes"][s]["minimumNumberOfConsecutiveAssignments"]
+                min_consecutive_shifts = int(instance.shift_min_consecutive[s])
                 for dd in range(1, min_consecutive_shifts):
                     if (d - dd) > 0:
                         model.linear_constraints.add(
@@ -636,13 +641,13 @@ def add_min_consecutive_days_off_constraint(model, basic_ILP_vars, soft_ILP_vars
     violations_of_min_consecutive_days_off = soft_ILP_vars["violations_of_min_consecutive_days_off"]
     all_nurses = constants["all_nurses"]
     all_days = constants["all_days"]
-    sc_data = constants["sc_data"]
+    instance = constants["instance"]
     working_days = basic_ILP_vars["working_days"]
     not_working_days = soft_ILP_vars["not_working_days"]
 
     for n in all_nurses:
-        consecutive_working_days_prev_week = constants["h0_data"]["nurseHistory"][n]["numberOfConsecutiveDaysOff"]
-        min_consecutive_days_off = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["minimumNumberOfConsecutiveDaysOff"]
+        consecutive_working_days_prev_week = int(instance.history_consecutive_days_off[n])
+        min_consecutive_days_off = int(instance.min_consecutive_days_off[n])
         for d in all_days:
             for dd in range(1, min_consecutive_days_off):
                 if (d - dd) > 0:
@@ -670,14 +675,14 @@ def add_max_consecutive_work_shifts_constraint(model, basic_ILP_vars, soft_ILP_v
     all_nurses = constants["all_nurses"]
     all_days = constants["all_days"]
     all_shifts = constants["all_shifts"]
-    sc_data = constants["sc_data"]
+    instance = constants["instance"]
     shifts = basic_ILP_vars["shifts"]
 
     for n in all_nurses:
-        last_shift = shift_to_int[constants["h0_data"]["nurseHistory"][n]["lastAssignedShiftType"]]
-        consecutive_shifts_prev_week = constants["h0_data"]["nurseHistory"][n]["numberOfConsecutiveAssignments"]
+        last_shift = int(instance.history_last_shift[n])
+        consecutive_shifts_prev_week = int(instance.history_consecutive_shifts[n])
         for s in all_shifts:
-            max_consecutive_working_shifts = sc_data["shiftTypes"][s]["maximumNumberOfConsecutiveAssignments"]
+            max_consecutive_working_shifts = int(instance.shift_max_consecutive[s])
             for d in all_days:
                 if d > max_consecutive_working_shifts:
                     model.linear_constraints.add(
@@ -695,12 +700,12 @@ def add_max_consecutive_days_off_constraint(model, basic_ILP_vars, soft_ILP_vars
     violations_of_max_consecutive_days_off = soft_ILP_vars["violations_of_max_consecutive_days_off"]
     all_nurses = constants["all_nurses"]
     all_days = constants["all_days"]
-    sc_data = constants["sc_data"]
+    instance = constants["instance"]
     working_days = basic_ILP_vars["working_days"]
 
     for n in all_nurses:
-        consecutive_days_off_prev_week = constants["h0_data"]["nurseHistory"][n]["numberOfConsecutiveDaysOff"]
-        max_consecutive_working_days = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["maximumNumberOfConsecutiveDaysOff"]
+        consecutive_days_off_prev_week = int(instance.history_consecutive_days_off[n])
+        max_consecutive_working_days = int(instance.max_consecutive_days_off[n])
         for d in all_days:
             if d > max_consecutive_working_days:
                 model.linear_constraints.add(
@@ -742,35 +747,58 @@ def add_soft_constraints(model, basic_ILP_vars, soft_ILP_vars, constants, week_n
     
     return 
 
-def save_tmp_results(results, solver, constants, basic_ILP_vars, soft_ILP_vars, week_number):
-    num_days = constants["num_days"]
-    num_weeks = constants["num_weeks"]
-    num_nurses = constants["num_nurses"]
-    num_skills = constants["num_skills"]
-    num_shifts = constants["num_shifts"]
-    history_data = constants["h0_data"]
-    working_weekends = soft_ILP_vars["working_weekends"]
-    incomplete_weekends = soft_ILP_vars["incomplete_weekends"]
-    total_working_days_over_limit = soft_ILP_vars["total_working_days_over_limit"]
-    total_working_days_under_limit = soft_ILP_vars["total_working_days_under_limit"]
-    total_working_weekends_over_limit = soft_ILP_vars["total_working_weekends_over_limit"]
+def add_symmetry_breaking_constraints(model, basic_ILP_vars, constants):
+    """
+    Orders shift patterns of interchangeable nurses lexicographically, so only one of their permutations is searched.
+    """
 
-    shifts_with_skills = basic_ILP_vars["shifts_with_skills"]
-    working_days = basic_ILP_vars["working_days"]
     shifts = basic_ILP_vars["shifts"]
+    weights = get_pattern_weights(constants).ravel().tolist()
+    for n1, n2 in get_symmetry_pairs(constants):
+        names = [shifts[n][d][s] for n in [n1, n2] for d in constants["all_days"] for s in constants["all_shifts"]]
+        model.linear_constraints.add(
+            lin_expr=[cplex.SparsePair(names, weights + [-weight for weight in weights])],
+            senses=["G"],
+            rhs=[0])
 
-    sub_value = 0
+def get_columns(c, basic_ILP_vars, soft_ILP_vars, constants):
+    """
+    Translates names of variables read by 'save_tmp_results' into numpy arrays of column indices.
+    """
+
+    all_nurses = constants["all_nurses"]
+
+    def column_indices(names):
+        names = np.array(names)
+        return np.array(c.variables.get_indices(names.ravel().tolist())).reshape(names.shape)
+
+    columns = {}
+    columns["shifts"] = column_indices(basic_ILP_vars["shifts"])
+    columns["working_days"] = column_indices(basic_ILP_vars["working_days"])
+    columns["shifts_with_skills"] = column_indices(basic_ILP_vars["shifts_with_skills"])
+    for name in ["working_weekends", "total_working_days_over_limit", "total_working_days_under_limit", "total_working_weekends_over_limit"]:
+        columns[name] = column_indices([soft_ILP_vars[name][(n)] for n in all_nurses])
+    return columns
+
+def save_tmp_results(results, solver, constants, basic_ILP_vars, soft_ILP_vars, week_number):
+    history_data = constants["h0_data"]
+    columns = basic_ILP_vars["columns"]
 
     if solver.is_primal_feasible() == False:
         results[(week_number, "status")] = "infeasible solution"
         results[(week_number, "value")] = 99999
         results[(week_number, "allweeksoft")] = 0
         return
-    
-    for n in range(num_nurses):
-        sub_value += solver.get_values(total_working_days_over_limit[(n)]) * 20
-        sub_value += solver.get_values(total_working_days_under_limit[(n)]) * 20
-        sub_value += solver.get_values(total_working_weekends_over_limit[(n)])  * 30
+
+    # whole solution is read at once and indexed by columns of the variables,
+    # column -1 of a variable removed by presolve reads the appended zero
+    values = np.append(np.rint(solver.get_values()).astype(int), 0)
+
+    sub_value = 0
+    sub_value += values[columns["total_working_days_over_limit"]].sum() * 20
+    sub_value += values[columns["total_working_days_under_limit"]].sum() * 20
+    sub_value += values[columns["total_working_weekends_over_limit"]].sum() * 30
+    sub_value = int(sub_value)
 
     results[(week_number, "status")] = solver.get_status()
 
@@ -784,48 +812,8 @@ def save_tmp_results(results, solver, constants, basic_ILP_vars, soft_ILP_vars,
     results[(week_number, "allweeksoft")] = sub_value
     results[("allweeksoft")] = sub_value
 
-    for n in range(num_nurses):
-        for d in range(num_days):
-            for s in range(num_shifts):
-                for sk in range(num_skills):
-                    results[(n, d + 7 * week_number, s, sk)] = solver.get_values(shifts_with_skills[n][d][s][sk])
-            history_data["nurseHistory"][n]["numberOfAssignments"] += solver.get_values(working_days[n][d])
-        history_data["nurseHistory"][n]["numberOfWorkingWeekends"] += solver.get_values(working_weekends[(n)])
-
-        if solver.get_values(working_days[n][6]) == 0:
-            consecutive_free_days = 1
-            d = 5
-            while d >= 0 and solver.get_values(working_days[n][d]) == 0:
-                consecutive_free_days += 1
-                d -= 1
-            history_data["nurseHistory"][n]["numberOfConsecutiveDaysOff"] = consecutive_free_days
-            history_data["nurseHistory"][n]["numberOfConsecutiveWorkingDays"] = 0
-            history_data["nurseHistory"][n]["numberOfConsecutiveAssignments"] = 0
-            history_data["nurseHistory"][n]["lastAssignedShiftType"] = "None"
-        else:
-            consecutive_work_days = 1
-            d = 5
-            while d >= 0 and solver.get_values(working_days[n][d]) == 1:
-                consecutive_work_days += 1
-                d -= 1
-            history_data["nurseHistory"][n]["numberOfConsecutiveWorkingDays"] = consecutive_work_days
-            history_data["nurseHistory"][n]["numberOfConsecutiveDaysOff"] = 0
-
-            consecutive_shift = 0
-            for s in range(num_shifts):
-                if solver.get_values(shifts[n][6][s]) == 1:
-                    consecutive_shift = s
-                    break
-            consecutive_shifts = 1
-            for shift_name, shift_id in shift_to_int.items():
-                if( shift_id == consecutive_shift):
-                    history_data["nurseHistory"][n]["lastAssignedShiftType"] = shift_name
-                    
-            d = 5
-            while d >= 0 and solver.get_values(shifts[n][d][consecutive_shift]) == 1:
-                consecutive_shifts += 1
-                d -= 1
-            history_data["nurseHistory"][n]["numberOfConsecutiveAssignments"] = consecutive_shifts
+    results.set_week(week_number, values[columns["shifts_with_skills"]])
+    update_history(history_data, values[columns["shifts"]], values[columns["working_weekends"]])
                     
 def set_objective_function(c, constants, basic_ILP_vars, soft_ILP_vars):
     all_nurses = constants["all_nurses"]
@@ -833,7 +821,7 @@ def set_objective_function(c, constants, basic_ILP_vars, soft_ILP_vars):
     all_skills = constants["all_skills"]
     all_days = constants["all_days"]
 
-    sc_data = constants["sc_data"]
+    instance = constants["instance"]
 
     num_nurses = constants["num_nurses"] 
     num_shifts = constants["num_shifts"]
@@ -859,7 +847,7 @@ def set_objective_function(c, constants, basic_ILP_vars, soft_ILP_vars):
     summed_violations_of_min_cons_working_days = []
     weights_of_violations_of_min_cons_working_days = []
     for n in all_nurses:
-        min_consecutive_working_days = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["minimumNumberOfConsecutiveWorkingDays"]
+        min_consecutive_working_days = int(instance.min_consecutive_working_days[n])
         for d in all_days:
             for dd in range(1, min_consecutive_working_days):
                 summed_violations_of_min_cons_working_days.append(violations_of_min_consecutive_working_days[(n, d, dd)])
@@ -868,7 +856,7 @@ def set_objective_function(c, constants, basic_ILP_vars, soft_ILP_vars):
     summed_violations_of_min_cons_days_off = []
     weights_of_violations_of_min_cons_days_off = []
     for n in all_nurses:
-        min_consecutive_days_off = sc_data["contracts"][contract_to_int[sc_data["nurses"][n]["contract"]]]["minimumNumberOfConsecutiveDaysOff"]
+        min_consecutive_days_off = int(instance.min_consecutive_days_off[n])
         for d in all_days:
             for dd in range(1, min_consecutive_days_off):
                 summed_violations_of_min_cons_days_off.append(violations_of_min_consecutive_days_off[(n, d, dd)])
@@ -879,7 +867,7 @@ def set_objective_function(c, constants, basic_ILP_vars, soft_ILP_vars):
     for n in all_nurses:
         for d in all_days:
             for s in all_shifts:
-                min_consecutive_shifts = sc_data["shiftTypes"][s]["minimumNumberOfConsecutiveAssignments"]
+                min_consecutive_shifts = int(instance.shift_min_consecutive[s])
                 for dd in range(1, min_consecutive_shifts):
                     summed_violations_of_min_cons_shift_type.append(violations_of_min_consecutive_working_shifts[(n, d, s, dd)])
                     weights_of_violations_of_min_cons_shift_type.append(15 * dd)
@@ -922,6 +910,14 @@ def set_objective_function(c, constants, basic_ILP_vars, soft_ILP_vars):
     return
 
 def setup_problem(c, constants, week_number):
+    get_week_instance(constants, week_number)
+
+    if constants["options"].get("cplex_builder") == "arrays" or constants.get("presolve") is not None:
+        # Same model built from index arrays with bulk calls, imported here because it reuses this module.
+        # Only this builder creates the presolved model, this one stays the full reference model.
+        from ibm.nsp_cplex_arrays import setup_problem as setup_problem_from_arrays
+        return setup_problem_from_arrays(c, constants, week_number)
+
     # Create ILP variables.
     basic_ILP_vars = init_ilp_vars(c, constants)
 
@@ -933,23 +929,252 @@ def setup_problem(c, constants, week_number):
     
     add_soft_constraints(c, basic_ILP_vars, soft_ILP_vars, constants, week_number)
 
+    if constants["options"].get("symmetry_breaking"):
+        add_symmetry_breaking_constraints(c, basic_ILP_vars, constants)
+
     set_objective_function(c, constants, basic_ILP_vars, soft_ILP_vars)
 
+    basic_ILP_vars["columns"] = get_columns(c, basic_ILP_vars, soft_ILP_vars, constants)
+
     return basic_ILP_vars, soft_ILP_vars
 
-def compute_one_week(time_limit_for_week, week_number, constants, results):
+class IncumbentCallback(cplex.callbacks.MIPInfoCallback):
+    """Records (time, objective value) of every improving solution in 'incumbents'."""
+
+    def __call__(self):
+        if not self.has_incumbent():
+            return
+        value = self.get_incumbent_objective_value()
+        if not self.incumbents or value < self.incumbents[-1][1]:
+            self.incumbents.append((self.get_time() - self.get_start_time(), value))
+
+def solve_recording_incumbents(c):
+    """
+    Solves model 'c' with 'IncumbentCallback' registered for this solve only.
+    Returns list of (time from the start of the solve, objective value) of its improving solutions.
+    """
+
+    incumbent_callback = c.register_callback(IncumbentCallback)
+    incumbent_callback.incumbents = []
+    try:
+        c.solve()
+    finally:
+        c.unregister_callback(IncumbentCallback)
+    return incumbent_callback.incumbents
+
+def add_warm_start(c, schedule, basic_ILP_vars):
+    """
+    Adds candidate schedule (nurses x days x shifts x skills) to the model as a (partial) MIP start.
+    """
+
+    columns = basic_ILP_vars["columns"]
+    schedule = project_schedule(schedule, columns["shifts_with_skills"] >= 0)
+    indices = np.concatenate([columns["shifts_with_skills"].ravel(), columns["shifts"].ravel(), columns["working_days"].ravel()])
+    values = np.concatenate([schedule.ravel(), schedule.any(axis=3).ravel(), schedule.any(axis=(2, 3)).ravel()]).astype(float)
+    exists = indices >= 0
+    indices, values = indices[exists], values[exists]
+    c.MIP_starts.add(cplex.SparsePair(ind=indices.tolist(), val=values.tolist()), c.MIP_starts.effort_level.auto, "warm_start")
+    return
+
+def polish_week_schedule(c, results, constants, basic_ILP_vars, soft_ILP_vars, week_number, history_data, time_limit):
+    """
+    Polishes the schedule of week 'week_number' stored in 'results' by the local search. Its objective is the week
+    objective of the CP-SAT model, so the polished schedule is evaluated by model 'c' with the assignments fixed
+    and replaces the stored schedule only if the objective of 'c' decreases. The value, the penalties of the limits
+    of the horizon and the history are then saved from the fixed model. 'history_data' is the history from the start
+    of the week, the improvement in the statistics of the local search is replaced by the improvement of 'c'.
+    """
+
+    improved = search_week_schedule(results, constants, week_number, history_data, time_limit)
+    if improved is None:
+        return
+    statistics = results[(week_number, "local_search")]
+    statistics["improvement"] = 0
+
+    # an assignment to a variable removed by presolve can not be fixed, the schedule is not feasible in 'c'
+    columns = basic_ILP_vars["columns"]["shifts_with_skills"]
+    if improved[columns < 0].any():
+        return
+
+    indices = columns[columns >= 0].tolist()
+    values = improved[columns >= 0].astype(float).tolist()
+    lower_bounds, upper_bounds = c.variables.get_lower_bounds(indices), c.variables.get_upper_bounds(indices)
+    c.variables.set_lower_bounds(list(zip(indices, values)))
+    c.variables.set_upper_bounds(list(zip(indices, values)))
+    c.MIP_starts.delete()
+    c.parameters.timelimit.set(time_limit)
+    c.parameters.dettimelimit.set(c.parameters.dettimelimit.max())
+    try:
+        c.solve()
+        objective = results[(week_number, "value")] + results[(week_number, "allweeksoft")]
+        if c.solution.is_primal_feasible() and c.solution.get_objective_value() < objective - 0.5:
+            status = results[(week_number, "status")]
+            constants["h0_data"]["nurseHistory"] = copy.deepcopy(history_data["nurseHistory"])
+            save_tmp_results(results, c.solution, constants, basic_ILP_vars, soft_ILP_vars, week_number)
+            results[(week_number, "status")] = status
+            statistics["improvement"] = objective - c.solution.get_objective_value()
+    finally:
+        c.variables.set_lower_bounds(list(zip(indices, lower_bounds)))
+        c.variables.set_upper_bounds(list(zip(indices, upper_bounds)))
+
+def get_lp_bound(c):
+    """
+    Solves the LP relaxation of a copy of model 'c'.
+    Returns its objective value, a lower bound of the week objective, or None if the relaxation is not solved to optimality.
+    """
+
+    relaxation = cplex.Cplex(c)
+    relaxation.set_problem_type(relaxation.problem_type.LP)
+    relaxation.set_log_stream(None)
+    relaxation.set_results_stream(None)
+    relaxation.solve()
+    if relaxation.solution.get_status() != relaxation.solution.status.optimal:
+        return None
+    return relaxation.solution.get_objective_value()
+
+def create_model(time_limit_for_week):
     c = cplex.Cplex()
     c.parameters.mip.display.set(0)
     c.parameters.output.clonelog.set(0)
     c.parameters.simplex.display.set(0)
     c.parameters.timelimit.set(time_limit_for_week)
-    c.parameters.mip.tolerances.absmipgap.set(0.0)
-    c.parameters.emphasis.mip.set(
-        c.parameters.emphasis.mip.values.optimality)
+    return c
+
+def set_solver_profile(c, time_limit, constants):
+    """
+    Sets parameters of model 'c' of profile given by option "solver_profile" and the time limit of the week,
+    the deterministic profile limits deterministic time and gives the search at most 10 times more wall time.
+    Without the option, parameters tuned for the size of the instance (constants["tuned_parameters"]) are set
+    over the default profile. Option "threads" sets the number of threads.
+    """
 
-    basic_ILP_vars, soft_ILP_vars = setup_problem(c, constants, week_number)
+    profile_name = constants["options"].get("solver_profile", default_solver_profile)
+    if profile_name not in solver_profiles:
+        raise ValueError(f"Unknown solver profile '{profile_name}', profiles are {', '.join(solver_profiles)}.")
+    parameters = dict(solver_profiles[profile_name])
+    if "solver_profile" not in constants["options"]:
+        parameters.update(constants.get("tuned_parameters", {}))
+    for path, value in parameters.items():
+        functools.reduce(getattr, path.split("."), c.parameters).set(value)
+
+    c.parameters.timelimit.set(time_limit)
+    c.parameters.dettimelimit.set(c.parameters.dettimelimit.max())
+    if profile_name == "deterministic":
+        c.parameters.dettimelimit.set(time_limit * deterministic_ticks_per_second)
+        c.parameters.timelimit.set(10 * time_limit)
+
+    # number of threads, the benchmark runner splits its cores between jobs and threads
+    if constants["options"].get("threads"):
+        c.parameters.threads.set(int(constants["options"]["threads"]))
 
-    c.solve()
-    sol = c.solution
+def compute_one_week(time_limit_for_week, week_number, constants, results):
+    get_week_instance(constants, week_number)
 
+    # Week whose minimal coverage can not be met is not given to the solver.
+    problems = check_week_capacity(constants)
+    if problems:
+        set_precheck_results(results, week_number, problems)
+        return
+
+    build_start = time.perf_counter()
+    # the persistent model is reused for more weeks, so only reductions that do not depend on the week are made
+    presolve = set_presolve(constants, week=not constants["options"].get("cplex_persistent"))
+
+    model_cache = get_model_cache(constants)
+    cached = None
+    if model_cache is not None:
+        model_cache_key = get_model_cache_key(constants, week_number, "cplex", formulation_version)
+        cached = load_from_model_cache(model_cache, model_cache_key, [".sav", ".npz"])
+
+    if cached is not None:
+        # Model was built by an earlier run for the same data and history.
+        c = create_model(time_limit_for_week)
+        c.read(cached[".sav"], "sav")
+        with np.load(cached[".npz"]) as file:
+            basic_ILP_vars = {"columns": dict(file)}
+        soft_ILP_vars = {}
+        results[(week_number, "build")] = "cached"
+    elif constants["options"].get("cplex_persistent"):
+        # Model of the first week is kept in 'constants' and only updated for the following weeks.
+        from ibm.nsp_cplex_arrays import setup_problem as setup_problem_from_arrays, update_problem
+
+        if "cplex_model" in constants and update_problem(constants["cplex_model"][0], constants, week_number, constants["cplex_model"][1]):
+            c, basic_ILP_vars, soft_ILP_vars = constants["cplex_model"]
+            results[(week_number, "build")] = "updated"
+        else:
+            c = create_model(time_limit_for_week)
+            basic_ILP_vars, soft_ILP_vars = setup_problem_from_arrays(c, constants, week_number)
+            constants["cplex_model"] = (c, basic_ILP_vars, soft_ILP_vars)
+            results[(week_number, "build")] = "built"
+    else:
+        c = create_model(time_limit_for_week)
+        basic_ILP_vars, soft_ILP_vars = setup_problem(c, constants, week_number)
+        results[(week_number, "build")] = "built"
+
+    if cached is None and model_cache is not None:
+        def write_columns(path):
+            with open(path, "wb") as file:
+                np.savez(file, **basic_ILP_vars["columns"])
+        store_in_model_cache(model_cache, model_cache_key, {".sav": lambda path: c.write(path, "sav"), ".npz": write_columns})
+
+    set_solver_profile(c, time_limit_for_week, constants)
+
+    results[(week_number, "build_time")] = time.perf_counter() - build_start
+    results[(week_number, "model_size")] = (c.variables.get_num(), c.linear_constraints.get_num())
+    if presolve is not None:
+        results[(week_number, "presolve")] = presolve["removed"]
+
+    # Aggregated model of nurse classes gives a start schedule, its lower bound of the week is kept as a by-product
+    # (there is no mode computing only the bound, it is 0 on nearly every INRC-II week).
+    aggregate = None
+    if constants["options"].get("aggregate") == "hint":
+        aggregate = solve_aggregate_week(constants, float(constants["options"].get("aggregate_time", 5)))
+        results[(week_number, "aggregate_bound")] = aggregate["bound"]
+
+    # Schedule of the previous week, the disaggregated or the greedy schedule is used as a MIP start, the start is not part of the cached model.
+    start_schedule = None
+    if constants["options"].get("warm_start"):
+        start_schedule = get_warm_start_schedule(results, constants, week_number)
+    if start_schedule is None and aggregate is not None and constants["options"]["aggregate"] == "hint":
+        start_schedule = aggregate["schedule"]
+    if start_schedule is None and constants["options"].get("greedy_hint"):
+        start_schedule = construct_schedule(constants)
+    if start_schedule is not None:
+        add_warm_start(c, order_start_schedule(start_schedule, constants), basic_ILP_vars)
+
+    # LP relaxation of the model is an independent lower bound of the week
+    lp_bound = get_lp_bound(c) if constants["options"].get("lp_bound") else None
+
+    solve_start = time.perf_counter()
+    # (time, objective value) of every improving solution
+    results[(week_number, "incumbents")] = solve_recording_incumbents(c)
+    sol = c.solution
+    solver_bound = None
+    if sol.get_status() != sol.status.MIP_infeasible:
+        try:
+            solver_bound = sol.MIP.get_best_objective()
+        except cplex.exceptions.CplexError:
+            pass
+
+    greedy_fallback = not sol.is_primal_feasible() and constants["options"].get("greedy_fallback")
+    if greedy_fallback:
+        # No solution was found in the time limit, the greedy schedule is given as a MIP start and completed.
+        c.MIP_starts.delete()
+        add_warm_start(c, order_start_schedule(construct_schedule(constants), constants), basic_ILP_vars)
+        c.parameters.timelimit.set(float(constants["options"].get("greedy_fallback_time", 10)))
+        c.parameters.dettimelimit.set(c.parameters.dettimelimit.max())
+        # solutions completing the greedy schedule, timed from the start of the fallback solve
+        results[(week_number, "fallback_incumbents")] = solve_recording_incumbents(c)
+        sol = c.solution
+    results[(week_number, "solve_time")] = time.perf_counter() - solve_start
+
+    # history from the start of the week is needed by the local search
+    history_data = copy.deepcopy(constants["h0_data"])
     save_tmp_results(results, sol, constants, basic_ILP_vars, soft_ILP_vars, week_number)
+    if greedy_fallback and sol.is_primal_feasible():
+        results[(week_number, "status")] = "No solution found by the solver, the greedy schedule is used."
+
+    if constants["options"].get("local_search") and results[(week_number, "value")] != 99999:
+        polish_week_schedule(c, results, constants, basic_ILP_vars, soft_ILP_vars, week_number, history_data, float(constants["options"].get("local_search_time", 5)))
+    set_bounds(results, week_number, constants, solver_bound=solver_bound, lp_bound=lp_bound)
+
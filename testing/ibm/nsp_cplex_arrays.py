@@ -0,0 +1,560 @@
+#!/usr/bin/python
+
+import math
+
+import numpy as np
+
+from common.instance import get_week_instance
+from common.symmetry import get_symmetry_pairs, get_pattern_weights
+from common.successions import get_succession_cliques, get_first_day_forbidden
+from common.presolve import get_mask, get_upper_bounds, is_week_presolve
+from ibm.nsp_cplex import shift_to_int, skill_to_int, day_to_int
+
+# Array based builder of the same model as 'setup_problem' in nsp_cplex.py.
+# Variables are addressed by integer column indices (no names are created) and every constraint family
+# is computed as index arrays and loaded into CPLEX with one bulk call instead of one call per row.
+
+def add_columns(model, count, ub, var_type):
+    """
+    Adds 'count' variables without names to the model, 'ub' is one upper bound or an array of them.
+    Returns numpy array with column indices of the added variables.
+    """
+
+    start = model.variables.get_num()
+    if count > 0:
+        ub = np.broadcast_to(ub, (count,)).tolist()
+        model.variables.add(lb=[0] * count, ub=ub, types=var_type * count)
+    return np.arange(start, start + count)
+
+def add_column_block(model, shape, ub, var_type):
+    """
+    Adds variables for every index of an array with 'shape' (C order, same order as the nested loops in nsp_cplex.py).
+    Returns array of column indices with that shape.
+    """
+
+    return add_columns(model, math.prod(shape), ub, var_type).reshape(shape)
+
+def add_ragged_column_block(model, mask, ub, var_type):
+    """
+    Adds variables only for indices where 'mask' is True, 'ub' is one upper bound or an array with the shape of 'mask'.
+    Returns array of column indices with the shape of 'mask', -1 where no variable exists.
+    """
+
+    columns = np.full(mask.shape, -1)
+    columns[mask] = add_columns(model, int(mask.sum()), np.broadcast_to(ub, mask.shape)[mask], var_type)
+    return columns
+
+def as_rows(columns):
+    """
+    Reshapes array of column indices to (number of rows, row length), a 1D array is a column of single entry rows.
+    """
+
+    columns = np.asarray(columns, dtype=int)
+    if columns.ndim == 1:
+        return columns[:, None]
+    return columns.reshape(columns.shape[0], math.prod(columns.shape[1:]))
+
+def rows(columns, coefficients, sense, rhs):
+    """
+    Describes a block of constraints of equal length.
+    'columns' has shape (number of rows, row length), 'coefficients' and 'rhs' are broadcasted to it.
+    """
+
+    columns = as_rows(columns)
+    return {
+        "columns": columns,
+        "values": np.broadcast_to(np.asarray(coefficients, dtype=float), columns.shape),
+        "senses": sense * len(columns),
+        "rhs": np.broadcast_to(np.asarray(rhs, dtype=float), (len(columns),)),
+    }
+
+def add_rows(model, blocks):
+    """
+    Loads all blocks of one constraint family into the model at once.
+    Entries with column -1 (variables removed by presolve) are left out of their rows.
+    Returns numpy array with the indices of the added rows.
+    """
+
+    blocks = [block for block in blocks if len(block["columns"]) > 0]
+    start = model.linear_constraints.get_num()
+    if len(blocks) == 0:
+        return np.arange(start, start)
+
+    row_ids = []
+    row_offset = start
+    for block in blocks:
+        number_of_rows, row_length = block["columns"].shape
+        row_ids.append(np.repeat(np.arange(row_offset, row_offset + number_of_rows), row_length))
+        row_offset += number_of_rows
+
+    model.linear_constraints.add(
+        senses="".join(block["senses"] for block in blocks),
+        rhs=np.concatenate([block["rhs"] for block in blocks]).tolist())
+    columns = np.concatenate([block["columns"].ravel() for block in blocks])
+    exists = columns >= 0
+    model.linear_constraints.set_coefficients(zip(
+        np.concatenate(row_ids)[exists].tolist(),
+        columns[exists].tolist(),
+        np.concatenate([block["values"].ravel() for block in blocks])[exists].tolist()))
+    return np.arange(start, row_offset)
+
+def stack(*columns):
+    """
+    Joins columns of a row block given as arrays of shape (number of rows) or (number of rows, k).
+    """
+
+    return np.concatenate([as_rows(c) for c in columns], axis=1)
+
+def get_requirement_arrays(constants):
+    """
+    Returns shift and skill of every requirement in week data and its minimal and optimal capacities per day.
+    """
+
+    requirements = constants["wd_data"]["requirements"]
+    req_shifts = np.array([shift_to_int[req["shiftType"]] for req in requirements], dtype=int)
+    req_skills = np.array([skill_to_int[req["skill"]] for req in requirements], dtype=int)
+    # days x requirements x (minimum, optimal)
+    capacities = constants["instance"].week_demand[:, req_shifts, req_skills]
+    return req_shifts, req_skills, capacities[:, :, 0].T, capacities[:, :, 1].T
+
+def init_columns(model, constants, week_number):
+    """
+    Creates all variables of the model in the same order as nsp_cplex.py does, with presolve only those that are not removed.
+    Returns a dictionary 'columns' with arrays of column indices for every family of variables.
+    """
+
+    num_nurses = constants["num_nurses"]
+    num_days = constants["num_days"]
+    num_shifts = constants["num_shifts"]
+    num_skills = constants["num_skills"]
+    instance = constants["instance"]
+
+    min_shift_series = instance.shift_min_consecutive
+    dd_range = np.arange(max(instance.min_consecutive_days_off.max(),
+                             instance.min_consecutive_working_days.max(),
+                             min_shift_series.max(), 1))
+
+    columns = {}
+    columns["shifts"] = add_column_block(model, (num_nurses, num_days, num_shifts), 1, "B")
+    columns["working_days"] = add_column_block(model, (num_nurses, num_days), 1, "B")
+    shape = (num_nurses, num_days, num_shifts, num_skills)
+    columns["shifts_with_skills"] = add_ragged_column_block(model, get_mask(constants, "shifts_with_skills", shape), 1, "B")
+    columns["insufficient_staffing"] = add_ragged_column_block(
+        model, get_mask(constants, "insufficient_staffing", shape[1:]), get_upper_bounds(constants, "insufficient_staffing", 10, shape[1:]), "N")
+    columns["unsatisfied_preferences"] = add_ragged_column_block(model, get_mask(constants, "unsatisfied_preferences", shape[:3]), 1, "B")
+    columns["total_working_days"] = add_column_block(model, (num_nurses,), num_days + 1, "N")
+    columns["working_weekends"] = add_column_block(model, (num_nurses,), 1, "B")
+
+    # bounds of slacks of the limits, at most what one week can exceed or miss given the right-hand sides of this week
+    bounds = np.array([[4], [7], [7]]).repeat(num_nurses, axis=1)
+    if is_week_presolve(constants):
+        rhs = get_limits_rhs(constants, week_number).reshape(3, num_nurses)
+        derived = np.stack([np.ceil(1 - rhs[0]), num_days - rhs[1], rhs[2]]).clip(min=0)
+        bounds = np.minimum(bounds, derived).astype(int)
+    columns["total_working_weekends_over_limit"] = add_columns(model, num_nurses, bounds[0], "N")
+    columns["incomplete_weekends"] = add_ragged_column_block(model, get_mask(constants, "incomplete_weekends", (num_nurses,)), 1, "B")
+    working_days_out_of_bounds = add_columns(model, 2 * num_nurses, bounds[1:].T.ravel(), "N").reshape(num_nurses, 2)
+    columns["total_working_days_over_limit"] = working_days_out_of_bounds[:, 0]
+    columns["total_working_days_under_limit"] = working_days_out_of_bounds[:, 1]
+    columns["violations_of_max_consecutive_working_days"] = add_column_block(model, (num_nurses, num_days), 1, "B")
+    columns["violations_of_max_consecutive_working_shifts"] = add_column_block(model, (num_nurses, num_days, num_shifts), 1, "B")
+    columns["violations_of_max_consecutive_days_off"] = add_column_block(model, (num_nurses, num_days), 1, "B")
+
+    # violations of minimal series exist only for 1 <= dd < minimal length of the series
+    mask = (dd_range >= 1)[None, None, :] & (dd_range[None, None, :] < instance.min_consecutive_days_off[:, None, None])
+    columns["violations_of_min_consecutive_days_off"] = add_ragged_column_block(model, np.broadcast_to(mask, (num_nurses, num_days, len(dd_range))), 1, "B")
+    mask = (dd_range >= 1)[None, None, :] & (dd_range[None, None, :] < instance.min_consecutive_working_days[:, None, None])
+    columns["violations_of_min_consecutive_working_days"] = add_ragged_column_block(model, np.broadcast_to(mask, (num_nurses, num_days, len(dd_range))), 1, "B")
+    mask = (dd_range >= 1)[None, None, None, :] & (dd_range[None, None, None, :] < min_shift_series[None, None, :, None])
+    columns["violations_of_min_consecutive_working_shifts"] = add_ragged_column_block(model, np.broadcast_to(mask, (num_nurses, num_days, num_shifts, len(dd_range))), 1, "B")
+
+    columns["not_working_shifts"] = add_column_block(model, (num_nurses, num_days, num_shifts), 1, "B")
+    columns["not_working_days"] = add_column_block(model, (num_nurses, num_days), 1, "B")
+    return columns
+
+def add_hard_constrains(model, columns, constants):
+    """
+    Adds all hard constraints to the model except minimal staffing and constraints depending on history.
+    """
+
+    shifts = columns["shifts"]
+    working_days = columns["working_days"]
+    shifts_with_skills = columns["shifts_with_skills"]
+    num_shifts = constants["num_shifts"]
+    num_skills = constants["num_skills"]
+    missing_skill = np.broadcast_to(~constants["instance"].nurse_skills[:, None, None, :], shifts_with_skills.shape)
+    skills_per_shift = shifts_with_skills.reshape(-1, num_skills)
+    succession_blocks = shift_succession_blocks(columns, constants)
+
+    add_rows(model, [
+        # Each nurse works at most one shift per day.
+        rows(shifts.reshape(-1, num_shifts), 1, "L", 1),
+        # Each nurse works at most one skill per shift.
+        rows(skills_per_shift[(skills_per_shift >= 0).sum(axis=1) > 1], 1, "L", 1),
+        # If nurse is working with skill that shift, she is working that shift.
+        rows(stack(shifts.ravel(), shifts_with_skills.reshape(-1, num_skills)), [-1] + [1] * num_skills, "E", 0),
+        # If nurse is working with a shift, she is working that day.
+        rows(stack(working_days.ravel(), shifts.reshape(-1, num_shifts)), [-1] + [1] * num_shifts, "E", 0),
+        # Nurses do not work with a skill that they do not possess.
+        rows(shifts_with_skills[missing_skill & (shifts_with_skills >= 0)], 1, "E", 0),
+    ] + succession_blocks)
+
+def shift_succession_blocks(columns, constants):
+    """
+    Row blocks of hard constraint that disables successions of shift types forbidden by the scenario,
+    one block per clique of 'get_succession_cliques'.
+    """
+
+    shifts = columns["shifts"]
+    blocks = []
+    for preceding, succeeding in get_succession_cliques(constants["instance"].forbidden_successions):
+        blocks.append(rows(stack(shifts[:, :-1, preceding].reshape(-1, len(preceding)), shifts[:, 1:, succeeding].reshape(-1, len(succeeding))), 1, "L", 1))
+    return blocks
+
+def set_first_day_bounds(model, columns, constants):
+    """
+    Fixes to zero shifts of the first day that can not follow the last shift of the previous week, frees the others.
+    """
+
+    first_day = columns["shifts"][:, 0]
+    upper_bounds = np.where(get_first_day_forbidden(constants["instance"]), 0, 1)
+    model.variables.set_upper_bounds(zip(first_day.ravel().tolist(), upper_bounds.ravel().tolist()))
+
+def add_shift_skill_req(model, columns, constants):
+    """
+    Adds hard constraint on minimal and soft constraint on optimal number of nurses in a shift working with specific skill.
+    Returns row indices of both families, their right-hand sides change every week.
+    """
+
+    shifts_with_skills = columns["shifts_with_skills"]
+    insufficient_staffing = columns["insufficient_staffing"]
+    req_shifts, req_skills, minimal, optimal = get_requirement_arrays(constants)
+
+    # skills_worked[r, d, n]: nurse 'n' works shift and skill of requirement 'r' on day 'd'
+    skills_worked = shifts_with_skills[:, :, req_shifts, req_skills].transpose(2, 1, 0).reshape(-1, constants["num_nurses"])
+    staffing = insufficient_staffing[:, req_shifts, req_skills].transpose(1, 0).ravel()
+    # rows that presolve found trivially satisfied
+    needed = get_mask(constants, "minimal_staffing", insufficient_staffing.shape)[:, req_shifts, req_skills].transpose(1, 0).ravel()
+    with_slack = staffing >= 0
+
+    minimal_rows = add_rows(model, [rows(skills_worked[needed], 1, "G", minimal.ravel()[needed])])
+    optimal_rows = add_rows(model, [rows(stack(staffing[with_slack], skills_worked[with_slack]), 1, "G", optimal.ravel()[with_slack])])
+    return minimal_rows, optimal_rows
+
+def add_soft_variable_links(model, columns, constants):
+    """
+    Adds constraints that link auxiliary soft constraint variables with basic variables.
+    """
+
+    working_days = columns["working_days"]
+    shifts = columns["shifts"]
+    working_weekends = columns["working_weekends"]
+    num_days = constants["num_days"]
+    complete = constants["instance"].complete_weekends
+
+    add_rows(model, [
+        rows(stack(columns["total_working_days"], working_days), [-1] + [1] * num_days, "E", 0),
+        rows(stack(columns["not_working_shifts"].ravel(), shifts.ravel()), 1, "E", 1),
+        rows(stack(columns["not_working_days"].ravel(), working_days.ravel()), 1, "E", 1),
+        rows(stack(working_weekends, working_days[:, 5]), [1, -1], "G", 0),
+        rows(stack(working_weekends, working_days[:, 6]), [1, -1], "G", 0),
+        rows(stack(columns["incomplete_weekends"][complete], working_weekends[complete], working_days[complete][:, [5, 6]]), [-1, 2, -1, -1], "E", 0),
+    ])
+
+def preference_blocks(columns, constants):
+    preferences = [
+        (int(preference["nurse"].split("_")[1]), day_to_int[preference["day"]], shift_to_int[preference["shiftType"]])
+        for preference in constants["wd_data"]["shiftOffRequests"]
+        if shift_to_int[preference["shiftType"]] != shift_to_int["Any"]
+    ]
+    nurse_ids, day_ids, shift_ids = np.array(preferences, dtype=int).reshape(-1, 3).T
+    return [rows(stack(columns["unsatisfied_preferences"][nurse_ids, day_ids, shift_ids], columns["shifts"][nurse_ids, day_ids, shift_ids]), [1, -1], "E", 0)]
+
+def get_limits_rhs(constants, week_number):
+    """
+    Right-hand sides of rows added by 'add_limits_constraints' for given week and current history.
+    """
+
+    instance = constants["instance"]
+    num_weeks = constants["num_weeks"]
+
+    worked_weekends_limit_for_this_week = instance.max_working_weekends * ((week_number + 1) / num_weeks)
+    upper_limit = np.ceil(instance.max_assignments * ((week_number + 1) / num_weeks))
+    lower_limit = np.ceil(instance.min_assignments * ((week_number + 1) / num_weeks))
+
+    return np.concatenate([
+        worked_weekends_limit_for_this_week - instance.history_working_weekends,
+        upper_limit - instance.history_assignments,
+        lower_limit - instance.history_assignments,
+    ])
+
+def add_limits_constraints(model, columns, constants, week_number):
+    """
+    Adds constraints on total number of working weekends and working days up to this week.
+    Returns their row indices, their right-hand sides change every week.
+    """
+
+    num_nurses = constants["num_nurses"]
+    working_weekends = columns["working_weekends"]
+    total_working_days = columns["total_working_days"]
+    rhs = get_limits_rhs(constants, week_number).reshape(3, num_nurses)
+
+    return add_rows(model, [
+        rows(stack(columns["total_working_weekends_over_limit"], working_weekends), [-1, 1], "L", rhs[0]),
+        rows(stack(columns["total_working_days_over_limit"], total_working_days), [-1, 1], "L", rhs[1]),
+        rows(stack(columns["total_working_days_under_limit"], total_working_days), [1, 1], "G", rhs[2]),
+    ])
+
+def max_consecutive_blocks(columns, constants):
+    """
+    Row blocks of constraints on maximal number of consecutive working days, days off and shifts of the same type.
+    Returns blocks inside the week and blocks of series continuing from the previous week.
+    """
+
+    instance = constants["instance"]
+    working_days = columns["working_days"]
+    shifts = columns["shifts"]
+    max_working_days = instance.max_consecutive_working_days.astype(int)
+    max_days_off = instance.max_consecutive_days_off.astype(int)
+    last_shift = instance.history_last_shift
+    blocks = []
+    history_blocks = []
+
+    for d in constants["all_days"]:
+        for limit in np.unique(max_working_days):
+            violations = columns["violations_of_max_consecutive_working_days"][:, d]
+            if d > limit:
+                nurses = max_working_days == limit
+                blocks.append(rows(stack(violations[nurses], working_days[nurses, d - limit: d + 1]), [-1] + [1] * (limit + 1), "L", limit))
+            else:
+                nurses = (max_working_days == limit) & (instance.history_consecutive_working_days >= limit - d)
+                history_blocks.append(rows(stack(violations[nurses], working_days[nurses, 0: d + 1]), [-1] + [1] * (d + 1), "L", d))
+
+    for s in constants["all_shifts"]:
+        limit = int(instance.shift_max_consecutive[s])
+        for d in constants["all_days"]:
+            violations = columns["violations_of_max_consecutive_working_shifts"][:, d, s]
+            if d > limit:
+                blocks.append(rows(stack(violations, shifts[:, d - limit: d + 1, s]), [-1] + [1] * (limit + 1), "L", limit))
+            else:
+                nurses = (last_shift == s) & (instance.history_consecutive_shifts >= limit - d)
+                history_blocks.append(rows(stack(violations[nurses], shifts[nurses, 0: d + 1, s]), [-1] + [1] * (d + 1), "L", d))
+
+    for d in constants["all_days"]:
+        for limit in np.unique(max_days_off):
+            violations = columns["violations_of_max_consecutive_days_off"][:, d]
+            if d > limit:
+                nurses = max_days_off == limit
+                blocks.append(rows(stack(violations[nurses], working_days[nurses, d - limit: d + 1]), 1, "G", 1))
+            else:
+                nurses = (max_days_off == limit) & (instance.history_consecutive_days_off >= limit - d)
+                history_blocks.append(rows(stack(violations[nurses], working_days[nurses, 0: d + 1]), 1, "G", 1))
+
+    return blocks, history_blocks
+
+def min_consecutive_blocks(violations, ends, series, minimal_length, history_nurses, d):
+    """
+    Row blocks penalizing a series of 'dd' days (1 <= dd < minimal length) ending before day 'd'.
+    'series' are variables that are 1 inside the series, 'ends' are variables that are 1 when the series is broken.
+    'history_nurses(length)' masks nurses whose series from the previous week has the given length.
+    Returns blocks inside the week and blocks of series continuing from the previous week.
+    """
+
+    blocks = []
+    history_blocks = []
+    for dd in range(1, minimal_length.max(initial=1)):
+        selected = minimal_length > dd
+        if (d - dd) > 0:
+            blocks.append(rows(stack(violations[selected, dd], ends[selected, d], series[selected, d - dd: d], ends[selected, d - dd - 1]),
+                               [-1] + [1] * (dd + 2), "L", dd + 1))
+        else:
+            selected = selected & history_nurses(d - dd)
+            history_blocks.append(rows(stack(violations[selected, dd], ends[selected, d], series[selected, 0: d]),
+                                       [-1] + [1] * (d + 1), "L", d))
+    return blocks, history_blocks
+
+def min_consecutive_all_blocks(columns, constants):
+    """
+    Row blocks of constraints on minimal number of consecutive working days, days off and shifts of the same type.
+    Returns blocks inside the week and blocks of series continuing from the previous week.
+    """
+
+    instance = constants["instance"]
+    working_days = columns["working_days"]
+    not_working_days = columns["not_working_days"]
+    shifts = columns["shifts"]
+    not_working_shifts = columns["not_working_shifts"]
+    consecutive_working_days_prev_week = instance.history_consecutive_working_days
+    consecutive_days_off_prev_week = instance.history_consecutive_days_off
+    last_shift = instance.history_last_shift
+    blocks = []
+    history_blocks = []
+
+    def collect(family_blocks):
+        blocks.extend(family_blocks[0])
+        history_blocks.extend(family_blocks[1])
+
+    for d in constants["all_days"]:
+        collect(min_consecutive_blocks(
+            columns["violations_of_min_consecutive_working_days"][:, d], not_working_days, working_days,
+            instance.min_consecutive_working_days,
+            lambda length: consecutive_working_days_prev_week == length, d))
+
+        collect(min_consecutive_blocks(
+            columns["violations_of_min_consecutive_days_off"][:, d], working_days, not_working_days,
+            instance.min_consecutive_days_off,
+            lambda length: consecutive_days_off_prev_week == length, d))
+
+        for s in constants["all_shifts"]:
+            minimal_length = np.full(constants["num_nurses"], instance.shift_min_consecutive[s])
+            collect(min_consecutive_blocks(
+                columns["violations_of_min_consecutive_working_shifts"][:, d, s], not_working_shifts[:, :, s], shifts[:, :, s],
+                minimal_length,
+                lambda length: (consecutive_working_days_prev_week == length) & (last_shift == s), d))
+
+    return blocks, history_blocks
+
+def add_series_constraints(model, columns, constants):
+    """
+    Adds constraints on minimal and maximal series inside the week.
+    """
+
+    max_blocks, _ = max_consecutive_blocks(columns, constants)
+    min_blocks, _ = min_consecutive_all_blocks(columns, constants)
+    add_rows(model, max_blocks + min_blocks)
+
+def add_history_constraints(model, columns, constants):
+    """
+    Adds constraints that depend on history of the previous week and shift off requests of this week, with symmetry breaking.
+    Must be the last rows of the model so that they can be replaced by 'update_problem' every week.
+    Returns their row indices.
+    """
+
+    _, max_blocks = max_consecutive_blocks(columns, constants)
+    _, min_blocks = min_consecutive_all_blocks(columns, constants)
+    return add_rows(model, max_blocks + min_blocks + preference_blocks(columns, constants) + symmetry_blocks(columns, constants))
+
+def symmetry_blocks(columns, constants):
+    """
+    Row block ordering shift patterns of interchangeable nurses of this week lexicographically, if option "symmetry_breaking" is on.
+    """
+
+    if not constants["options"].get("symmetry_breaking"):
+        return []
+    pairs = np.array(get_symmetry_pairs(constants), dtype=int).reshape(-1, 2)
+    weights = get_pattern_weights(constants).ravel()
+    patterns = columns["shifts"].reshape(constants["num_nurses"], -1)
+    return [rows(stack(patterns[pairs[:, 0]], patterns[pairs[:, 1]]), np.concatenate([weights, -weights]), "G", 0)]
+
+def set_objective_function(model, columns, constants):
+    model.objective.set_sense(model.objective.sense.minimize)
+
+    dd_weights = np.arange(columns["violations_of_min_consecutive_days_off"].shape[-1])
+    weighted = [
+        (columns["insufficient_staffing"], 30),
+        (columns["unsatisfied_preferences"], 10),
+        (columns["total_working_weekends_over_limit"], 30),
+        (columns["incomplete_weekends"], 30),
+        (columns["total_working_days_over_limit"], 20),
+        (columns["total_working_days_under_limit"], 20),
+        (columns["violations_of_max_consecutive_working_days"], 30),
+        (columns["violations_of_min_consecutive_working_days"], 30 * dd_weights),
+        (columns["violations_of_min_consecutive_days_off"], 30 * dd_weights),
+        (columns["violations_of_min_consecutive_working_shifts"], 15 * dd_weights),
+        (columns["violations_of_max_consecutive_days_off"], 30),
+        (columns["violations_of_max_consecutive_working_shifts"], 15),
+    ]
+
+    objective_columns = []
+    objective_weights = []
+    for family, weight in weighted:
+        weight = np.broadcast_to(weight, family.shape)
+        exists = family >= 0
+        objective_columns.append(family[exists])
+        objective_weights.append(weight[exists])
+
+    model.objective.set_linear(zip(
+        np.concatenate(objective_columns).tolist(),
+        np.concatenate(objective_weights).astype(float).tolist()))
+
+def get_ilp_vars(columns):
+    """
+    Converts arrays of column indices into the same structures of variables as nsp_cplex.py uses, so 'save_tmp_results' can read them.
+    """
+
+    basic_ILP_vars = {}
+    basic_ILP_vars["working_days"] = columns["working_days"].tolist()
+    basic_ILP_vars["shifts"] = columns["shifts"].tolist()
+    basic_ILP_vars["shifts_with_skills"] = columns["shifts_with_skills"].tolist()
+    basic_ILP_vars["columns"] = columns
+
+    soft_ILP_vars = {}
+    for name in ["insufficient_staffing", "unsatisfied_preferences", "total_working_days", "working_weekends",
+                 "total_working_weekends_over_limit", "total_working_days_over_limit", "total_working_days_under_limit",
+                 "incomplete_weekends", "violations_of_max_consecutive_working_days", "violations_of_max_consecutive_days_off",
+                 "violations_of_max_consecutive_working_shifts", "not_working_days", "not_working_shifts",
+                 "violations_of_min_consecutive_working_days", "violations_of_min_consecutive_days_off",
+                 "violations_of_min_consecutive_working_shifts"]:
+        family = columns[name]
+        if family.ndim == 1:
+            soft_ILP_vars[name] = {index: column for index, column in enumerate(family.tolist()) if column >= 0}
+        else:
+            soft_ILP_vars[name] = {index: int(column) for index, column in np.ndenumerate(family) if column >= 0}
+    return basic_ILP_vars, soft_ILP_vars
+
+def setup_problem(c, constants, week_number):
+    get_week_instance(constants, week_number)
+
+    # Create ILP variables.
+    columns = init_columns(c, constants, week_number)
+    set_first_day_bounds(c, columns, constants)
+
+    # Add constraints that are the same every week
+    add_hard_constrains(c, columns, constants)
+    add_soft_variable_links(c, columns, constants)
+    add_series_constraints(c, columns, constants)
+
+    # Add constraints whose right-hand sides change every week
+    row_indices = {}
+    row_indices["minimal"], row_indices["optimal"] = add_shift_skill_req(c, columns, constants)
+    row_indices["limits"] = add_limits_constraints(c, columns, constants, week_number)
+
+    # Add constraints that are replaced every week
+    row_indices["history"] = add_history_constraints(c, columns, constants)
+
+    set_objective_function(c, columns, constants)
+
+    basic_ILP_vars, soft_ILP_vars = get_ilp_vars(columns)
+    basic_ILP_vars["rows"] = row_indices
+    basic_ILP_vars["requirements"] = get_requirement_arrays(constants)[:2]
+    return basic_ILP_vars, soft_ILP_vars
+
+def update_problem(c, constants, week_number, basic_ILP_vars):
+    """
+    Updates model built by 'setup_problem' for another week with the current history.
+    Right-hand sides of staffing and limits constraints are patched, constraints depending on history and shift off requests are replaced
+    and bounds of the first day are set by the new last shifts.
+    Returns False if the requirements of the week have different structure and the model has to be built again.
+    """
+
+    get_week_instance(constants, week_number)
+
+    columns = basic_ILP_vars["columns"]
+    row_indices = basic_ILP_vars["rows"]
+    req_shifts, req_skills, minimal, optimal = get_requirement_arrays(constants)
+    prev_req_shifts, prev_req_skills = basic_ILP_vars["requirements"]
+    if not (np.array_equal(req_shifts, prev_req_shifts) and np.array_equal(req_skills, prev_req_skills)):
+        return False
+
+    c.linear_constraints.set_rhs(zip(
+        np.concatenate([row_indices["minimal"], row_indices["optimal"], row_indices["limits"]]).tolist(),
+        np.concatenate([minimal.ravel(), optimal.ravel(), get_limits_rhs(constants, week_number)]).astype(float).tolist()))
+
+    if len(row_indices["history"]) > 0:
+        c.linear_constraints.delete(int(row_indices["history"][0]), int(row_indices["history"][-1]))
+    row_indices["history"] = add_history_constraints(c, columns, constants)
+    set_first_day_bounds(c, columns, constants)
+
+    # the previous week solution is not a valid start for the new week
+    c.MIP_starts.delete()
+    return True
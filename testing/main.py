@@ -1,39 +1,36 @@
 #!/usr/bin/python
 
 import sys
-import json
+import copy
+import time
 
 import matplotlib.pyplot as plt 
 import numpy as np 
-from matplotlib.colors import LogNorm
-import matplotlib.ticker as ticker 
-import math
 
 from google.nsp_contest import compute_one_week as compute_one_week_or_tools
 from ibm.nsp_cplex import compute_one_week as compute_one_week_cplex
-
-def load_data(number_nurses: int, number_weeks: int, history_data_file_id: int, week_data_files_ids: list):
+from common.aggregation import compute_one_week as compute_one_week_aggregate
+from common.evaluation import evaluate_results
+from common.bounds import get_horizon_gap, format_gap
+from common.schedule_store import create_schedule_store
+from common.rendering import draw_schedule, render_schedule
+from common.dataset import get_instance_files, load_json, get_instance_arrays
+from common.instance import Instance
+from common.validation import get_validation_data, validate_schedule
+from common.tuning import load_tuned_parameters, default_tuned_parameters_file
+from common.time_budget import create_time_budget, allocate_week_time
+
+def load_data(number_nurses: int, number_weeks: int, history_data_file_id: str, week_data_files_ids: list, data_dir=None):
     """
-    Loads and prepairs data for computation.
+    Loads and prepairs data for computation. Files are looked up in 'data_dir' or, if it is not given,
+    in all directories of 'data' (see 'build_manifest'), by their ids as written in the file names ("0", "01", "0original", ...).
     Returns a dictionary named 'constants' containing loaded data.
     """
 
-    file_name = "data\hidden-JSON\H0-n0" + str(number_nurses) +"w" + str(number_weeks) + "-" + str(history_data_file_id) + ".json"
-    f0 = open(file_name)
-    h0_data = json.load(f0)
-    f0.close()
-
-    file_name = "data\hidden-JSON\Sc-n0" + str(number_nurses) +"w" + str(number_weeks) + ".json"
-    f1 = open(file_name)
-    sc_data = json.load(f1)
-    f1.close()
-
-    wd_data = []
-    for week in range(number_weeks):
-        file_name = "data\hidden-JSON\WD-n0" + str(number_nurses) +"w" + str(number_weeks) + "-" + str(week_data_files_ids[week]) + ".json"
-        f2 = open(file_name)
-        wd_data.append(json.load(f2))
-        f2.close()
+    sc_file, h0_file, wd_files = get_instance_files(number_nurses, number_weeks, history_data_file_id, week_data_files_ids[:number_weeks], data_dir)
+    h0_data = load_json(h0_file)
+    sc_data = load_json(sc_file)
+    wd_data = [load_json(wd_file) for wd_file in wd_files]
 
     # initialize constants
     num_nurses = len(sc_data["nurses"])
@@ -61,6 +58,9 @@ def load_data(number_nurses: int, number_weeks: int, history_data_file_id: int,
     constants["all_days"] = all_days
     constants["all_skills"] = all_skills
     constants["all_weeks"] = all_weeks
+    constants["options"] = {}
+    # typed arrays of the loaded data (the history at the start), builders of both solvers read the instance instead of the loaded data
+    constants["instance"] = Instance(get_instance_arrays(sc_data, h0_data, wd_data))
 
     return constants
 
@@ -70,84 +70,125 @@ def display_schedule(results, constants, number_weeks):
     Displays computed schedule as table in a figure.
     """
 
-    num_days = constants["num_days"] * number_weeks
-    num_nurses = constants["num_nurses"]
-    num_skills = constants["num_skills"]
-    num_shifts = constants["num_shifts"]
-
-    schedule_table = np.zeros([num_nurses, num_days * num_shifts]) 
-    legend = np.zeros([1, num_skills + 1])
-
-    for d in range(num_days):
-        for n in range(num_nurses):
-            for s in range(num_shifts):
-                for sk in range(num_skills):
-                    if results[(n, d, s, sk)] == 1:
-                        schedule_table[n][d*num_shifts + s] = 1 - (0.2 * sk)
-
-    for sk in range(num_skills):
-        legend[0][sk] = 1 - (0.2 * sk)
-
-    fig, (ax0, ax1) = plt.subplots(2, 1)
-    
-    c = ax0.pcolor(schedule_table) 
-    ax0.set_title('Schedule') 
-    ax0.set_xticks(np.arange(num_days*num_shifts))
-    ax0.set_xticklabels(np.arange(num_days*num_shifts) / 4)
-
-    ax0.xaxis.set_major_locator(ticker.MultipleLocator(4))
-
-    c = ax1.pcolor(legend, edgecolors='k', linewidths=5) 
-    ax1.set_title('Legend - skills') 
-    ax1.set_xticks(np.arange(num_skills + 1) + 0.5)
-    ax1.set_xticklabels([ "HeadNurse", "Nurse", "Caretaker", "Trainee", "Not working" ])
-    
-    fig.tight_layout() 
-    plt.show() 
-
-def main(time_limit_for_week, mode, number_nurses: int, number_weeks: int, history_data_file_id: int, week_data_files_ids: list):
+    fig = plt.figure()
+    draw_schedule(fig, np.asarray(results)[:, :constants["num_days"] * number_weeks], constants["num_shifts"], constants["num_skills"])
+    plt.show()
+    plt.close(fig)
+
+def parse_options(arguments):
+    """
+    Splits command line arguments into positional arguments and options given as '--name=value' (or '--name' for a switch).
+    Returns a tuple of the positional arguments and a dictionary of options.
+    """
+
+    positional = []
+    options = {}
+    for argument in arguments:
+        if argument.startswith("--"):
+            name, _, value = argument[2:].partition("=")
+            options[name.replace("-", "_")] = value if value != "" else True
+        else:
+            positional.append(argument)
+    return positional, options
+
+def main(time_limit_for_week, mode, number_nurses: int, number_weeks: int, history_data_file_id: str, week_data_files_ids: list, options=None):
     # Loading Data and init constants
     constants = load_data(number_nurses, number_weeks, history_data_file_id, week_data_files_ids)
+    constants["options"].update(options or {})
+    # parameters of the solver tuned for the size of the instance, option --tuned_parameters=none turns them off
+    tuned_parameters_file = constants["options"].get("tuned_parameters", default_tuned_parameters_file)
+    if tuned_parameters_file != "none":
+        constants["tuned_parameters"] = load_tuned_parameters("cplex" if mode == 0 else "cp_sat", constants["num_nurses"], tuned_parameters_file)
     print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
     if(mode == 0):
         print(f"CPLEX for {number_weeks} weeks ({' '.join(map(str, week_data_files_ids))}) and for {number_nurses} nurses")
     else:
         print(f"OR TOOLS for {number_weeks} weeks ({' '.join(map(str, week_data_files_ids))}) and for {number_nurses} nurses")
-
-    display = True
+    # named settings of the solver of the backend ("fast", "optimal" or "deterministic")
+    if constants["options"].get("solver_profile"):
+        print(f"solver profile: {constants['options']['solver_profile']}")
+    elif constants.get("tuned_parameters"):
+        print(f"tuned parameters: {', '.join(f'{name} {value}' for name, value in constants['tuned_parameters'].items())}")
+
+    # option --no_display keeps the figure closed (used by benchmark_runner.py, which renders through --render_dir)
+    display = not constants["options"].get("no_display")
     if(time_limit_for_week == 0):
         display = False
         time_limit_for_week = 10 + 10 * (constants["num_nurses"] - 20)
         # time_limit_for_week = 10
 
+    # total wall time of the horizon shared by the weeks, instead of the same time limit for every week
+    time_budget = None
+    if constants["options"].get("time_budget"):
+        time_budget = create_time_budget(constants, float(constants["options"]["time_budget"]))
+
     # accumulate results over weeks
-    results = {}
+    results = create_schedule_store(constants)
+    history_data = copy.deepcopy(constants["h0_data"])
     for week_number in range(number_weeks):
         constants["wd_data"] = constants["all_wd_data"][week_number]
-        if(mode == 0):
+        if time_budget is not None:
+            time_limit_for_week = allocate_week_time(time_budget, week_number)
+            results[(week_number, "time_allocation")] = time_limit_for_week
+        if constants["options"].get("aggregate") == "solve":
+            compute_one_week_aggregate(time_limit_for_week, week_number, constants, results)
+        elif(mode == 0):
             compute_one_week_cplex(time_limit_for_week, week_number, constants, results)
         else:
             compute_one_week_or_tools(time_limit_for_week, week_number, constants, results)
 
-    # display results
-    if(display):
+    # display results, or write them to a file (png, svg, ...) without a window
+    if constants["options"].get("render"):
+        render_schedule(np.asarray(results), constants["num_shifts"], constants["num_skills"], constants["options"]["render"])
+    elif(display):
         display_schedule(results, constants, number_weeks)
     print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
     print("----------------------------------------------------------------")
     total_value = results[("allweeksoft")]
+    violations = validate_schedule(results.get_schedule(number_weeks), get_validation_data(constants, history_data, number_weeks))
     for week_number in range(number_weeks):
         print(f"status:          {results[(week_number, 'status')]}")
         print(f"objective value: {results[(week_number, 'value')]}")
+        print(f"build time:      {results[(week_number, 'build_time')]:.3f} s ({results[(week_number, 'build')]})")
+        print(f"solve time:      {results[(week_number, 'solve_time')]:.3f} s")
+        if (week_number, "time_allocation") in results:
+            print(f"time allocated:  {results[(week_number, 'time_allocation')]:.3f} s")
+        if (week_number, "model_size") in results:
+            print(f"model size:      {results[(week_number, 'model_size')][0]} variables, {results[(week_number, 'model_size')][1]} constraints")
+        if (week_number, "presolve") in results:
+            print(f"presolve:        {sum(results[(week_number, 'presolve')].values())} variables removed")
+        if results.get((week_number, "aggregate_bound")) is not None:
+            print(f"aggregate bound: {results[(week_number, 'aggregate_bound')]}")
+        if (week_number, "bound") in results:
+            print(f"lower bound:     {results[(week_number, 'bound')]:.1f} ({', '.join(f'{source} {bound:.1f}' for source, bound in results[(week_number, 'bounds')].items())}), gap {format_gap(results[(week_number, 'gap')])}")
+        if results[(week_number, "incumbents")]:
+            print(f"first solution:  {results[(week_number, 'incumbents')][0][0]:.3f} s")
+        # the all-zero schedule of a week skipped by the precheck is not a solution, its violations are not counted
+        if (week_number, "precheck") in results:
+            print("hard violations: skipped by precheck")
+        else:
+            print(f"hard violations: {sum(violation['week'] == week_number for violation in violations)}")
         total_value += results[(week_number, "value")]
         print("----------------------------------------------------------------")
     print(f"value total: {total_value}")
+    if time_budget is not None:
+        print(f"time budget:     {time_budget['total']:.3f} s, used {time.perf_counter() - time_budget['start']:.3f} s")
+    _, horizon_bound, horizon_gap = get_horizon_gap(results, number_weeks)
+    print(f"horizon bound:   {horizon_bound:.1f} (sum of week bounds), gap {format_gap(horizon_gap)}")
+    evaluation = evaluate_results(results, constants, history_data, number_weeks)
+    print(f"INRC-II value:   {evaluation['total']} ({', '.join(f'{family} {evaluation[family].sum()}' for family in evaluation if family not in ['weeks', 'total'])})")
+    if "model_cache" in constants:
+        print(f"model cache:     {constants['model_cache']['hits']} hits, {constants['model_cache']['misses']} misses")
     print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+    return results
 
 if __name__ == "__main__":
-    time_limit_for_week = int(sys.argv[1])
-    mode = int(sys.argv[2])
-    number_nurses = int(sys.argv[3])
-    number_weeks = int(sys.argv[4])
-    history_data_file_id = int(sys.argv[5])
-    week_data_files_ids = list(map(int, (sys.argv[6:])))
-    main(time_limit_for_week, mode, number_nurses, number_weeks, history_data_file_id, week_data_files_ids)
\ No newline at end of file
+    arguments, options = parse_options(sys.argv[1:])
+    time_limit_for_week = int(arguments[0])
+    mode = int(arguments[1])
+    number_nurses = int(arguments[2])
+    number_weeks = int(arguments[3])
+    # ids of the files are kept as written, "01" and "1" are different files
+    history_data_file_id = arguments[4]
+    week_data_files_ids = arguments[5:]
+    main(time_limit_for_week, mode, number_nurses, number_weeks, history_data_file_id, week_data_files_ids, options)
\ No newline at end of file
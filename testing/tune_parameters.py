@@ -0,0 +1,115 @@
+#!/usr/bin/python
+
+import math
+import os
+import sys
+
+import numpy as np
+
+from main import load_data, parse_options
+from common.schedule_store import create_schedule_store
+from common.tuning import get_training_instances, sample_configurations, get_scores, store_tuned_parameters, default_tuned_parameters_file
+from google.nsp_contest import compute_one_week as compute_one_week_or_tools, tuning_space as cp_sat_tuning_space
+from ibm.nsp_cplex import compute_one_week as compute_one_week_cplex, tuning_space as cplex_tuning_space
+
+# Tunes parameters of the solver of a backend for a size class of instances and stores the best parameters
+# in the tuned parameters file, main loads them for instances of the class.
+# Configurations drawn from the tuning space of the backend are run on random training instances of the class,
+# with the same time limit for every week of a run. Successive halving keeps the best 1/eta of the configurations
+# and multiplies the time limit by eta in every round, random search runs all configurations once with the time limit.
+# Configurations are scored by the mean ratio of their objective to the best objective of every instance.
+#
+#     python tune_parameters.py --backend=cp_sat --size_class=small --configurations=8 --instances=3 --time=2 --weeks=1
+#
+# Options: --backend (cp_sat or cplex), --size_class (small, medium or large), --method (halving or random),
+# --configurations, --instances, --time (seconds per week in the first round), --weeks (weeks computed of every
+# instance), --eta, --seed and --tuned_parameters (file of the tuned parameters).
+
+backends = {
+    "cp_sat": (compute_one_week_or_tools, cp_sat_tuning_space),
+    "cplex": (compute_one_week_cplex, cplex_tuning_space),
+}
+
+def run_configuration(backend, parameters, instance, time_limit_for_week, number_weeks):
+    """
+    Computes the first 'number_weeks' weeks of 'instance' with 'parameters' of the solver.
+    Returns sum of the objective values of the weeks, a week without a solution counts 99999.
+    """
+
+    number_nurses, number_weeks_of_instance, history_data_file_id, week_data_files_ids = instance
+    constants = load_data(number_nurses, number_weeks_of_instance, history_data_file_id, week_data_files_ids)
+    constants["tuned_parameters"] = parameters
+    compute_one_week = backends[backend][0]
+
+    results = create_schedule_store(constants)
+    objective = 0
+    for week_number in range(min(number_weeks, number_weeks_of_instance)):
+        constants["wd_data"] = constants["all_wd_data"][week_number]
+        compute_one_week(time_limit_for_week, week_number, constants, results)
+        objective += results[(week_number, "value")] + results.get((week_number, "allweeksoft"), 0)
+    return objective
+
+def format_instance(instance):
+    number_nurses, number_weeks, history_data_file_id, week_data_files_ids = instance
+    return f"n{number_nurses:03d}w{number_weeks} h{history_data_file_id} {' '.join(map(str, week_data_files_ids))}"
+
+def format_configuration(parameters):
+    return ", ".join(f"{name} {value}" for name, value in parameters.items()) or "default"
+
+def tune(backend, configurations, instances, time_limit_for_week, number_weeks, eta, rounds, log):
+    """
+    Runs successive halving of 'configurations' on 'instances' for 'rounds' rounds (random search for one round).
+    Returns tuple of the best configuration, its score and the time limit of the last round.
+    """
+
+    alive = list(range(len(configurations)))
+    for round_number in range(rounds):
+        objectives = [[run_configuration(backend, configurations[index], instance, time_limit_for_week, number_weeks) for instance in instances] for index in alive]
+        scores = get_scores(objectives)
+        order = np.argsort(scores, kind="stable")
+
+        log(f"round {round_number}: {len(alive)} configurations, {time_limit_for_week:.1f} s per week")
+        for position in order.tolist():
+            log(f"    score {scores[position]:.4f}, objectives {' '.join(f'{value:.0f}' for value in objectives[position])} | {format_configuration(configurations[alive[position]])}")
+
+        if round_number == rounds - 1 or len(alive) == 1:
+            return configurations[alive[order[0]]], float(scores[order[0]]), time_limit_for_week
+        alive = [alive[position] for position in order[:math.ceil(len(alive) / eta)].tolist()]
+        time_limit_for_week *= eta
+
+if __name__ == "__main__":
+    _, options = parse_options(sys.argv[1:])
+    backend = options.get("backend", "cp_sat")
+    size_class = options.get("size_class", "small")
+    method = options.get("method", "halving")
+    number_configurations = int(options.get("configurations", 8))
+    number_instances = int(options.get("instances", 3))
+    time_limit_for_week = float(options.get("time", 2))
+    number_weeks = int(options.get("weeks", 1))
+    eta = int(options.get("eta", 2))
+    rng = np.random.default_rng(int(options.get("seed", 0)))
+
+    instances = get_training_instances(size_class, number_instances, rng)
+    configurations = sample_configurations(backends[backend][1], number_configurations, rng)
+    rounds = max(1, math.ceil(math.log(number_configurations, eta))) if method == "halving" else 1
+
+    output_file = os.path.join("outputs", f"output_tuning_{backend}_{size_class}.txt")
+    with open(output_file, "w") as file:
+        def log(line):
+            print(line)
+            file.write(line + "\n")
+            file.flush()
+
+        log(f"{backend} {size_class}, {method}, instances {'; '.join(map(format_instance, instances))}")
+        best, score, best_time_limit = tune(backend, configurations, instances, time_limit_for_week, number_weeks, eta, rounds, log)
+        log(f"best: {format_configuration(best)} (score {score:.4f})")
+
+    store_tuned_parameters(backend, size_class, {
+        "parameters": best,
+        "score": score,
+        "method": method,
+        "time_limit_for_week": best_time_limit,
+        "weeks": number_weeks,
+        "configurations": number_configurations,
+        "instances": [format_instance(instance) for instance in instances],
+    }, options.get("tuned_parameters", default_tuned_parameters_file))